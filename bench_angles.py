@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the angles conversion routines.
+All 20 conversions between (u, v), (theta, phi), (az, el), (az over el)
+and (el over az) are timed on a grid of 1000 x 1000 points, in float64
+and float32.
+"""
+
+# import argument parser
+import argparse
+# timing
+import time
+
+# import numpy
+import numpy as np
+
+# conversion routines to benchmark
+import patternviewer.angles as ang
+
+# coordinates systems and range of their grid
+SYSTEMS = {'uv': ((-0.15, 0.15), (-0.15, 0.15)),
+           'thetaphi': ((0.0, 9.0), (0.0, 360.0)),
+           'azel': ((-9.0, 9.0), (-9.0, 9.0)),
+           'azovel': ((-9.0, 9.0), (-9.0, 9.0)),
+           'elovaz': ((-9.0, 9.0), (-9.0, 9.0))}
+
+
+def grid(system, size, dtype):
+    """Return a (size x size) grid covering the range of system.
+    """
+    (xmin, xmax), (ymin, ymax) = SYSTEMS[system]
+    x, y = np.meshgrid(np.linspace(xmin, xmax, size, dtype=dtype),
+                       np.linspace(ymin, ymax, size, dtype=dtype))
+    return x, y
+# end of function grid
+
+
+def bench(function, x, y, repeat):
+    """Return best execution time of function(x, y) over repeat runs.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(x, y)
+        best = min(best, time.perf_counter() - start)
+    return best
+# end of function bench
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Benchmark of angles conversion routines.')
+    parser.add_argument('--size', type=int, default=1000,
+                        help='number of points along each grid axis')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs per conversion')
+    args = parser.parse_args()
+
+    print('{0:<20s} {1:>12s} {2:>12s}'.format(
+        'conversion', 'float64 (ms)', 'float32 (ms)'))
+    for source in SYSTEMS:
+        for target in SYSTEMS:
+            if source == target:
+                continue
+            name = source + '2' + target
+            function = getattr(ang, name)
+            times = []
+            for dtype in (np.float64, np.float32):
+                x, y = grid(source, args.size, dtype)
+                times.append(1000 * bench(function, x, y, args.repeat))
+            print('{0:<20s} {1:12.1f} {2:12.1f}'.format(name, *times))
+# end of main function
+
+
+# Main execution
+if __name__ == '__main__':
+    main()
+# end of module bench_angles
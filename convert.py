@@ -1,47 +1,122 @@
-# import os
+#!/usr/bin/env python3
+"""Batch conversion of .grd and .pat pattern files.
+Input files are exported to .pat or .grd files in an output directory, in
+parallel, optionally shrunk, expanded or offset. Outputs newer than their
+input and converted with the same options are skipped so that an
+interrupted batch can be resumed.
+A csv summary of per file timings is written in the output directory.
+
+Example:
+    python convert.py "predictions/*.grd" -o shrunk --shrink 0.25 0.25
+"""
+
+# import argument parser
+import argparse
+# file manipulation
 import os
+# timing
+import time
+
+# batch conversion
+import patternviewer.batch as batch
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Convert, shrink or expand pattern files in parallel.')
+    parser.add_argument('inputs', nargs='+',
+                        help='input files or glob patterns (*.grd, *.pat)')
+    parser.add_argument('-o', '--output-dir', required=True,
+                        help='output directory')
+    parser.add_argument('--format', choices=['pat', 'grd'], default='pat',
+                        help='output file format (default pat)')
+    parser.add_argument('--gzip', action='store_true',
+                        help='compress output files')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--shrink', nargs=2, type=float,
+                        metavar=('AZ', 'EL'),
+                        help='shrink pattern by AZ and EL degrees')
+    action.add_argument('--expand', nargs=2, type=float,
+                        metavar=('AZ', 'EL'),
+                        help='expand pattern by AZ and EL degrees')
+    offset = parser.add_mutually_exclusive_group()
+    offset.add_argument('--offset', nargs=2, type=float,
+                        metavar=('AZ', 'EL'),
+                        help='offset pattern boresight by AZ and EL degrees')
+    offset.add_argument('--boresight', nargs=2, type=float,
+                        metavar=('LON', 'LAT'),
+                        help='point pattern boresight to LON and LAT')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude in degrees')
+    parser.add_argument('--sat-alt', type=float, default=None,
+                        help='satellite altitude in m (default GEO)')
+    parser.add_argument('--pol', choices=['auto', 'co', 'cross'],
+                        default='auto',
+                        help='polarisation to export, auto uses cross for'
+                        ' files whose name ends with H')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes (default number of CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='convert even if output is up to date')
+    parser.add_argument('--summary', default=None,
+                        help='summary csv file'
+                        ' (default OUTPUT_DIR/convert_summary.csv)')
+    args = parser.parse_args()
+
+    # patterns configuration
+    config = batch.default_config()
+    config['sat_lon'] = args.sat_lon
+    if args.sat_alt is not None:
+        config['sat_alt'] = args.sat_alt
+    config['use_second_pol'] = {'auto': None,
+                                'co': False,
+                                'cross': True}[args.pol]
+    if args.shrink:
+        config['shrink'] = True
+        config['azshrink'], config['elshrink'] = args.shrink
+    elif args.expand:
+        config['expand'] = True
+        config['azshrink'], config['elshrink'] = args.expand
+    if args.offset:
+        config['offset'] = True
+        config['azeloffset'] = True
+        config['azoffset'], config['eloffset'] = args.offset
+    elif args.boresight:
+        config['offset'] = True
+        config['azeloffset'] = False
+        config['azoffset'], config['eloffset'] = args.boresight
+
+    files = batch.input_files(args.inputs)
+    if not files:
+        parser.error('no .grd or .pat file matches the inputs')
+
+    start = time.perf_counter()
+    summaries = batch.convert(files, args.output_dir, config,
+                              extension='.' + args.format,
+                              compress=args.gzip,
+                              processes=args.jobs,
+                              force=args.force)
+    summary_file = args.summary or os.path.join(args.output_dir,
+                                                'convert_summary.csv')
+    batch.write_summary(summary_file, summaries)
+
+    # final report
+    count = {}
+    for summary in summaries:
+        count[summary['status']] = count.get(summary['status'], 0) + 1
+    print('{0} in {1:0.1f} s, summary written to {2}'.format(
+        ', '.join('{0} {1}'.format(n, status)
+                  for status, n in sorted(count.items())),
+        time.perf_counter() - start, summary_file))
+    for summary in summaries:
+        if summary['status'] == 'failed':
+            print('failed: {0}: {1}'.format(summary['input'],
+                                            summary['message']))
+# end of main function
+
 
-# import glob
-import glob
-
-# import patterns classes
-from patternviewer.element.pattern.grd import Grd
-from patternviewer.element.pattern.pat import Pat
-import patternviewer.constant as cst
-
-# input directory
-INPUTDIR = 'P:\\Antenna_models\\SES6\\Andes\\grd_files_predictions'
-
-# output directory
-OUTPUTDIR = 'C:\\Temp\\shrunk_pattern'
-
-
-# get grd files
-os.chdir(INPUTDIR)
-files = glob.glob('*.grd')
-
-for f in files:
-    input_file = os.path.join(INPUTDIR, f)
-    output_file = os.path.join(OUTPUTDIR, f[:-3] + 'pat')
-    second_pol = False
-    if output_file[-5] == 'H':
-        second_pol = True
-
-    config = {}
-    config['filename'] = input_file
-    config['revert_x'] = False
-    config['revert_y'] = False
-    config['use_second_pol'] = second_pol
-    config['sat_alt'] = cst.ALTGEO
-    config['sat_lon'] = -40.5
-    config['display_slope'] = False
-    config['shrink'] = True
-    config['azshrink'] = 0.25
-    config['elshrink'] = 0.25
-
-    # import data
-    if f[-3:] == 'grd':
-        p = Grd(conf=config, parent=None)
-    elif f[-3:] == 'pat':
-        p = Pat(conf=config, parent=None)
-    p.export_to_file(output_file, True, 0)
+# Main execution
+if __name__ == '__main__':
+    main()
+# end of module convert
@@ -1,11 +1,25 @@
 """__init__ file of the project.
 """
 __all__ = ['angles',
+           'batch',
+           'catalog',
+           'compliance',
            'constant',
+           'contour',
+           'coverage',
            'convert',
            'earthplot',
            'grdviewer',
            'utils',
            'viewer',
            'zoom',
+           'footprint',
+           'frequency',
+           'interference',
+           'linkbudget',
+           'metrics',
+           'polygonmask',
+           'track',
+           'peaks',
+           'quadrature',
            'element']
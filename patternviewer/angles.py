@@ -9,12 +9,22 @@ be applied.
 # import numpy for trigonometry functions
 import numpy as np
 
-import matplotlib.pyplot as plt
-
 # angles conversion constant
 DEG2RAD = np.pi / 180.0
 RAD2DEG = 180.0 / np.pi
 
+
+def _buffers(out, *arrays):
+    """Return out if provided, otherwise a pair of new arrays with the
+    broadcast shape of arrays and a floating dtype preserving float32.
+    """
+    if out is None:
+        shape = np.broadcast(*arrays).shape
+        dtype = np.result_type(*arrays, 1.0)
+        out = (np.empty(shape, dtype), np.empty(shape, dtype))
+    return out
+# end of function _buffers
+
 # Conversion to (theta, phi)
 # ============================================================================
 
@@ -138,28 +148,30 @@ def thetaphi2elovaz(theta, phi, degrees=True):
 # ============================================================================
 
 
-def uv2azel(u, v, degrees=True):
+def uv2azel(u, v, degrees=True, out=None):
+    """Use reverted formulae:
+    u = - az * sin(r) / r
+    v = el * sin(r) / r
+    with r = sqrt(az**2 + el**2)
+    out is an optional pair of arrays receiving (az, el)
+    """
     if degrees:
         k = RAD2DEG
     else:
         k = 1
-    r = np.sqrt(u**2 + v**2)
-    arcsin_r = np.arcsin(r)
-
-    def limit_zero(r, arcsin_r):
-        if r:
-            return arcsin_r / r
-        else:
-            return 1
-    factor = np.vectorize(limit_zero)(r, arcsin_r)
-    az = - k * u * factor
-    el = k * v * factor
+    u = np.asarray(u)
+    v = np.asarray(v)
+    az, el = _buffers(out, u, v)
+    r = np.hypot(u, v)
+    # arcsin(r) / r tends to 1 when r tends to 0
+    factor = np.ones_like(r)
+    np.divide(np.arcsin(r), r, out=factor, where=r != 0)
+    factor *= k
+    np.multiply(u, factor, out=az)
+    np.negative(az, out=az)
+    np.multiply(v, factor, out=el)
     return az, el
-    # sin_el = v
-    # tan_az = - u / np.sqrt(1 - u**2 - v**2)
-    # return np.arctan(tan_az) * k, np.arcsin(sin_el) * k
-    # theta, phi = uv2thetaphi(u, v, degrees)
-    # return thetaphi2azel(theta, phi, degrees)
+# end of function uv2azel
 
 
 def uv2azovel(u, v, degrees=True):
@@ -177,51 +189,60 @@ def uv2azovel(u, v, degrees=True):
     return az * k, el * k
 
 
-def uv2elovaz(u, v, degrees=True):
+def uv2elovaz(u, v, degrees=True, out=None):
     """Use reverted formulae:
     u = - sin(az) * cos(el)
     v = sin(el)
+    out is an optional pair of arrays receiving (az, el)
     """
     if degrees:
         k = RAD2DEG
     else:
         k = 1
-    el = np.arcsin(v)
-    tan_el = np.tan(el)
-
-    def limit_zero(u, v, tan_el):
-        if v:
-            return np.arcsin(u / v * tan_el)
-        else:
-            return np.arcsin(u)
-    az = - np.vectorize(limit_zero)(u, v, tan_el)
-    return az * k, el * k
+    u = np.asarray(u)
+    v = np.asarray(v)
+    az, el = _buffers(out, u, v)
+    # cos(el) = sqrt(1 - v**2) so that az has no singularity at v = 0
+    np.multiply(v, v, out=el)
+    np.subtract(1, el, out=el)
+    np.sqrt(el, out=el)
+    np.divide(u, el, out=az)
+    np.arcsin(az, out=az)
+    az *= -k
+    np.arcsin(v, out=el)
+    el *= k
+    return az, el
+# end of function uv2elovaz
 
 # Conversion to (u, v)
 # ============================================================================
 
 
-def azel2uv(az, el, degrees=True):
+def azel2uv(az, el, degrees=True, out=None):
+    """Use straight formulae:
+    u = - az * sin(r) / r
+    v = el * sin(r) / r
+    with r = sqrt(az**2 + el**2)
+    out is an optional pair of arrays receiving (u, v)
+    """
     if degrees:
         k = DEG2RAD
     else:
         k = 1
-    # u = - np.sin(az * k) * np.cos(el * k)
-    # v = np.sin(el * k)
-    az_rad = az * k
-    el_rad = el * k
-    r = np.sqrt(az_rad**2 + el_rad**2)
-    sin_r = np.sin(r)
-
-    def limit_zero(r, sin_r):
-        if r:
-            return sin_r / r
-        else:
-            return 1
-    factor = np.vectorize(limit_zero)(r, sin_r)
-    u = - az_rad * factor
-    v = el_rad * factor
+    az = np.asarray(az)
+    el = np.asarray(el)
+    u, v = _buffers(out, az, el)
+    np.multiply(az, k, out=u)
+    np.multiply(el, k, out=v)
+    r = np.hypot(u, v)
+    # sin(r) / r tends to 1 when r tends to 0
+    factor = np.ones_like(r)
+    np.divide(np.sin(r), r, out=factor, where=r != 0)
+    np.multiply(u, factor, out=u)
+    np.negative(u, out=u)
+    np.multiply(v, factor, out=v)
     return u, v
+# end of function azel2uv
 
 
 def azovel2uv(az, el, degrees=True):
@@ -258,6 +279,19 @@ def azel2elovaz(az, el, degrees=True):
     u, v = azel2uv(az, el, degrees)
     return uv2elovaz(u, v, degrees)
 
+# Convert between (az over el) and (el over az)
+# ============================================================================
+
+
+def azovel2elovaz(az, el, degrees=True):
+    u, v = azovel2uv(az, el, degrees)
+    return uv2elovaz(u, v, degrees)
+
+
+def elovaz2azovel(az, el, degrees=True):
+    u, v = elovaz2uv(az, el, degrees)
+    return uv2azovel(u, v, degrees)
+
 # convert to (az, el)
 # ============================================================================
 
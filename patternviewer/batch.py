@@ -0,0 +1,250 @@
+"""This module provides batch conversion of pattern files.
+Each input file is read, optionally shrunk, expanded or offset, and
+exported in a worker process. The options of each output are recorded in
+a .json file next to it. Outputs newer than their input and converted with
+the same options are skipped, so an interrupted batch can be resumed.
+"""
+
+# import csv writer for the summary
+import csv
+# import json for the options of the outputs
+import json
+# file manipulation
+import os
+# import glob for input patterns
+import glob
+# timing
+import time
+# process pool
+import multiprocessing
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# debug trace utility
+import patternviewer.utils as utils
+# package constants definition
+import patternviewer.constant as cst
+
+# import patterns classes
+from patternviewer.element.pattern.grd import Grd
+from patternviewer.element.pattern.pat import Pat
+from patternviewer.element.pattern.fileformat import file_extension
+
+# pattern class per input file extension
+READERS = {'.grd': Grd,
+           '.pat': Pat}
+
+# columns of the summary file
+SUMMARY_FIELDS = ['input', 'output', 'status', 'read (s)', 'export (s)',
+                  'message']
+
+
+def input_files(patterns):
+    """Return sorted list of the pattern files matching the glob patterns,
+    without duplicates.
+    """
+    files = set()
+    for pattern in patterns:
+        files.update(f for f in glob.glob(pattern)
+                     if file_extension(f) in READERS)
+    return sorted(files)
+# end of function input_files
+
+
+def output_file(input_file, outputdir, extension='.pat', compress=False):
+    """Return output file name of input_file in directory outputdir.
+    """
+    name = os.path.basename(input_file)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    name = os.path.splitext(name)[0] + extension
+    if compress:
+        name += '.gz'
+    return os.path.join(outputdir, name)
+# end of function output_file
+
+
+def options_file(output):
+    """Return name of the file recording the conversion options of output.
+    """
+    return output + '.json'
+# end of function options_file
+
+
+def read_options(output):
+    """Return conversion options recorded for output, None if unknown.
+    """
+    try:
+        with open(options_file(output), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+# end of function read_options
+
+
+def write_options(output, config):
+    """Record conversion options config of output.
+    """
+    with open(options_file(output), 'w') as file:
+        json.dump(config, file, sort_keys=True, indent=1)
+# end of function write_options
+
+
+def up_to_date(input_file, output, config=None):
+    """Return True if output exists, is newer than input_file and, when
+    config is given, was converted with the same options.
+    """
+    if not os.path.exists(output) or \
+            os.path.getmtime(output) < os.path.getmtime(input_file):
+        return False
+    # options as recorded, e.g. tuples as lists
+    return config is None or \
+        read_options(output) == json.loads(json.dumps(config))
+# end of function up_to_date
+
+
+def second_pol(input_file):
+    """Return True if file name (without extension) ends with H,
+    convention of horizontal polarisation predictions.
+    """
+    name = os.path.basename(input_file)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return os.path.splitext(name)[0][-1:] == 'H'
+# end of function second_pol
+
+
+def convert_file(job):
+    """Convert one file. job is a (input file, output file, configuration)
+    tuple. Return a summary dictionary with read and export timings.
+    Exceptions are reported in the summary instead of being raised, so that
+    one corrupted file does not stop the batch.
+    """
+    input_file, output, config = job
+    summary = {'input': input_file, 'output': output, 'status': 'converted',
+               'read (s)': 0.0, 'export (s)': 0.0, 'message': ''}
+    utils.mute(True)
+    try:
+        config = dict(config)
+        config['filename'] = input_file
+        if config.get('use_second_pol') is None:
+            config['use_second_pol'] = second_pol(input_file)
+        # shrink or expand the exported fields only, not the plotted data
+        shrink = config.pop('shrink', False)
+        expand = config.pop('expand', False)
+
+        start = time.perf_counter()
+        pattern = READERS[file_extension(input_file)](conf=config,
+                                                     parent=None)
+        summary['read (s)'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pattern.export_to_file(output, shrunk=shrink or expand,
+                               expand=expand and not shrink)
+        summary['export (s)'] = time.perf_counter() - start
+        write_options(output, job[2])
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['message'] = repr(e)
+        # do not leave a partial output that would be seen as up to date
+        for f in (output, options_file(output)):
+            if os.path.exists(f):
+                os.remove(f)
+    return summary
+# end of function convert_file
+
+
+def convert(files, outputdir, config, extension='.pat', compress=False,
+            processes=None, force=False, progress=print):
+    """Convert files to outputdir with a pool of processes (number of CPU
+    by default) and return the list of summary dictionaries, in files order.
+    config is the pattern configuration dictionary applied to all files,
+    use_second_pol set to None selects the polarisation from the file name.
+    Outputs newer than their input and converted with the same config are
+    skipped unless force is True.
+    progress is called with a message each time a file is done.
+    """
+    os.makedirs(outputdir, exist_ok=True)
+    summaries = {}
+    jobs = []
+    for f in files:
+        output = output_file(f, outputdir, extension, compress)
+        if not force and up_to_date(f, output, config):
+            summaries[f] = {'input': f, 'output': output,
+                            'status': 'skipped', 'read (s)': 0.0,
+                            'export (s)': 0.0, 'message': 'up to date'}
+        else:
+            jobs.append((f, output, config))
+
+    done = len(summaries)
+    if done:
+        progress('{0:d}/{1:d} files up to date, skipped'.format(
+            done, len(files)))
+    if jobs:
+        with multiprocessing.Pool(processes) as pool:
+            for summary in pool.imap_unordered(convert_file, jobs):
+                done += 1
+                summaries[summary['input']] = summary
+                progress('[{0:d}/{1:d}] {2} {3} ({4:0.1f} s)'.format(
+                    done, len(files), summary['status'],
+                    os.path.basename(summary['input']),
+                    summary['read (s)'] + summary['export (s)']))
+    return [summaries[f] for f in files]
+# end of function convert
+
+
+def write_summary(filename, summaries):
+    """Write summary dictionaries to csv file filename.
+    """
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for summary in summaries:
+            row = dict(summary)
+            row['read (s)'] = '{0:0.3f}'.format(row['read (s)'])
+            row['export (s)'] = '{0:0.3f}'.format(row['export (s)'])
+            writer.writerow(row)
+# end of function write_summary
+
+
+def read_stations(filename):
+    """Return (names, longitudes, latitudes) of the stations of text file
+    filename, one station per line: name, tag, longitude, latitude, ...
+    (comma separated, format of the station files of the viewer). Lines
+    starting with # are comments.
+    """
+    names = []
+    lon = []
+    lat = []
+    with open(filename, 'r') as file:
+        for line in file:
+            tokens = line.split(',')
+            if line[:1] == '#' or len(tokens) < 4:
+                continue
+            names.append(tokens[0].strip())
+            lon.append(float(tokens[2]))
+            lat.append(float(tokens[3]))
+    return names, np.array(lon), np.array(lat)
+# end of function read_stations
+
+
+def default_config():
+    """Return default configuration of converted patterns.
+    """
+    return {'revert_x': False,
+            'revert_y': False,
+            'use_second_pol': None,
+            'sat_alt': cst.ALTGEO,
+            'sat_lon': 0.0,
+            'display_slope': False,
+            'shrink': False,
+            'expand': False,
+            'azshrink': 0.25,
+            'elshrink': 0.25,
+            'offset': False,
+            'azoffset': 0.0,
+            'eloffset': 0.0}
+# end of function default_config
+
+# end of module batch
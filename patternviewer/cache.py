@@ -0,0 +1,76 @@
+"""This module provides a memoization container with profile counters.
+It is used to keep computed arrays (magnitudes, grids, interpolators)
+until the data they are computed from change.
+"""
+# hash functions for arrays fingerprint
+import hashlib
+
+# import numpy for arrays manipulation
+import numpy as np
+
+
+class Cache(object):
+    """Dictionary of computed values. A value is computed at first request
+    of its key and returned as is afterwards. Hits and misses are counted
+    for profiling purpose.
+    """
+
+    def __init__(self, maxsize: int = None):
+        """Create an empty cache.
+        maxsize is the maximum number of stored values, oldest values are
+        forgotten first. By default the size is not limited.
+        """
+        self._values = {}
+        self._maxsize = maxsize
+        self._hits = 0
+        self._misses = 0
+    # end of constructor
+
+    def get(self, key, compute):
+        """Return value stored for key. If key is not in the cache, compute
+        is called without argument and its result is stored.
+        """
+        try:
+            value = self._values[key]
+            self._hits += 1
+        except KeyError:
+            value = compute()
+            if self._maxsize is not None:
+                while len(self._values) >= self._maxsize:
+                    del self._values[next(iter(self._values))]
+            self._values[key] = value
+            self._misses += 1
+        return value
+    # end of function get
+
+    def clear(self):
+        """Forget all stored values. Counters are kept.
+        """
+        self._values = {}
+    # end of method clear
+
+    def stats(self):
+        """Return profile counters as a dictionary.
+        """
+        return {'hits': self._hits,
+                'misses': self._misses,
+                'size': len(self._values)}
+    # end of function stats
+
+# end of class Cache
+
+
+def fingerprint(*arrays):
+    """Return a hashable fingerprint of the content of arrays, suitable as
+    (part of) a cache key. Arrays with same shape, dtype and values share
+    the same fingerprint.
+    """
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.asarray(array)
+        digest.update(str((array.shape, array.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+# end of function fingerprint
+
+# end of module cache
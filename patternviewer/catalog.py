@@ -0,0 +1,309 @@
+"""This module provides a persistent catalog of pattern files.
+Headers of the .grd and .pat files of a directory tree are probed (pattern
+data is not read) and stored in a SQLite database. The catalog is updated
+incrementally: only new or modified files (by modification time) are probed
+again. It can be queried by grid type, frequency, coverage extent in
+azimuth/elevation and file name.
+
+Usage:
+    python -m patternviewer.catalog update DIRECTORY [--db catalog.db]
+    python -m patternviewer.catalog query [--grid 3] [--frequency 11.7]
+"""
+
+# import argument parser
+import argparse
+# file manipulation
+import os
+# database
+import sqlite3
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# coordinates conversions
+import patternviewer.angles as ang
+# header probing
+from patternviewer.element.pattern.fileformat import probe, file_extension
+
+# default catalog file name
+DEFAULT_DB = 'patterns.db'
+
+# number of points per edge used to compute grid extent in (az, el)
+EDGE_POINTS = 33
+
+# conversion of native grids to (az, el), see AbstractPattern.azel_grid
+TO_AZEL = {1: ang.uv2azel,
+           2: ang.thetaphi2azel,
+           3: lambda x, y: (x, y),
+           4: ang.elovaz2azel,
+           5: ang.azovel2azel}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    name TEXT,
+    mtime REAL,
+    size INTEGER,
+    format TEXT,
+    grid INTEGER,
+    nb_sets INTEGER,
+    az_min REAL, az_max REAL, el_min REAL, el_max REAL,
+    error TEXT);
+CREATE TABLE IF NOT EXISTS sets (
+    path TEXT,
+    set_index INTEGER,
+    nx INTEGER, ny INTEGER,
+    xs REAL, ys REAL, xe REAL, ye REAL,
+    ix REAL, iy REAL,
+    frequency REAL,
+    az_min REAL, az_max REAL, el_min REAL, el_max REAL);
+CREATE INDEX IF NOT EXISTS sets_path ON sets (path);
+CREATE INDEX IF NOT EXISTS files_grid ON files (grid);
+CREATE INDEX IF NOT EXISTS sets_frequency ON sets (frequency);
+'''
+
+
+def azel_extent(grid, limits, nx=2, ny=2, center=(0, 0), fmt='grd'):
+    """Return (az_min, az_max, el_min, el_max) of a native grid defined by
+    its standardised grid type and limits (xs, ys, xe, ye). The grid edges
+    are converted point by point since the conversion is not linear.
+    Set center is added in grid steps for .grd files and as is for .pat
+    files, as done by the readers.
+    """
+    xs, ys, xe, ye = limits
+    if fmt == 'grd':
+        dx = (xe - xs) / max(nx - 1, 1)
+        dy = (ye - ys) / max(ny - 1, 1)
+        x0, y0 = center[0] * dx, center[1] * dy
+    else:
+        x0, y0 = center
+    t = np.linspace(0, 1, EDGE_POINTS)
+    x = np.concatenate((xs + (xe - xs) * t, np.full_like(t, xe),
+                        xe - (xe - xs) * t, np.full_like(t, xs))) + x0
+    y = np.concatenate((np.full_like(t, ys), ys + (ye - ys) * t,
+                        np.full_like(t, ye), ye - (ye - ys) * t)) + y0
+    if grid not in TO_AZEL:
+        return (None,) * 4
+    az, el = TO_AZEL[grid](x, y)
+    return (float(np.nanmin(az)), float(np.nanmax(az)),
+            float(np.nanmin(el)), float(np.nanmax(el)))
+# end of function azel_extent
+
+
+def pattern_files(root):
+    """Return sorted list of .grd and .pat files (possibly gzip compressed)
+    found in the directory tree root.
+    """
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if file_extension(name) in ('.grd', '.pat'):
+                files.append(os.path.abspath(os.path.join(directory, name)))
+    return sorted(files)
+# end of function pattern_files
+
+
+class Catalog(object):
+    """SQLite catalog of pattern files headers.
+    """
+
+    def __init__(self, dbfile: str = DEFAULT_DB):
+        """Open (and create if needed) the catalog stored in dbfile.
+        ':memory:' creates a temporary catalog.
+        """
+        self._db = sqlite3.connect(dbfile)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+    # end of constructor
+
+    def close(self):
+        """Close the database.
+        """
+        self._db.close()
+    # end of method close
+
+    def update(self, root, progress=None):
+        """Probe new and modified pattern files of the directory tree root,
+        and forget files which do not exist anymore.
+        progress, if provided, is called with each probed file name.
+        Return counters of added, updated, removed and unchanged files.
+        """
+        root = os.path.abspath(root)
+        prefix = os.path.join(root, '')
+        known = {row['path']: row['mtime'] for row in self._db.execute(
+            'SELECT path, mtime FROM files WHERE substr(path, 1, ?) = ?',
+            (len(prefix), prefix))}
+        counters = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self._db:
+            for path in pattern_files(root):
+                stat = os.stat(path)
+                if path in known:
+                    mtime = known.pop(path)
+                    if mtime == stat.st_mtime:
+                        counters['unchanged'] += 1
+                        continue
+                    counters['updated'] += 1
+                else:
+                    counters['added'] += 1
+                if progress is not None:
+                    progress(path)
+                self._store(path, stat)
+            # remaining known files were removed
+            for path in known:
+                self._forget(path)
+                counters['removed'] += 1
+        return counters
+    # end of function update
+
+    def _forget(self, path):
+        """Delete entries of file path.
+        """
+        self._db.execute('DELETE FROM files WHERE path = ?', (path,))
+        self._db.execute('DELETE FROM sets WHERE path = ?', (path,))
+    # end of method _forget
+
+    def _store(self, path, stat):
+        """Probe file path and store its header.
+        """
+        self._forget(path)
+        name = os.path.basename(path)
+        try:
+            header = probe(path)
+        except Exception as e:
+            # keep track of unreadable files, not to probe them again
+            self._db.execute(
+                'INSERT INTO files (path, name, mtime, size, error)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (path, name, stat.st_mtime, stat.st_size, repr(e)))
+            return
+        rows = []
+        for k, s in enumerate(header['sets']):
+            extent = azel_extent(header['grid'], s['limits'], s['nx'],
+                                 s['ny'], s['center'], header['format'])
+            rows.append((path, k, s['nx'], s['ny']) + tuple(s['limits']) +
+                        tuple(s['center']) + (s['frequency'],) + extent)
+        self._db.executemany(
+            'INSERT INTO sets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,'
+            ' ?, ?, ?, ?)', rows)
+        extents = [r[-4:] for r in rows if r[-1] is not None]
+        if extents:
+            extents = np.array(extents)
+            extent = (extents[:, 0].min(), extents[:, 1].max(),
+                      extents[:, 2].min(), extents[:, 3].max())
+        else:
+            extent = (None,) * 4
+        self._db.execute(
+            'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (path, name, stat.st_mtime, stat.st_size, header['format'],
+             header['grid'], header['nb_sets']) + extent + (None,))
+    # end of method _store
+
+    def query(self, grid=None, frequency=None, tolerance: float = 1e-3,
+              extent=None, contains: bool = False, name=None):
+        """Return list of dictionaries describing the files matching all
+        the given criteria:
+        grid is the standardised grid type (see AbstractPattern.grid_type)
+        frequency is a frequency in GHz (within tolerance) or a
+        (min, max) range, at least one set must match
+        extent is (az_min, az_max, el_min, el_max) in degrees, the file grid
+        must overlap it (or contain it if contains is True)
+        name is a file name pattern with * and ? wildcards
+        """
+        where = ['error IS NULL']
+        parameters = []
+        if grid is not None:
+            where.append('grid = ?')
+            parameters.append(grid)
+        if frequency is not None:
+            if np.isscalar(frequency):
+                frequency = (frequency - tolerance, frequency + tolerance)
+            where.append('path IN (SELECT path FROM sets'
+                         ' WHERE frequency BETWEEN ? AND ?)')
+            parameters += list(frequency)
+        if extent is not None:
+            if contains:
+                where.append('az_min <= ? AND az_max >= ?'
+                             ' AND el_min <= ? AND el_max >= ?')
+            else:
+                where.append('az_max >= ? AND az_min <= ?'
+                             ' AND el_max >= ? AND el_min <= ?')
+            parameters += list(extent)
+        if name is not None:
+            where.append('name GLOB ?')
+            parameters.append(name)
+        rows = self._db.execute(
+            'SELECT * FROM files WHERE ' + ' AND '.join(where) +
+            ' ORDER BY path', parameters)
+        return [dict(row) for row in rows]
+    # end of function query
+
+    def sets(self, path):
+        """Return list of dictionaries describing the data sets of file path.
+        """
+        rows = self._db.execute(
+            'SELECT * FROM sets WHERE path = ? ORDER BY set_index', (path,))
+        return [dict(row) for row in rows]
+    # end of function sets
+
+    def errors(self):
+        """Return list of (path, error) of the files which could not be
+        probed.
+        """
+        return [(row['path'], row['error']) for row in self._db.execute(
+            'SELECT path, error FROM files WHERE error IS NOT NULL')]
+    # end of function errors
+
+# end of class Catalog
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Catalog of pattern files headers.')
+    parser.add_argument('--db', default=DEFAULT_DB,
+                        help='catalog file (default ' + DEFAULT_DB + ')')
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help='update catalog')
+    update.add_argument('directories', nargs='+',
+                        help='directory trees of pattern files')
+    query = commands.add_parser('query', help='query catalog')
+    query.add_argument('--grid', type=int, default=None,
+                       help='grid type: 1 uv, 2 theta/phi, 3 az/el,'
+                       ' 4 el over az, 5 az over el')
+    query.add_argument('--frequency', type=float, nargs='+', default=None,
+                       metavar='GHZ', help='frequency or frequency range')
+    query.add_argument('--extent', type=float, nargs=4, default=None,
+                       metavar=('AZMIN', 'AZMAX', 'ELMIN', 'ELMAX'),
+                       help='overlapped (az, el) extent in degrees')
+    query.add_argument('--contains', action='store_true',
+                       help='extent must be contained in the pattern grid')
+    query.add_argument('--name', default=None,
+                       help='file name pattern, e.g. "*_H.grd"')
+    args = parser.parse_args()
+
+    catalog = Catalog(args.db)
+    if args.command == 'update':
+        for directory in args.directories:
+            counters = catalog.update(directory)
+            print('{0}: {1}'.format(directory, ', '.join(
+                '{0} {1}'.format(n, k) for k, n in counters.items())))
+        for path, error in catalog.errors():
+            print('error: {0}: {1}'.format(path, error))
+    else:
+        frequency = args.frequency
+        if frequency is not None and len(frequency) == 1:
+            frequency = frequency[0]
+        for row in catalog.query(args.grid, frequency, extent=args.extent,
+                                 contains=args.contains, name=args.name):
+            text = '{path} {format} grid {grid} {nb_sets} set(s)'
+            if row['az_min'] is not None:
+                text += (' az [{az_min:0.2f}, {az_max:0.2f}]'
+                         ' el [{el_min:0.2f}, {el_max:0.2f}]')
+            print(text.format(**row))
+    catalog.close()
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module catalog
@@ -0,0 +1,295 @@
+"""This module provides a batch compliance check of patterns against the
+gain specification of .gxt polygons.
+Every data set of every pattern is checked against every polygon, for every
+combination of excitation law (array patterns), shrink and offset. The
+combinations of a pattern are split in contiguous parts, so that they are
+spread across the pool of processes. Each part reads its pattern once in a
+worker process and runs its combinations: polygon masks, (az, el) grids and
+interpolators cached by the pattern modules are reused across
+combinations. The result is a single table with one row per (pattern,
+combination, set, polygon).
+
+Usage:
+    python -m patternviewer.compliance "beams/*.grd" --gxt spec.gxt
+        --shrink 0 0 --shrink 0.1 0.1 --offset 0.05 0 -o report.csv
+"""
+
+# import argument parser
+import argparse
+# import csv writer for the report
+import csv
+# efficient loops over parameter combinations
+import itertools
+# process pool
+import multiprocessing
+# file manipulation
+import os
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# debug trace utility
+import patternviewer.utils as utils
+# polygons statistics
+import patternviewer.polygonmask as polygonmask
+# patterns readers and default configuration
+import patternviewer.batch as batch
+# polygons reading
+from patternviewer.element.polygon import getpolygons
+# pattern files extension
+from patternviewer.element.pattern.fileformat import file_extension
+# array patterns
+from patternviewer.element.pattern.multigrd import MultiGrd
+
+# first columns of the report
+REPORT_FIELDS = ['pattern', 'law', 'azshrink', 'elshrink', 'azoffset',
+                 'eloffset', 'set', 'gxt', 'polygon', 'required', 'points',
+                 'min', 'mean']
+
+
+def pattern_name(pattern):
+    """Return display name of a pattern specification: file name or
+    first file name of an array pattern.
+    """
+    if isinstance(pattern, (list, tuple)):
+        return '{0} (+{1:d})'.format(os.path.basename(pattern[0][0]),
+                                     len(pattern[0]) - 1)
+    return os.path.basename(pattern)
+# end of function pattern_name
+
+
+def read_pattern(pattern, config):
+    """Return pattern object of specification pattern: a .grd or .pat file
+    name, or an (element files, excitation file) pair for an array
+    pattern.
+    """
+    config = dict(config)
+    if isinstance(pattern, (list, tuple)):
+        config['filename'], config['excfilename'] = pattern
+        if config.get('use_second_pol') is None:
+            config['use_second_pol'] = False
+        return MultiGrd(conf=config, parent=None)
+    config['filename'] = pattern
+    if config.get('use_second_pol') is None:
+        config['use_second_pol'] = batch.second_pol(pattern)
+    return batch.READERS[file_extension(pattern)](conf=config, parent=None)
+# end of function read_pattern
+
+
+def combination_config(shrink, offset):
+    """Return configuration changes of a (shrink, offset) combination.
+    shrink is None or (az, el) in degrees, negative values expand the
+    pattern. offset is None or the (az, el) boresight offset in degrees.
+    """
+    config = {'shrink': False, 'expand': False, 'offset': False}
+    if shrink is not None and any(shrink):
+        if min(shrink) < 0:
+            config['expand'] = True
+        else:
+            config['shrink'] = True
+        config['azshrink'], config['elshrink'] = np.abs(shrink)
+    if offset is not None:
+        config['offset'] = True
+        config['azeloffset'] = True
+        config['azoffset'], config['eloffset'] = offset
+    return config
+# end of function combination_config
+
+
+def combinations(laws, shrinks, offsets):
+    """Return list of (offset, law, shrink) combinations, offsets
+    outermost: grids and masks change with the offset only.
+    """
+    return list(itertools.product(offsets, laws, shrinks))
+# end of function combinations
+
+
+def check_pattern(job):
+    """Check one pattern against the polygons for a part of the
+    combinations.
+    job is a (pattern, gxt files, laws, shrinks, offsets, configuration,
+    percentiles, part) tuple, part being (k, n) to run the k-th of n
+    contiguous parts of the combinations, (0, 1) for all of them. Return
+    (rows, error message) with rows the report rows of the pattern.
+    Exceptions are reported instead of being raised, so that one corrupted
+    file does not stop the batch.
+    """
+    pattern, gxtfiles, laws, shrinks, offsets, config, percentiles, \
+        part = job
+    utils.mute(True)
+    rows = []
+    try:
+        polygons = []
+        for gxt in gxtfiles:
+            polygons += [(os.path.basename(gxt), k + 1, p)
+                         for k, p in enumerate(getpolygons(None, gxt))]
+        shapes = [p for _, _, p in polygons]
+        antenna = read_pattern(pattern, config)
+        if isinstance(antenna, MultiGrd):
+            if laws is None:
+                laws = list(antenna.configure()['law'])
+        else:
+            laws = [None]
+        todo = combinations(laws, shrinks, offsets)
+        part, nb_parts = part
+        for offset, law, shrink in todo[len(todo) * part // nb_parts:
+                                        len(todo) * (part + 1) // nb_parts]:
+            if law is not None:
+                antenna.apply_law(law)
+            antenna.configure(combination_config(shrink, offset))
+            stats = antenna.polygon_statistics(shapes,
+                                               percentiles=percentiles)
+            common = {'pattern': pattern_name(pattern),
+                      'law': '' if law is None else law,
+                      'azshrink': 0.0 if shrink is None else shrink[0],
+                      'elshrink': 0.0 if shrink is None else shrink[1],
+                      'azoffset': 0.0 if offset is None else offset[0],
+                      'eloffset': 0.0 if offset is None else offset[1]}
+            for s in range(antenna.nb_sets()):
+                for k, (gxt, index, _) in enumerate(polygons):
+                    row = dict(common)
+                    row.update({'set': s, 'gxt': gxt, 'polygon': index})
+                    for key, value in stats.items():
+                        row[key] = value[k] if value.ndim == 1 \
+                            else value[k, s]
+                    row['compliant'] = bool(row['margin'] >= 0)
+                    rows.append(row)
+    except Exception as e:
+        return rows, repr(e)
+    return rows, ''
+# end of function check_pattern
+
+
+def run(patterns, gxtfiles, laws=None, shrinks=(None,), offsets=(None,),
+        config=None, percentiles=polygonmask.DEFAULT_PERCENTILES,
+        processes=None, progress=print):
+    """Check patterns against the polygons of gxtfiles with a pool of
+    processes (number of CPU by default).
+    patterns are .grd or .pat file names, or (element files, excitation
+    file) pairs for array patterns, whose laws (law identifiers, all by
+    default) are checked. shrinks and offsets are lists of (az, el) values
+    in degrees or None (see combination_config). config is the patterns
+    configuration (batch.default_config by default).
+    The combinations of each pattern are split in parts so that there are
+    at least as many jobs as processes.
+    Return (rows, errors): report rows in patterns order and list of
+    (pattern, error message) of the patterns which could not be checked.
+    """
+    if config is None:
+        config = batch.default_config()
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    parts = -(-processes // max(len(patterns), 1))
+    jobs = []
+    for p in patterns:
+        array = isinstance(p, (list, tuple))
+        n = parts
+        # laws of array patterns are only known once read
+        if laws is not None or not array:
+            n = min(n, len(combinations(laws if array else [None],
+                                        shrinks, offsets)))
+        jobs += [(p, list(gxtfiles), laws, list(shrinks), list(offsets),
+                  config, tuple(percentiles), (k, n)) for k in range(n)]
+    results = [None] * len(jobs)
+    with multiprocessing.Pool(processes) as pool:
+        for k, (index, result) in enumerate(pool.imap_unordered(
+                _check_job, list(enumerate(jobs)))):
+            results[index] = result
+            part, nb_parts = jobs[index][-1]
+            progress('[{0:d}/{1:d}] {2} part {3:d}/{4:d} {5}'.format(
+                k + 1, len(jobs), pattern_name(jobs[index][0]), part + 1,
+                nb_parts, 'failed' if result[1] else 'checked'))
+    rows = []
+    errors = []
+    for job, (part_rows, error) in zip(jobs, results):
+        rows += part_rows
+        name = pattern_name(job[0])
+        if error and (name, error) not in errors:
+            errors.append((name, error))
+    return rows, errors
+# end of function run
+
+
+def _check_job(job):
+    """Process pool entry point, keeps track of the job index.
+    """
+    index, job = job
+    return index, check_pattern(job)
+# end of function _check_job
+
+
+def write_report(filename, rows):
+    """Write report rows to csv file filename.
+    """
+    fields = list(REPORT_FIELDS)
+    for row in rows:
+        fields += [k for k in row if k not in fields]
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: '{0:0.3f}'.format(v)
+                             if isinstance(v, (float, np.floating)) else v
+                             for k, v in row.items()})
+# end of function write_report
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Check patterns against .gxt polygons gain spec.')
+    parser.add_argument('inputs', nargs='+',
+                        help='pattern files or glob patterns (*.grd, *.pat)'
+                        ', elementary patterns if --exc is provided')
+    parser.add_argument('--gxt', nargs='+', required=True,
+                        help='polygons files')
+    parser.add_argument('--exc', default=None,
+                        help='excitation file, inputs are then the'
+                        ' elementary patterns of one array')
+    parser.add_argument('--law', nargs='+', default=None,
+                        help='excitation laws identifiers (default all)')
+    parser.add_argument('--shrink', nargs=2, type=float, action='append',
+                        metavar=('AZ', 'EL'),
+                        help='shrink values, negative to expand, repeat'
+                        ' for several values (default no shrink)')
+    parser.add_argument('--offset', nargs=2, type=float, action='append',
+                        metavar=('AZ', 'EL'),
+                        help='boresight offsets, repeat for several values'
+                        ' (default no offset)')
+    parser.add_argument('--percentile', type=float, nargs='*',
+                        default=list(polygonmask.DEFAULT_PERCENTILES),
+                        help='percentiles of gain inside polygons')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude in degrees')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes (default number of CPU)')
+    parser.add_argument('-o', '--output', default='compliance.csv',
+                        help='report csv file (default compliance.csv)')
+    args = parser.parse_args()
+
+    config = batch.default_config()
+    config['sat_lon'] = args.sat_lon
+    files = batch.input_files(args.inputs)
+    if not files:
+        parser.error('no .grd or .pat file matches the inputs')
+    patterns = [(files, args.exc)] if args.exc else files
+
+    rows, errors = run(patterns, args.gxt, laws=args.law,
+                       shrinks=args.shrink or [None],
+                       offsets=args.offset or [None],
+                       config=config, percentiles=args.percentile,
+                       processes=args.jobs)
+    write_report(args.output, rows)
+
+    # final report
+    failed = [r for r in rows if not r['compliant']]
+    print('{0:d} checks, {1:d} not compliant, report written to {2}'.format(
+        len(rows), len(failed), args.output))
+    for pattern, error in errors:
+        print('failed: {0}: {1}'.format(pattern, error))
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module compliance
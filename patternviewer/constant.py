@@ -18,6 +18,9 @@ EARTH_RAD_EQUATOR_M = 6378137.0000  # m
 EARTH_RAD_POLE_M = 6356752.3142  # m
 EARTH_RAD_BASEMAP = 6370997.0000  # m
 
+# speed of light in vacuum
+SPEED_OF_LIGHT = 299792458.0  # m/s
+
 # degrees to radians conversion
 DEG2RAD = np.pi / 180.0
 # radians to degrees conversion
@@ -0,0 +1,297 @@
+"""This module provides isolevel contours of patterns without rendering.
+Contours are extracted with a vectorized marching squares on the
+(lon, lat) or (az, el) grid of the data sets, joined into polylines
+(closed ones being polygons), optionally simplified, and exported to .gxt
+(readable by polygon.getpolygons), GeoJSON or KML files.
+Contours of a data set are cached by plotted data, grid and levels.
+
+A contour is a dictionary with keys set, level and lines, lines being a
+list of (n, 2) arrays of (x, y) vertex.
+"""
+
+# json writer
+import json
+# xml escaping of KML names
+from xml.sax.saxutils import escape
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# memoization of computed contours
+from patternviewer.cache import Cache, fingerprint
+
+# contours shared by all patterns
+CONTOURS = Cache(maxsize=64)
+
+# crossed edges of each marching squares case, -1 for saddles and cases
+# without crossing. Edges are numbered 0 bottom, 1 right, 2 top, 3 left
+_EDGES = np.array([[-1, -1], [0, 3], [0, 1], [1, 3],
+                   [1, 2], [-1, -1], [0, 2], [2, 3],
+                   [2, 3], [0, 2], [-1, -1], [1, 2],
+                   [1, 3], [0, 1], [0, 3], [-1, -1]])
+
+
+def _crossings(x, y, z, level):
+    """Return (index, x, y) of the grid edges crossed by level: index is
+    the global edge number (horizontal edges first) and (x, y) the linearly
+    interpolated crossing point.
+    """
+    nx, ny = z.shape
+    above = z >= level
+    index = []
+    px = []
+    py = []
+    for axis, offset in ((0, 0), (1, (nx - 1) * ny)):
+        if axis == 0:
+            a = (slice(None, -1), slice(None))
+            b = (slice(1, None), slice(None))
+        else:
+            a = (slice(None), slice(None, -1))
+            b = (slice(None), slice(1, None))
+        crossed = np.flatnonzero(above[a] != above[b])
+        za = z[a].ravel()[crossed]
+        zb = z[b].ravel()[crossed]
+        t = (level - za) / (zb - za)
+        px.append(x[a].ravel()[crossed] +
+                  t * (x[b].ravel()[crossed] - x[a].ravel()[crossed]))
+        py.append(y[a].ravel()[crossed] +
+                  t * (y[b].ravel()[crossed] - y[a].ravel()[crossed]))
+        index.append(crossed + offset)
+    return np.concatenate(index), np.concatenate(px), np.concatenate(py)
+# end of function _crossings
+
+
+def _segments(z, level, valid):
+    """Return (n, 2) array of global edge numbers of the contour segments
+    of each grid cell.
+    """
+    nx, ny = z.shape
+    above = (z >= level).astype(int)
+    case = above[:-1, :-1] + 2 * above[1:, :-1] + 4 * above[1:, 1:] + \
+        8 * above[:-1, 1:]
+    case[~valid] = 0
+    i, j = np.meshgrid(np.arange(nx - 1), np.arange(ny - 1), indexing='ij')
+    # global numbers of bottom, right, top and left edges of each cell
+    edges = np.stack((i * ny + j,
+                      (nx - 1) * ny + (i + 1) * (ny - 1) + j,
+                      i * ny + j + 1,
+                      (nx - 1) * ny + i * (ny - 1) + j), axis=-1)
+    edges = edges.reshape(-1, 4)
+    case = case.ravel()
+    # regular cases: one segment
+    regular = np.flatnonzero(_EDGES[case, 0] >= 0)
+    segments = [np.take_along_axis(edges[regular], _EDGES[case[regular]],
+                                   axis=1)]
+    # saddles: two segments, resolved with the cell center value
+    center = (z[:-1, :-1] + z[1:, :-1] + z[1:, 1:] + z[:-1, 1:]).ravel() / 4
+    for saddle in (5, 10):
+        cells = np.flatnonzero(case == saddle)
+        high = center[cells] >= level
+        # corners 1 and 3 isolated (bottom/right and top/left segments)
+        # for case 5 with high center and case 10 with low center
+        split = high if saddle == 5 else ~high
+        first = np.where(split[:, None], [0, 1], [0, 3])
+        second = np.where(split[:, None], [2, 3], [1, 2])
+        segments.append(np.take_along_axis(edges[cells], first, axis=1))
+        segments.append(np.take_along_axis(edges[cells], second, axis=1))
+    return np.concatenate(segments)
+# end of function _segments
+
+
+def _chains(segments):
+    """Return list of chains of edge numbers joining the segments. Closed
+    chains end with their first edge.
+    """
+    ends = segments.ravel()
+    # each edge is shared by at most two segments ends
+    order = np.argsort(ends, kind='stable')
+    same = np.flatnonzero(ends[order][1:] == ends[order][:-1])
+    partner = np.full(len(ends), -1)
+    partner[order[same]] = order[same + 1]
+    partner[order[same + 1]] = order[same]
+
+    visited = np.zeros(len(segments), dtype=bool)
+    chains = []
+
+    def walk(end):
+        """Follow segments from segment end, return edges met."""
+        edges = []
+        while partner[end] >= 0 and not visited[partner[end] // 2]:
+            end = partner[end]
+            visited[end // 2] = True
+            end = end ^ 1
+            edges.append(ends[end])
+        return edges
+
+    for s in range(len(segments)):
+        if visited[s]:
+            continue
+        visited[s] = True
+        forward = walk(2 * s + 1)
+        backward = walk(2 * s)
+        chains.append(backward[::-1] + [ends[2 * s], ends[2 * s + 1]] +
+                      forward)
+    return chains
+# end of function _chains
+
+
+def marching_squares(x, y, z, level):
+    """Return list of (n, 2) arrays of (x, y) vertex of the contour lines of
+    z at level. x, y and z are 2D arrays of the same shape (curvilinear
+    grids allowed). Closed lines have the same first and last vertex.
+    Cells with a non finite value or coordinate are ignored.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y) & np.isfinite(z)
+    valid = finite[:-1, :-1] & finite[1:, :-1] & finite[1:, 1:] & \
+        finite[:-1, 1:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        segments = _segments(z, level, valid)
+        if len(segments) == 0:
+            return []
+        index, px, py = _crossings(x, y, z, level)
+    position = np.full((x.shape[0] - 1) * x.shape[1] +
+                       x.shape[0] * (x.shape[1] - 1), -1)
+    position[index] = np.arange(len(index))
+    lines = []
+    for chain in _chains(segments):
+        k = position[np.array(chain)]
+        lines.append(np.column_stack((px[k], py[k])))
+    return lines
+# end of function marching_squares
+
+
+def simplify(line, tolerance):
+    """Return line simplified with the Douglas-Peucker algorithm: vertex
+    closer than tolerance to the simplified line are removed. First and
+    last vertex are kept.
+    """
+    if tolerance <= 0 or len(line) < 3:
+        return line
+    keep = np.zeros(len(line), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(line) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = line[first], line[last]
+        inner = line[first + 1:last]
+        direction = end - start
+        length = np.hypot(*direction)
+        if length == 0:
+            distance = np.hypot(*(inner - start).T)
+        else:
+            distance = np.abs(direction[0] * (inner[:, 1] - start[1]) -
+                              direction[1] * (inner[:, 0] - start[0])) / \
+                length
+        k = int(np.argmax(distance))
+        if distance[k] > tolerance:
+            keep[first + 1 + k] = True
+            stack += [(first, first + 1 + k), (first + 1 + k, last)]
+    return line[keep]
+# end of function simplify
+
+
+def contours(x, y, z, levels, tolerance: float = 0.0):
+    """Return list of contours (see module) of z at each level, simplified
+    with tolerance (in grid coordinates units).
+    """
+    return [{'set': 0, 'level': float(level),
+             'lines': [simplify(line, tolerance) for line in
+                       marching_squares(x, y, z, level)]}
+            for level in np.atleast_1d(levels)]
+# end of function contours
+
+
+def pattern_contours(pattern, levels=None, sets=None,
+                     coordinates: str = 'lonlat', tolerance: float = 0.0):
+    """Return list of contours of the plotted data (conversion factor
+    included) of data sets of index in sets (all by default) of pattern, at
+    levels (pattern isolevels by default). coordinates is 'lonlat' or
+    'azel'. Contours are cached by data, grid, levels and tolerance.
+    """
+    if levels is None:
+        levels = pattern.get_isolevel()
+    levels = tuple(float(level) for level in np.atleast_1d(levels))
+    if sets is None:
+        sets = range(pattern.nb_sets())
+    grids = {'lonlat': (pattern.longitude, pattern.latitude),
+             'azel': (pattern.azimuth, pattern.elevation)}[coordinates]
+    result = []
+    for s in sets:
+        x, y = grids[0](s), grids[1](s)
+        z = pattern.plotted(s) + pattern._conversion_factor
+        key = fingerprint(x, y, z), levels, tolerance
+        found = CONTOURS.get(key, lambda: contours(x, y, z, levels,
+                                                   tolerance))
+        result += [dict(c, set=s) for c in found]
+    return result
+# end of function pattern_contours
+
+
+def write_gxt(filename, contours, closed_only: bool = True):
+    """Write (lon, lat) contours to .gxt file filename, one polygon per
+    line with the contour level as gain. If closed_only is True, lines
+    which are not closed are skipped.
+    """
+    lines = [(c['level'], line) for c in contours for line in c['lines']
+             if not closed_only or np.array_equal(line[0], line[-1])]
+    with open(filename, 'w') as file:
+        file.write('[COHeader]\nn_cont={0:d}\n'.format(len(lines)))
+        for k, (level, line) in enumerate(lines):
+            # polygons are closed by the reader
+            if np.array_equal(line[0], line[-1]):
+                line = line[:-1]
+            file.write('\n[C{0:d}]\ngain={1:0.2f}\nn_point={2:d}\n'.format(
+                k + 1, level, len(line)))
+            file.write(''.join('p{0:d}={1:0.5f};{2:0.5f}\n'.format(
+                i + 1, lon, lat) for i, (lon, lat) in enumerate(line)))
+# end of function write_gxt
+
+
+def write_geojson(filename, contours, name: str = ''):
+    """Write (lon, lat) contours to GeoJSON file filename, one feature per
+    line: Polygon if the line is closed, LineString otherwise.
+    """
+    features = []
+    for c in contours:
+        for line in c['lines']:
+            coordinates = np.round(line, 6).tolist()
+            if len(line) > 3 and np.array_equal(line[0], line[-1]):
+                geometry = {'type': 'Polygon', 'coordinates': [coordinates]}
+            else:
+                geometry = {'type': 'LineString',
+                            'coordinates': coordinates}
+            features.append({'type': 'Feature',
+                             'geometry': geometry,
+                             'properties': {'name': name,
+                                            'set': c['set'],
+                                            'level': c['level']}})
+    with open(filename, 'w') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file)
+# end of function write_geojson
+
+
+def write_kml(filename, contours, name: str = ''):
+    """Write (lon, lat) contours to KML file filename, one placemark per
+    line.
+    """
+    with open(filename, 'w') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+                   '<Document><name>{0}</name>\n'.format(escape(name)))
+        for c in contours:
+            for line in c['lines']:
+                file.write('<Placemark><name>{0} set {1:d} {2:0.2f} dB'
+                           '</name><LineString><coordinates>'.format(
+                               escape(name), c['set'], c['level']))
+                file.write(' '.join('{0:0.5f},{1:0.5f},0'.format(lon, lat)
+                                    for lon, lat in line))
+                file.write('</coordinates></LineString></Placemark>\n')
+        file.write('</Document>\n</kml>\n')
+# end of function write_kml
+
+# end of module contour
@@ -0,0 +1,244 @@
+"""This module provides coverage areas and overlaps of beams.
+Beams are thresholded at isolevels on a common (lon, lat) grid, each grid
+point being weighted by the ground area it represents. Area weights are
+computed once per grid from the spherical area of the grid cells. Coverage
+masks are stored bit-packed (one bit per grid point), the areas are
+weighted sums of the mask bits and the overlap of two beams is the area of
+the bitwise and of their masks.
+"""
+
+# import csv writer for the reports
+import csv
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# import constant file
+import patternviewer.constant as cst
+# memoization of computed arrays
+from patternviewer.cache import Cache, fingerprint
+
+# mean Earth radius
+EARTH_RADIUS_KM = (2 * cst.EARTH_RAD_EQUATOR_M + cst.EARTH_RAD_POLE_M) / \
+    3 / 1000
+
+# area weights shared by all coverages
+AREAS = Cache(maxsize=16)
+
+
+def _unit_vectors(lon, lat):
+    """Return (..., 3) unit vectors of points (lon, lat) in degrees, NaN for
+    points out of the Earth (e.g. grid points out of the Earth disc).
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    with np.errstate(invalid='ignore'):
+        valid = np.isfinite(lon) & (np.abs(lat) <= 90)
+    lon = np.where(valid, lon, np.nan) * cst.DEG2RAD
+    lat = np.where(valid, lat, np.nan) * cst.DEG2RAD
+    return np.stack((np.cos(lat) * np.cos(lon),
+                     np.cos(lat) * np.sin(lon),
+                     np.sin(lat)), axis=-1)
+# end of function _unit_vectors
+
+
+def _triangle_area(a, b, c):
+    """Return area on the unit sphere of the spherical triangles of vertex
+    unit vectors a, b and c (Van Oosterom and Strackee formula).
+    """
+    triple = np.abs(np.einsum('...i,...i', a, np.cross(b, c)))
+    denominator = 1 + np.einsum('...i,...i', a, b) + \
+        np.einsum('...i,...i', b, c) + np.einsum('...i,...i', c, a)
+    return 2 * np.arctan2(triple, denominator)
+# end of function _triangle_area
+
+
+def cell_areas(lon, lat):
+    """Return the ground area in km2 represented by each point of the 2D
+    grid (lon, lat): a quarter of the area of each of the (up to four)
+    grid cells the point is a corner of. Cells with a corner out of the
+    Earth have a null area. Result is read-only and cached by grid.
+    """
+    def compute():
+        v = _unit_vectors(lon, lat)
+        a, b = v[:-1, :-1], v[1:, :-1]
+        c, d = v[1:, 1:], v[:-1, 1:]
+        cells = _triangle_area(a, b, c) + _triangle_area(a, c, d)
+        cells = np.nan_to_num(cells) * EARTH_RADIUS_KM ** 2 / 4
+        weights = np.zeros(np.shape(lon))
+        weights[:-1, :-1] += cells
+        weights[1:, :-1] += cells
+        weights[1:, 1:] += cells
+        weights[:-1, 1:] += cells
+        weights.flags.writeable = False
+        return weights
+
+    return AREAS.get(fingerprint(lon, lat), compute)
+# end of function cell_areas
+
+
+class Coverage(object):
+    """Coverage masks of beams at isolevels on a common (lon, lat) grid.
+    """
+
+    def __init__(self, lon, lat):
+        """Create an empty coverage on the 2D grid (lon, lat), e.g. the grid
+        of a pattern or a regular longitude/latitude raster.
+        """
+        self._lon = np.asarray(lon, dtype=float)
+        self._lat = np.asarray(lat, dtype=float)
+        self._grid = fingerprint(self._lon, self._lat)
+        weights = np.ravel(cell_areas(self._lon, self._lat))
+        self._nb_points = len(weights)
+        # weights padded to the packed masks length
+        self._weights = np.zeros(-(-self._nb_points // 8) * 8)
+        self._weights[:self._nb_points] = weights
+        self._keys = []
+        self._packed = []
+        self._masks = None
+    # end of constructor
+
+    def __len__(self):
+        return len(self._keys)
+    # end of function __len__
+
+    def keys(self):
+        """Return list of beam keys, indexed by beam number.
+        """
+        return self._keys
+    # end of function keys
+
+    def add(self, key, gain, isolevel):
+        """Add the coverage of gain (on the grid) above isolevel, under key.
+        """
+        with np.errstate(invalid='ignore'):
+            mask = np.ravel(np.asarray(gain) >= isolevel)
+        self._keys.append(key)
+        self._packed.append(np.packbits(mask))
+        self._masks = None
+    # end of method add
+
+    def add_pattern(self, key, pattern, isolevels=None, sets=None,
+                    method: str = 'linear'):
+        """Add coverages of data sets of index in sets (all by default) of
+        pattern at each isolevel (pattern isolevels by default), under keys
+        (key, set, isolevel). Sets defined on another grid are resampled
+        (with method) on the coverage grid. Gains include the conversion
+        factor of the pattern, as its isolevels.
+        """
+        if isolevels is None:
+            isolevels = pattern.get_isolevel()
+        isolevels = np.atleast_1d(isolevels)
+        sets = list(range(pattern.nb_sets()) if sets is None else sets)
+        for s in sets:
+            if fingerprint(pattern.longitude(s),
+                           pattern.latitude(s)) == self._grid:
+                gain = pattern.plotted(s) + pattern._conversion_factor
+            else:
+                az, el = pattern.lonlat2azel(self._lon, self._lat)
+                gain = pattern.resample(az, el, [s], method)[..., 0] + \
+                    pattern._conversion_factor
+            for level in isolevels:
+                self.add((key, s, float(level)), gain, level)
+    # end of method add_pattern
+
+    def packed(self):
+        """Return (nb beams, nb bytes) array of the bit-packed masks.
+        """
+        if self._masks is None:
+            self._masks = np.array(self._packed, dtype=np.uint8).reshape(
+                len(self._packed), -1)
+        return self._masks
+    # end of function packed
+
+    def mask(self, beam):
+        """Return boolean coverage mask of beam number beam on the grid.
+        """
+        return np.unpackbits(self._packed[beam], count=self._nb_points) \
+            .astype(bool).reshape(self._lon.shape)
+    # end of function mask
+
+    def _weighted_sum(self, packed):
+        """Return area in km2 of bit-packed masks (one per row).
+        """
+        areas = np.zeros(len(packed))
+        # 8 bits per byte, 8192 bytes processed at once
+        for start in range(0, packed.shape[1], 8192):
+            bits = np.unpackbits(packed[:, start:start + 8192], axis=1)
+            areas += bits @ self._weights[8 * start:8 * start +
+                                          bits.shape[1]]
+        return areas
+    # end of function _weighted_sum
+
+    def areas(self):
+        """Return coverage area in km2 of each beam.
+        """
+        return self._weighted_sum(self.packed())
+    # end of function areas
+
+    def overlap(self, i, j):
+        """Return (intersection, union) areas in km2 of beams number i and
+        j.
+        """
+        packed = np.stack((self._packed[i] & self._packed[j],
+                           self._packed[i] | self._packed[j]))
+        intersection, union = self._weighted_sum(packed)
+        return intersection, union
+    # end of function overlap
+
+    def overlap_matrix(self, chunk: int = 4096):
+        """Return (intersection, union) (nb beams, nb beams) matrices of
+        overlap areas in km2 of all pairs of beams.
+        Bytes where no beam has coverage are skipped, the weighted sums of
+        the bitwise and of all pairs are accumulated by chunks of bytes as
+        a matrix product.
+        """
+        packed = self.packed()
+        # bytes covered by at least one beam
+        covered = np.flatnonzero(np.bitwise_or.reduce(packed, axis=0))
+        weights = self._weights.reshape(-1, 8)[covered]
+        intersection = np.zeros((len(packed), len(packed)))
+        for start in range(0, len(covered), chunk):
+            columns = covered[start:start + chunk]
+            bits = np.unpackbits(packed[:, columns], axis=1).astype(
+                np.float32)
+            weighted = bits * np.ravel(
+                weights[start:start + chunk]).astype(np.float32)
+            intersection += bits @ weighted.T
+        areas = np.diag(intersection).copy()
+        union = areas[:, None] + areas[None, :] - intersection
+        return intersection, union
+    # end of function overlap_matrix
+
+    def write_areas(self, filename):
+        """Write coverage area of each beam to csv file filename.
+        """
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['beam', 'key', 'area (km2)'])
+            for k, (key, area) in enumerate(zip(self._keys, self.areas())):
+                writer.writerow([k, key, '{0:0.1f}'.format(area)])
+    # end of method write_areas
+
+    def write_overlaps(self, filename, chunk: int = 4096):
+        """Write intersection and union areas of all overlapping pairs of
+        beams to csv file filename.
+        """
+        intersection, union = self.overlap_matrix(chunk)
+        i, j = np.nonzero(np.triu(intersection > 0, k=1))
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['beam 1', 'beam 2', 'key 1', 'key 2',
+                             'intersection (km2)', 'union (km2)',
+                             'overlap ratio'])
+            for a, b in zip(i, j):
+                writer.writerow([a, b, self._keys[a], self._keys[b],
+                                 '{0:0.1f}'.format(intersection[a, b]),
+                                 '{0:0.1f}'.format(union[a, b]),
+                                 '{0:0.4f}'.format(intersection[a, b] /
+                                                   union[a, b])])
+    # end of method write_overlaps
+
+# end of class Coverage
+
+# end of module coverage
@@ -31,6 +31,11 @@ from patternviewer.element import station as stn
 import patternviewer.element.elevation as elv
 from patternviewer.viewer import Viewer
 from patternviewer.zoom import Zoom
+from patternviewer.footprint import FootprintIndex
+from patternviewer.interference import CarrierInterference
+from patternviewer.coverage import Coverage
+import patternviewer.linkbudget as linkbudget
+from patternviewer.track import TrackEvaluator, DEFAULT_CHUNK
 
 # import constant file
 import patternviewer.constant as cst
@@ -839,24 +844,8 @@ class EarthPlot(FigureCanvas):
         """Compute elevation of spacecraft seen from a station on the ground.
         """
         utils.trace('in')
-        # compute phi
-        phi = np.arccos(
-            np.cos(cst.DEG2RAD * stalat)
-            * np.cos(
-                cst.DEG2RAD
-                * (self._viewer.longitude() - stalon)
-            )
-        )
-
-        # compute elevation
-        elev = np.reshape(
-            [90 if phi == 0 else
-             cst.RAD2DEG
-             * np.arctan(
-                 (np.cos(phi) - (cst.EARTH_RAD_EQUATOR_M
-                  / (cst.EARTH_RAD_EQUATOR_M + self._viewer.altitude()))
-                  ) / np.sin(phi))
-             for phi in phi.flatten()], phi.shape)
+        # compute elevation, geometry is shared with the link budgets
+        elev = linkbudget.elevation(stalon, stalat, self._viewer)
 
         # remove station out of view
         elev = np.where(np.absolute(
@@ -867,6 +856,81 @@ class EarthPlot(FigureCanvas):
         return elev
     # end of function elevation
 
+    def pattern_slopes(self, lon, lat):
+        """Return pattern gradient (dG/daz, dG/del) in dB/deg of all loaded
+        patterns for stations defined with longitude and latitude vectors.
+        Dictionary is indexed with the pattern keys.
+        """
+        utils.trace('in')
+        slopes = {}
+        for key in self._patterns:
+            pattern = self._patterns[key].get_pattern()
+            slopes[key] = pattern.station_slope(lon, lat)
+        utils.trace('out')
+        return slopes
+    # end of function pattern_slopes
+
+    def footprint_index(self, isolevel=None, cell: float = 5.0):
+        """Return a FootprintIndex of all data sets of all loaded patterns,
+        keyed by (pattern key, set). isolevel defaults to the lowest
+        isolevel of each pattern.
+        """
+        utils.trace('in')
+        index = FootprintIndex(cell)
+        for key in self._patterns:
+            index.add_pattern(key, self._patterns[key].get_pattern(),
+                              isolevel)
+        utils.trace('out')
+        return index
+    # end of function footprint_index
+
+    def carrier_interference(self, lon, lat, colours=None,
+                             method: str = 'linear'):
+        """Return a CarrierInterference engine on points (lon, lat) with
+        all data sets of all loaded patterns as beams.
+        colours is a dictionary of colour labels lists (one per set)
+        indexed with the pattern keys, missing patterns have all their
+        sets in a single colour.
+        """
+        utils.trace('in')
+        engine = CarrierInterference(lon, lat, method)
+        for key in self._patterns:
+            engine.add_pattern(key, self._patterns[key].get_pattern(),
+                               (colours or {}).get(key))
+        utils.trace('out')
+        return engine
+    # end of function carrier_interference
+
+    def coverage(self, lon, lat, isolevels=None, method: str = 'linear'):
+        """Return a Coverage on the grid (lon, lat) of all data sets of all
+        loaded patterns, keyed by (pattern key, set, isolevel). isolevels
+        default to the isolevels of each pattern.
+        """
+        utils.trace('in')
+        coverage = Coverage(lon, lat)
+        for key in self._patterns:
+            coverage.add_pattern(key, self._patterns[key].get_pattern(),
+                                 isolevels, method=method)
+        utils.trace('out')
+        return coverage
+    # end of function coverage
+
+    def track_gains(self, track, output, chunk: int = DEFAULT_CHUNK,
+                    method: str = 'linear'):
+        """Write gains of all data sets of all loaded patterns along track
+        file track (csv or KML) to csv file output, with the best beam of
+        each position. Positions are processed by chunks of chunk points.
+        Return the number of positions.
+        """
+        utils.trace('in')
+        evaluator = TrackEvaluator(
+            {key: self._patterns[key].get_pattern()
+             for key in self._patterns}, method)
+        count = evaluator.run(track, output, chunk)
+        utils.trace('out')
+        return count
+    # end of function track_gains
+
     def get_file_key(self, filename):
         utils.trace('in')
         file_index = 1
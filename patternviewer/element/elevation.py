@@ -7,8 +7,6 @@ from PyQt5.QtWidgets import QDialog, QLineEdit, \
 import numpy as np
 
 # import of local modules
-# Constants
-import patternviewer.constant as cst
 # Astract  mother class Element
 from patternviewer.element.element import Element
 from patternviewer.element.linedialog import LineDialog
@@ -34,25 +32,8 @@ class Elevation(Element):
         """Compute elevation of spacecraft seen from a station on the ground.
         """
         utils.trace('in')
-        # compute phi
-        phi = np.arccos(
-            np.cos(cst.DEG2RAD * stalat)
-            * np.cos(cst.DEG2RAD
-                     * (self._parent._viewer.longitude() - stalon)))
-
-        # compute elevation
-        elev = np.reshape(
-            [90 if phi == 0 else cst.RAD2DEG * np.arctan(
-                (np.cos(phi) - (cst.EARTH_RAD_EQUATOR_M
-                 / (cst.EARTH_RAD_EQUATOR_M
-                    + self._parent._viewer.altitude())))
-                / np.sin(phi)) for phi in phi.flatten()],
-            phi.shape)
-
-        # remove station out of view
-        elev = np.where(np.absolute(
-            stalon - self._parent._viewer.longitude()) < 90, elev, -1)
-
+        # same computation as the Earth plot
+        elev = self._parent.elevation(stalon, stalat)
         utils.trace('out')
         # Return vector
         return elev
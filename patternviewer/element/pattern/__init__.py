@@ -4,5 +4,7 @@ __all__ = ['abstractpattern',
            'multigrd',
            'grd',
            'pat',
+           'fileformat',
+           'expression',
            'dialog',
            'control']
@@ -50,11 +50,33 @@ import patternviewer.utils as utils
 import patternviewer.angles as ang
 # import constant file
 import patternviewer.constant as cst
+# memoization of computed arrays
+from patternviewer.cache import Cache, fingerprint
+# regular grid interpolation
+from patternviewer.interpolation import GridInterpolator, evaluate
+# sparse resampling between grids
+from patternviewer.resample import get_resampler
+# statistics inside polygons
+import patternviewer.polygonmask as polygonmask
+# contours extraction and export
+import patternviewer.contour as contour
+# peaks finding
+import patternviewer.peaks as peaks
+# integration over the sphere
+import patternviewer.quadrature as quadrature
+# bulk writers of pattern files
+import patternviewer.element.pattern.fileformat as fileformat
 # Edit dialog
 from patternviewer.element.pattern.dialog import PatternDialog
 # abstract mother class Element
 from patternviewer.element.element import Element
 
+# (az, el) grids converted from native grids, shared by all patterns
+AZEL_GRIDS = Cache(maxsize=32)
+
+# peaks of plotted data, shared by all patterns
+PEAKS = Cache(maxsize=64)
+
 
 # Class definition
 # --------------------------------------------------------------------------------------------------
@@ -128,6 +150,20 @@ class AbstractPattern(Element):
         self.interpolated_copol_azgrad = None
         self.interpolated_copol_elgrad = None
 
+        # interpolators of plotted data, per data set and method
+        self._spline = {}
+
+        # plotted data of data sets other than 0, per data set
+        self._plotted = {}
+        # polarisation of the plotted data, True for cross-polarisation
+        self._plotted_cross = False
+
+        # magnitude arrays in dB, per data set and polarisation
+        self._db_cache = Cache()
+
+        # frequency of each data set in GHz, when read with the data
+        self._frequency = []
+
         # read data file
         try:
             self._nb_sets, \
@@ -177,6 +213,7 @@ class AbstractPattern(Element):
                 # already the good orientation
                 pass
             elif x_dec() and y_inc():
+                self.field_changed()
                 # change only x-axis of the grid
                 self._x[set] = self._x[set][::-1, :]
                 self._y[set] = self._y[set][::-1, :]
@@ -184,6 +221,7 @@ class AbstractPattern(Element):
                 if len(self._E_cr):
                     self._E_cr[set] = self._E_cr[set][::-1, :]
             elif x_dec() and y_dec():
+                self.field_changed()
                 # change x and y-axes of the grid
                 self._x[set] = self._x[set][::-1, ::-1]
                 self._y[set] = self._y[set][::-1, ::-1]
@@ -191,6 +229,7 @@ class AbstractPattern(Element):
                 if len(self._E_cr):
                     self._E_cr[set] = self._E_cr[set][::-1, ::-1]
             elif x_inc() and y_dec():
+                self.field_changed()
                 # change only y-axis of the grid
                 self._x[set] = self._x[set][:, ::-1]
                 self._y[set] = self._y[set][:, ::-1]
@@ -204,8 +243,8 @@ class AbstractPattern(Element):
         native format grid.
         """
         for k in range(self._nb_sets):
-            self._longitude[k], self._latitude[k] = self.ll_grid(k)
             self._azimuth[k], self._elevation[k] = self.azel_grid(k)
+            self._longitude[k], self._latitude[k] = self.ll_grid(k)
     # end of function generate_grid
 
     def configure(self, config=None):
@@ -261,12 +300,6 @@ class AbstractPattern(Element):
             # set the data to be plotted according to configuration
             self.set_to_plot(self._use_second_pol)
 
-            # reverse x and y axis if requested
-            if self._revert_x:
-                self._to_plot = self._to_plot[::-1, :]
-            if self._revert_y:
-                self._to_plot = self._to_plot[:, ::-1]
-
             self._isolevel = self.set(self._conf, 'isolevel')
             if self._isolevel is None:
                 max_directivity = np.max(self._to_plot)
@@ -278,48 +311,98 @@ class AbstractPattern(Element):
     # end of function configure
 
     def set_to_plot(self, cross=False):
-        """Set the pattern data to be plotted by the plot method.
+        """Set the pattern data to be plotted by the plot method, i.e. the
+        plotted data of data set 0 (see plotted). Plotted data of the other
+        data sets is computed again at first use.
         """
         utils.trace('in')
 
         # select to plot co or cross
-        if not cross:
-            self._to_plot = self.copol()
+        if cross and self.cross() is None:
+            print('set_to_plot: No crosspol data available. Stick to copol.')
+            cross = False
+        self._plotted_cross = cross
+        self._plotted = {}
+        self.clear_splines()
+        self.process(0)
+
+        utils.trace('out')
+
+    def store_plotted(self, set, z):
+        """Store z as plotted data of data set of index set and forget the
+        interpolators of the set, fitted on previous data.
+        """
+        if set == 0:
+            self._to_plot = z
         else:
-            self._to_plot = self.cross()
-            if self._to_plot is None:
-                print(
-                    'set_to_plot: No crosspol data available. Stick to copol.')
-                self._to_plot = self.copol()
+            self._plotted[set] = z
+        for key in [k for k in self._spline if k[0] == set]:
+            del self._spline[key]
+    # end of method store_plotted
+
+    def process(self, set: int = 0):
+        """Compute and store the plotted data of data set of index set (see
+        plotted). Return the plotted data.
+        """
+        cross = self._plotted_cross
+        self.store_plotted(set, self.cross(set) if cross else self.copol(set))
+        # best server composite of all data sets
+        if set == 0 and self.set(self.configure(), 'composite', False):
+            self.store_plotted(set, self.composite(cross=cross)[0])
         # if shrink option
         if self._shrink:
-            # shrink_copol uses interpolate_copol function that
-            # uses _to_plot attribute
-            self._to_plot = self.shrink_copol(self._azshrink, self._elshrink)
+            # shrink_copol interpolates the data stored above
+            self.store_plotted(set, self.shrink_copol(
+                self._azshrink, self._elshrink, set=set))
         elif self.set(self.configure(), 'expand', False):
-            # expand_copol uses interpolate_copol function that
-            # uses _to_plot attribute
-            self._to_plot = self.expand_copol(self._azshrink, self._elshrink)
+            # expand_copol interpolates the data stored above
+            self.store_plotted(set, self.expand_copol(
+                self._azshrink, self._elshrink, set=set))
+        # reverse x and y axis if requested
+        if self._revert_x:
+            self.store_plotted(set, self.plotted(set)[::-1, :])
+        if self._revert_y:
+            self.store_plotted(set, self.plotted(set)[:, ::-1])
+        return self.plotted(set)
+    # end of method process
+
+    def field(self, set: int = 0, cross: bool = False):
+        """Return complex electric field of data set of index set.
+        cross selects cross-polarisation instead of co-polarisation.
+        """
+        if cross:
+            return self._E_cr[set]
+        return self._E_co[set]
+    # end of function field
+
+    def field_changed(self):
+        """Forget all arrays computed from the complex fields, to be called
+        each time the fields change.
+        """
+        self._db_cache.clear()
+        self._plotted = {}
+        self.clear_splines()
+    # end of method field_changed
 
-        utils.trace('out')
+    def cache_stats(self):
+        """Return hits and misses counters of the magnitude arrays cache.
+        """
+        return self._db_cache.stats()
+    # end of function cache_stats
 
     def copol(self, set: int = 0):
         """Return co-polarisation pattern. In dBi.
         """
-        z = 20.0 * np.log10(np.abs(self._E_co[set]))
-        z[np.where(np.isnan(z))] = -99
-        z[np.where(np.isneginf(z))] = -99
-        return z
+        return self._db_cache.get(('copol', set),
+                                  lambda: todb(self.field(set)))
     # end of function copol
 
     def cross(self, set: int = 0):
         """Return cross-polarisation pattern. In dBi.
         """
         try:
-            z = 20 * np.log10(np.abs(self._E_cr[set]))
-            z[np.where(np.isnan(z))] = -99
-            z[np.where(np.isneginf(z))] = -99
-            return z
+            return self._db_cache.get(('cross', set),
+                                      lambda: todb(self.field(set, True)))
         except IndexError:
             print('cross: This pattern does not have crosspol information.')
             return None
@@ -328,8 +411,14 @@ class AbstractPattern(Element):
     def xpd(self, set: int = 0):
         """Return XPD pattern. In dB.
         """
-        return (20 * np.log10(np.abs(self._E_co[set])) - 20 * np.log10(
-            np.abs(self._E_cr[set])))
+        def compute():
+            z = np.abs(self.field(set))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z /= np.abs(self.field(set, True))
+                np.log10(z, out=z)
+            z *= 20.0
+            return z
+        return self._db_cache.get(('xpd', set), compute)
     # end of function xpd
 
     def satellite(self):
@@ -338,17 +427,75 @@ class AbstractPattern(Element):
         return self._satellite
     # end of function satellite
 
+    def nb_sets(self):
+        """Return the number of data sets.
+        """
+        return self._nb_sets
+    # end of function nb_sets
+
+    def frequency(self, set: int = 0):
+        """Return frequency in GHz of data set of index set, None if
+        unknown. Frequencies not read with the data are looked for in the
+        file header (see fileformat.probe).
+        """
+        if not self._frequency:
+            self._frequency = [None] * self._nb_sets
+            filename = self.set(self._conf, 'filename', None)
+            if isinstance(filename, str):
+                try:
+                    self._frequency = [s['frequency'] for s in
+                                       fileformat.probe(filename)['sets']]
+                except (OSError, ValueError, IndexError):
+                    pass
+        return self._frequency[set]
+    # end of function frequency
+
     def getmax(self, set: int = 0):
-        """Get max directivity value and coordinates.
+        """Get max directivity value and coordinates, refined below the grid
+        step (see peaks).
         """
-        max_value = np.amax(
-            self._to_plot[self._to_plot != np.inf]) + self._conversion_factor
-        max_index = np.argmax(self._to_plot[self._to_plot != np.inf])
-        max_longitude = self.longitude().flatten()[max_index]
-        max_latitude = self.latitude().flatten()[max_index]
-        return max_value, max_longitude, max_latitude
+        main = self.peaks([set], count=0)
+        return main['gain'][0, 0], main['lon'][0, 0], main['lat'][0, 0]
     # end of function getmax
 
+    def peaks(self, sets=None, count: int = 5, size: int = 3):
+        """Return main beam peak and count strongest sidelobes (local maxima
+        of size x size neighbourhoods) of the plotted data of data sets of
+        index in sets (all by default), see peaks.find_peaks.
+        Return a dictionary of (nb sets, count + 1) arrays, main beam peak
+        first: gain (conversion factor included), row and col (fractional
+        grid indices), az, el, lon and lat. Missing peaks are NaN.
+        Sets with the same grid shape are processed at once, results are
+        cached by plotted data.
+        """
+        if sets is None:
+            sets = range(self._nb_sets)
+        sets = list(sets)
+        result = {key: np.full((len(sets), count + 1), np.nan)
+                  for key in ('gain', 'row', 'col', 'az', 'el', 'lon',
+                              'lat')}
+        # group data sets by grid shape
+        groups = {}
+        for i, s in enumerate(sets):
+            groups.setdefault(np.shape(self._x[s]), []).append((i, s))
+        for members in groups.values():
+            index = [i for i, _ in members]
+            z = np.stack([self.plotted(s) for _, s in members])
+            key = fingerprint(z), count, size
+            row, col, gain = PEAKS.get(
+                key, lambda: peaks.find_peaks(z, count, size))
+            result['row'][index] = row
+            result['col'][index] = col
+            result['gain'][index] = gain + self._conversion_factor
+            for k, (i, s) in enumerate(members):
+                for name, grid in (('az', self.azimuth(s)),
+                                   ('el', self.elevation(s)),
+                                   ('lon', self.longitude(s)),
+                                   ('lat', self.latitude(s))):
+                    result[name][i] = peaks.grid_value(grid, row[k], col[k])
+        return result
+    # end of function peaks
+
     def get_isolevel(self):
         """This function is a simple getter for _isolevel attribute.
         """
@@ -394,80 +541,371 @@ class AbstractPattern(Element):
         return self._E_grad_co
     # end of function slope
 
-    def interpolate_copol(self, az, el, set: int = 0, spline=None):
+    def plotted(self, set: int = 0):
+        """Return the plotted data of data set of index set, in dBi. Data
+        set 0 is the one displayed (_to_plot). All data sets get the same
+        processing: polarisation (use_second_pol), shrink or expand, x and y
+        reversal (revert_x, revert_y), in this order. Offsets apply to the
+        grids of all sets (see azimuth, elevation). The best server
+        composite merges all sets, it replaces the data of set 0 only.
+        Data of other sets is computed at first use and kept until the
+        configuration or the fields change.
+        """
+        if set == 0:
+            return self._to_plot
+        if set not in self._plotted:
+            return self.process(set)
+        return self._plotted[set]
+    # end of function plotted
+
+    def composite(self, cross: bool = None, second: bool = False,
+                  reference: int = 0, method: str = 'linear',
+                  chunk: int = 1000000):
+        """Return best server composite of all data sets on the grid of
+        data set of index reference: (best, winner, second_best) with best
+        the maximum gain in dB across sets, winner the index of the set
+        giving it and second_best the second best gain (None unless second
+        is True). cross selects the polarisation, displayed one by default.
+        Sets are processed one by one so that memory stays at a few grids.
+        Sets defined on another grid are interpolated (with method) on the
+        reference grid, and ignored out of their own grid.
+        """
+        utils.trace('in')
+        if cross is None:
+            cross = self._use_second_pol and len(self._E_cr) > 0
+        shape = np.shape(self._x[reference])
+        best = np.full(shape, -np.inf)
+        winner = np.zeros(shape, dtype=int)
+        second_best = np.full(shape, -np.inf) if second else None
+        reference_grid = fingerprint(self._x[reference], self._y[reference])
+        # reference grid points in native coordinates
+        x, y = self.azel2xy(*self.azel_grid(reference))
+        for s in range(self._nb_sets):
+            gain = todb(self.field(s, cross))
+            if fingerprint(self._x[s], self._y[s]) != reference_grid:
+                x_axis, y_axis, gain = self.native_axes(gain, s)
+                interpolator = GridInterpolator(x_axis, y_axis, gain,
+                                                method=method)
+                gain = evaluate(interpolator, x, y, chunk)
+                outside = (x < x_axis[0]) | (x > x_axis[-1]) | \
+                    (y < y_axis[0]) | (y > y_axis[-1])
+                gain[outside] = -np.inf
+            better = gain > best
+            if second:
+                # previous best is second where the set wins
+                np.maximum(second_best, np.where(better, best, gain),
+                           out=second_best)
+            winner[better] = s
+            np.maximum(best, gain, out=best)
+        utils.trace('out')
+        return best, winner, second_best
+    # end of function composite
+
+    def native_axes(self, z, set: int = 0, clean: bool = True):
+        """Return (x, y, z) of data z defined on the native grid of data set
+        of index set, with increasing x and y vectors and z[i, j] the value
+        at (x[i], y[j]). Trailing axes of z are kept as is.
+        If clean is True, NaN and -inf values are replaced by -99.
+        """
+        if self._x[set][0, 0] == self._x[set][1, 0]:
+            x = self._x[set][0, :]
+            y = self._y[set][:, 0]
+            z = np.swapaxes(z, 0, 1)
+        else:
+            x = self._x[set][:, 0]
+            y = self._y[set][0, :]
+        if x[0] > x[1]:
+            x = x[::-1]
+            z = z[::-1, :]
+        if y[0] > y[1]:
+            y = y[::-1]
+            z = z[:, ::-1]
+        if clean:
+            # remove NaN and inf
+            z = np.where(np.isnan(z) | np.isneginf(z), -99, z)
+        return x, y, z
+    # end of function native_axes
+
+    def fit_spline(self, z, set: int = 0):
+        """Return a RectBivariateSpline fitted on data z defined on the native
+        grid of data set of index set.
+        """
+        return interp.RectBivariateSpline(*self.native_axes(z, set))
+    # end of function fit_spline
+
+    def copol_interpolator(self, set: int = 0, method: str = 'spline'):
+        """Return the interpolator of the plotted data of data set of index
+        set. method is either 'spline' (default, most accurate) or one of the
+        regular grid direct-index methods 'nearest', 'linear' or 'cubic'.
+        The interpolator is created once and reused until the plotted
+        data change.
+        """
+        if (set, method) not in self._spline:
+            if method == 'spline':
+                interpolator = self.fit_spline(self.plotted(set), set)
+            else:
+                interpolator = GridInterpolator(
+                    *self.native_axes(self.plotted(set), set), method=method)
+            self._spline[(set, method)] = interpolator
+        return self._spline[(set, method)]
+    # end of function copol_interpolator
+
+    def copol_spline(self, set: int = 0):
+        """Return the interpolation spline of the plotted data of data set
+        of index set. The spline is fitted once and reused until the plotted
+        data change.
+        """
+        return self.copol_interpolator(set, 'spline')
+    # end of function copol_spline
+
+    def clear_splines(self):
+        """Forget interpolators, to be called each time the plotted
+        data change.
+        """
+        self._spline = {}
+    # end of method clear_splines
+
+    def interpolate_copol(self, az, el, set: int = 0, spline=None,
+                          method: str = 'spline', chunk: int = None):
         """Return interpolated value of the pattern.
         The spline object is also returned for reuse.
+        method selects the interpolator when spline is not provided (see
+        copol_interpolator) and chunk is the maximum number of points
+        evaluated at once.
         """
 
         if spline is None:
-            if self._x[set][0, 0] == self._x[set][1, 0]:
-                x = self._x[set][0, :]
-                y = self._y[set][:, 0]
-                z = self._to_plot.T
-            else:
-                x = self._x[set][:, 0]
-                y = self._y[set][0, :]
-                z = self._to_plot
-            if x[0] > x[1]:
-                x = x[::-1]
-                z = z[::-1, :]
-            if y[0] > y[1]:
-                y = y[::-1]
-                z = z[:, ::-1]
-            # remove NaN and inf
-            z[np.where(np.isnan(z))] = -99
-            z[np.where(np.isneginf(z))] = -99
-            spline = interp.RectBivariateSpline(x, y, z)
+            spline = self.copol_interpolator(set, method)
 
         # transform azel into native coordinates
         x, y = self.azel2xy(az, el)
 
         # prepare results for return statement
-        a, b = np.reshape(spline.ev(x.flatten(), y.flatten()),
-                          np.array(az).shape), spline
+        a, b = np.reshape(evaluate(spline, x, y, chunk),
+                          np.shape(az)), spline
 
         return a, b
     # end of function interpolate_copol
 
+    def interpolate_gradient(self, az, el, set: int = 0, spline=None):
+        """Return interpolated gradient (dG/daz, dG/del) of the pattern
+        in dB/deg. Analytic derivatives of the interpolation spline are
+        combined with the Jacobian of the native to (az, el) conversion.
+        """
+        if spline is None:
+            spline = self.copol_spline(set)
+        az = np.asarray(az, dtype=float)
+        el = np.asarray(el, dtype=float)
+
+        # derivatives along native coordinates
+        x, y = self.azel2xy(az, el)
+        x = np.ravel(x)
+        y = np.ravel(y)
+        grad_x = spline.ev(x, y, dx=1)
+        grad_y = spline.ev(x, y, dy=1)
+
+        if self.grid_type() == 3:
+            grad_az, grad_el = grad_x, grad_y
+        else:
+            # Jacobian of the coordinates conversion, the conversion is
+            # analytic so central differences are exact to O(h**2)
+            h = 1e-3
+            x_az1, y_az1 = self.azel2xy(az + h, el)
+            x_az0, y_az0 = self.azel2xy(az - h, el)
+            x_el1, y_el1 = self.azel2xy(az, el + h)
+            x_el0, y_el0 = self.azel2xy(az, el - h)
+            grad_az = (grad_x * np.ravel(x_az1 - x_az0)
+                       + grad_y * np.ravel(y_az1 - y_az0)) / (2 * h)
+            grad_el = (grad_x * np.ravel(x_el1 - x_el0)
+                       + grad_y * np.ravel(y_el1 - y_el0)) / (2 * h)
+
+        return np.reshape(grad_az, az.shape), np.reshape(grad_el, az.shape)
+    # end of function interpolate_gradient
+
+    def station_slope(self, lon, lat, set: int = 0):
+        """Return pattern gradient (dG/daz, dG/del) in dB/deg for stations
+        defined with longitude and latitude vectors.
+        """
+        az, el = self.lonlat2azel(lon, lat)
+        return self.interpolate_gradient(az, el, set)
+    # end of function station_slope
+
+    def resampler(self, az, el, set: int = 0, method: str = 'linear',
+                  cache: bool = True):
+        """Return the Resampler from the native grid of data set of index
+        set to the (az, el) points. Resamplers are shared by all patterns
+        with the same grid and target points, unless cache is False (see
+        resample.get_resampler).
+        """
+        x_grid, y_grid, _ = self.native_axes(self._x[set], set, clean=False)
+        x, y = self.azel2xy(az, el)
+        return get_resampler(x_grid, y_grid, x, y, method, cache)
+    # end of function resampler
+
+    def resample(self, az, el, sets=None, method: str = 'linear',
+                 cache: bool = True):
+        """Return plotted data of data sets of index in sets (all by default)
+        resampled at (az, el) points. Result shape is az shape followed by
+        the number of sets. Sets sharing the same grid are resampled with a
+        single sparse matrix product. cache is False for points used once,
+        e.g. chunks of a large target (see resample.get_resampler).
+        """
+        if sets is None:
+            sets = range(self._nb_sets)
+        sets = list(sets)
+        result = np.empty(np.shape(az) + (len(sets),))
+        # group data sets by grid
+        groups = {}
+        for i, s in enumerate(sets):
+            key = fingerprint(self._x[s], self._y[s])
+            groups.setdefault(key, []).append((i, s))
+        for members in groups.values():
+            index = [i for i, _ in members]
+            data = np.stack([self.native_axes(self.plotted(s), s)[2]
+                             for _, s in members], axis=-1)
+            resampler = self.resampler(az, el, members[0][1], method,
+                                       cache)
+            result[..., index] = resampler.resample(data)
+        return result
+    # end of function resample
+
+    def station_gains(self, lon, lat, sets=None, method: str = 'linear'):
+        """Return plotted data (conversion factor included) of data sets of
+        index in sets (all by default) at stations (lon, lat). Result shape
+        is lon shape followed by the number of sets, stations which do not
+        see the satellite are NaN.
+        """
+        az, el = self.lonlat2azel(np.asarray(lon, dtype=float),
+                                  np.asarray(lat, dtype=float))
+        return self.resample(az, el, sets, method) + self._conversion_factor
+    # end of function station_gains
+
+    def polygon_statistics(self, polygons, sets=None,
+                           percentiles=polygonmask.DEFAULT_PERCENTILES):
+        """Return statistics of the plotted gain (conversion factor
+        included) of data sets of index in sets (all by default) inside each
+        polygon, see polygonmask.statistics. Arrays have shape
+        (nb polygons, nb sets). Sets sharing the same grid share the
+        polygon masks.
+        """
+        if sets is None:
+            sets = range(self._nb_sets)
+        sets = list(sets)
+        result = {}
+        # group data sets by grid
+        groups = {}
+        for i, s in enumerate(sets):
+            key = fingerprint(self.longitude(s), self.latitude(s))
+            groups.setdefault(key, []).append((i, s))
+        for members in groups.values():
+            index = [i for i, _ in members]
+            gains = np.stack([self.plotted(s) for _, s in members],
+                             axis=-1) + self._conversion_factor
+            first = members[0][1]
+            stats = polygonmask.statistics(polygons, gains,
+                                           self.longitude(first),
+                                           self.latitude(first), percentiles)
+            for key, value in stats.items():
+                if value.ndim == 1:
+                    result[key] = value
+                    continue
+                if key not in result:
+                    result[key] = np.empty((len(polygons), len(sets)))
+                result[key][:, index] = value
+        return result
+    # end of function polygon_statistics
+
+    def fields(self, set: int = 0, cross: bool = False, laws=None):
+        """Return (nx, ny, nb layers) stack of complex fields of data set of
+        index set. A single pattern has one layer, laws is only used by
+        beamformed patterns (see MultiGrd.fields).
+        """
+        return np.asarray(self.field(set, cross))[..., None]
+    # end of function fields
+
+    def efficiency(self, sets=None, laws=None):
+        """Return integrals of the radiated power (co and cross
+        polarisation) of data sets of index in sets (all by default), and of
+        each excitation law for beamformed patterns, over the native grid
+        (see quadrature.solid_angles).
+        Return a dictionary of (nb sets, nb layers) arrays: grid (fraction
+        of the isotropic power radiated in the grid), earth (fraction
+        radiated towards the Earth disc seen from the satellite) and
+        normalisation (dB to add to the gain for the grid to radiate all
+        the power). Sets sharing the same grid share the weights and the
+        Earth mask, all layers are integrated at once.
+        """
+        if sets is None:
+            sets = range(self._nb_sets)
+        sets = list(sets)
+        result = {}
+        # group data sets by grid
+        groups = {}
+        for i, s in enumerate(sets):
+            key = fingerprint(self._x[s], self._y[s])
+            groups.setdefault(key, []).append((i, s))
+        for members in groups.values():
+            index = [i for i, _ in members]
+            first = members[0][1]
+            weights = quadrature.solid_angles(self._x[first], self._y[first],
+                                              self.grid_type())
+            earth = quadrature.earth_disc(*self.satellite_azel(first),
+                                          self._satellite.altitude())
+            power = []
+            for _, s in members:
+                p = np.abs(self.fields(s, False, laws)) ** 2
+                try:
+                    p = p + np.abs(self.fields(s, True, laws)) ** 2
+                except IndexError:
+                    # no cross-polarisation information
+                    pass
+                power.append(p)
+            # (nx, ny, nb sets, nb layers)
+            power = np.stack(power, axis=2) / (4 * np.pi)
+            for name, mask in (('grid', None), ('earth', earth)):
+                if name not in result:
+                    result[name] = np.empty((len(sets), power.shape[-1]))
+                result[name][index] = quadrature.integrate(power, weights,
+                                                           mask)
+        with np.errstate(divide='ignore'):
+            result['normalisation'] = -10 * np.log10(result['grid'])
+        return result
+    # end of function efficiency
+
+    def normalised_gain(self, set: int = 0, laws=None, cross: bool = False):
+        """Return (nx, ny, nb layers) gain in dB of data set of index set
+        (and of each excitation law for beamformed patterns) normalised so
+        that the power radiated over the native grid is the isotropic power.
+        """
+        normalisation = self.efficiency([set], laws)['normalisation'][0]
+        return todb(self.fields(set, cross, laws)) + normalisation
+    # end of function normalised_gain
+
     def interpolate_slope(self, az, el, set: int = 0, spline=None):
         """return interpolated value of the pattern
         """
         utils.trace('in')
         if spline is None:
-            if self._x[set][0, 0] == self._x[set][1, 0]:
-                x = self._x[set][0, :]
-                y = self._y[set][:, 0]
-                z = self.slope(set).T
-            else:
-                x = self._x[set][:, 0]
-                y = self._y[set][0, :]
-                z = self.slope(set)
-            if x[0] > x[1]:
-                x = x[::-1]
-                z = z[::-1, :]
-            if y[0] > y[1]:
-                y = y[::-1]
-                z = z[:, ::-1]
-            z[np.where(np.isnan(z))] = -99
-            z[np.where(np.isneginf(z))] = -99
-            spline = interp.RectBivariateSpline(x, y, z)
+            spline = self.fit_spline(self.slope(set), set)
 
         # transform azel into native coordinates
         x, y = self.azel2xy(az, el)
 
         # prepare results for return statement
-        a, b = np.reshape(spline.ev(x.flatten(), y.flatten()),
-                          np.array(az).shape), spline
+        a, b = np.reshape(spline.ev(np.ravel(x), np.ravel(y)),
+                          np.shape(az)), spline
 
         utils.trace('out')
         return a, b
     # end of function interpolate_slope
 
     def shrinkextend(self, shrink, azshrink, elshrink, az_co=[], el_co=[],
-                     step=None, set: int = 0):
+                     step=None, set: int = 0, z=None):
         """Shrink pattern using an elliptical beam pointing error.
         This function compute the pattern with different pointing error and
         keep the minimum directivity for each station.
+        z is the data in dB to shrink, defined on the native grid of data set
+        of index set, the plotted data by default.
         """
         utils.trace('in')
         # Create azel meshgrid (rectangular grid)
@@ -509,32 +947,24 @@ class AbstractPattern(Element):
             az_co = self.azimuth(set)
         if not len(el_co):
             el_co = self.elevation(set)
-        az_co = az_co.flatten()
-        el_co = el_co.flatten()
-        co = []
-
-        # create interpolation object, and create shrunk pattern
-        _, spline = self.interpolate_copol(az_co[0], el_co[0], set)
-
-        def depointmin(az_co, el_co):
-            depointed_copol, _ = self.interpolate_copol(az_co + az_depointing,
-                                                        el_co + el_depointing,
-                                                        set, spline)
-            depointed_copol = depointed_copol[~np.isnan(depointed_copol)]
-            return np.min(depointed_copol)
-
-        def depointmax(az_co, el_co):
-            depointed_copol, _ = self.interpolate_copol(az_co + az_depointing,
-                                                        el_co + el_depointing,
-                                                        set, spline)
-            depointed_copol = depointed_copol[~np.isnan(depointed_copol)]
-            return np.max(depointed_copol)
-
-        if shrink is True:
-            co = np.vectorize(depointmin)(az_co, el_co)
+        shape = np.shape(az_co)
+        az_co = np.ravel(az_co)
+        el_co = np.ravel(el_co)
+
+        # create interpolation object, and create shrunk pattern: all points
+        # are depointed at once, one depointing at a time, keeping the
+        # minimum (or maximum) ignoring NaN
+        if z is None:
+            spline = self.copol_spline(set)
         else:
-            co = np.vectorize(depointmax)(az_co, el_co)
-        co = np.reshape(co, self.azimuth().shape)
+            spline = self.fit_spline(z, set)
+        keep = np.fmin if shrink is True else np.fmax
+        co = np.full(len(az_co), np.nan)
+        for az_depointed, el_depointed in zip(az_depointing, el_depointing):
+            depointed_copol, _ = self.interpolate_copol(
+                az_co + az_depointed, el_co + el_depointed, set, spline)
+            keep(co, depointed_copol, out=co)
+        co = np.reshape(co, shape)
 
         utils.trace('out')
         # return result pattern
@@ -542,25 +972,92 @@ class AbstractPattern(Element):
     # end of function shrinkextend_copol
 
     def shrink_copol(self, azshrink, elshrink, az_co=[], el_co=[],
-                     step=None, set: int = 0):
+                     step=None, set: int = 0, z=None):
         """Shrink pattern using an elliptical beam pointing error.
         This function compute the pattern with different pointing error and
         keep the minimum directivity for each station.
         """
         shrink = True
         return self.shrinkextend(shrink, azshrink, elshrink, az_co, el_co,
-                                 step, set)
+                                 step, set, z)
     # end of function shrink_copol
 
     def expand_copol(self, azshrink, elshrink, az_co=[], el_co=[],
-                     step=None, set: int = 0):
+                     step=None, set: int = 0, z=None):
         """Expand pattern using an elliptical beam pointing error.
         This function compute the pattern with different pointing error and
         keep the maximum directivity for each station.
         """
         shrink = False
         return self.shrinkextend(shrink, azshrink, elshrink, az_co, el_co,
-                                 step, set)
+                                 step, set, z)
+
+    def pointing_loss(self, lon, lat, covariance, percentiles=(50, 90, 99),
+                      order: int = 10, nb_samples: int = 4096, seed: int = 0,
+                      set: int = 0):
+        """Return gain loss statistics at stations under a Gaussian pointing
+        error.
+        lon, lat are the stations coordinates vectors
+        covariance is the 2x2 (az, el) covariance matrix of the pointing
+            error in square degrees, or a stack of them, one per station
+        percentiles are the percentiles of the loss to be computed
+        order is the number of Gauss-Hermite nodes per axis used for
+            the mean and standard deviation
+        nb_samples is the number of random depointings used for percentiles
+        The returned dictionary contains the nominal gain and the mean,
+        standard deviation and percentiles of the loss (positive in dB).
+        """
+        utils.trace('in')
+        az, el = self.lonlat2azel(np.ravel(lon), np.ravel(lat))
+        # square root of covariance: eigen decomposition is used instead of
+        # Cholesky to accept singular matrices (e.g. error along one axis)
+        eigval, eigvec = np.linalg.eigh(np.asarray(covariance, dtype=float))
+        root = eigvec * np.sqrt(np.clip(eigval, 0, None))[..., None, :]
+
+        # tensor Gauss-Hermite rule of the normal standard 2D distribution
+        nodes, weights = np.polynomial.hermite.hermgauss(order)
+        node_az, node_el = np.meshgrid(nodes, nodes)
+        quad_nodes = np.sqrt(2) * np.stack((node_az.ravel(),
+                                            node_el.ravel()), axis=-1)
+        quad_weights = np.outer(weights, weights).ravel() / np.pi
+        # common random numbers for all stations
+        rand_nodes = np.random.default_rng(seed).standard_normal(
+            (nb_samples, 2))
+
+        spline = self.copol_spline(set)
+
+        def depointed(nodes):
+            """Return (nb stations, nb nodes) gain for depointings
+            nodes * root.T around each station.
+            """
+            depointing = np.einsum('...ij,mj->...mi', root, nodes)
+            gain = np.empty((len(az), len(nodes)))
+            # bound memory of the evaluation
+            step = max(1, 1000000 // len(nodes))
+            for start in range(0, len(az), step):
+                stop = start + step
+                offsets = depointing if depointing.ndim == 2 \
+                    else depointing[start:stop]
+                gain[start:stop], _ = self.interpolate_copol(
+                    az[start:stop, None] + offsets[..., 0],
+                    el[start:stop, None] + offsets[..., 1],
+                    set, spline)
+            return gain
+
+        nominal, _ = self.interpolate_copol(az, el, set, spline)
+        loss = nominal[:, None] - depointed(quad_nodes)
+        mean = loss @ quad_weights
+        std = np.sqrt(np.clip((loss - mean[:, None]) ** 2 @ quad_weights,
+                              0, None))
+        loss = nominal[:, None] - depointed(rand_nodes)
+        quantiles = np.percentile(loss, percentiles, axis=1)
+
+        utils.trace('out')
+        return {'nominal': nominal,
+                'mean': mean,
+                'std': std,
+                'percentiles': dict(zip(percentiles, quantiles))}
+    # end of function pointing_loss
 # ==================================================================================================
 
 # grid conversion functions and getters
@@ -568,9 +1065,13 @@ class AbstractPattern(Element):
     def azel_grid(self, set: int = 0):
         """This function convert grid format to azimuth elevation.
         set is the data set to be used
+        The conversion depends only on the native grid (including its
+        rotation and orientation) and the grid type: it is computed once and
+        the read-only result is shared by all data sets and patterns with
+        the same native grid.
         """
         def id(x, y):
-            return x, y
+            return np.array(x, dtype=float), np.array(y, dtype=float)
 
         convert = {1: ang.uv2azel,
                    2: ang.thetaphi2azel,
@@ -578,7 +1079,14 @@ class AbstractPattern(Element):
                    4: ang.elovaz2azel,
                    5: ang.azovel2azel}
 
-        return convert[self.grid_type()](self._x[set], self._y[set])
+        def compute():
+            az, el = convert[self.grid_type()](self._x[set], self._y[set])
+            az.flags.writeable = False
+            el.flags.writeable = False
+            return az, el
+
+        key = self.grid_type(), fingerprint(self._x[set], self._y[set])
+        return AZEL_GRIDS.get(key, compute)
     # end of function azel_grid
 
     def azel2xy(self, az, el):
@@ -597,9 +1105,9 @@ class AbstractPattern(Element):
         return convert[self.grid_type()](az, el)
     # end of function azel2xy
 
-    def ll_grid(self, set: int = 0):
-        """Return (longitude, latitude) grid converted from (az, el) grid.
-        set is the data set to be used
+    def satellite_azel(self, set: int = 0):
+        """Return (az, el) grid of data set of index set in the satellite
+        frame: pattern offset and satellite yaw are applied.
         """
         # Get azel grid
         az, el = self.azel_grid(set)
@@ -616,9 +1124,9 @@ class AbstractPattern(Element):
             az_offset = 0
             el_offset = 0
 
-        # apply offset
-        az += az_offset
-        el += el_offset
+        # apply offset (az, el grid is shared, do not modify in place)
+        az = az + az_offset
+        el = el + el_offset
         # rotate azel grid
         yaw_deg = self.set(conf=self.configure(), key='sat_yaw', fallback=0.0)
         yaw_rad = yaw_deg * cst.DEG2RAD
@@ -628,6 +1136,14 @@ class AbstractPattern(Element):
             el_origin * np.sin(-1 * yaw_rad)
         el = az_origin * np.sin(-1 * yaw_rad) + \
             el_origin * np.cos(-1 * yaw_rad)
+        return az, el
+    # end of function satellite_azel
+
+    def ll_grid(self, set: int = 0):
+        """Return (longitude, latitude) grid converted from (az, el) grid.
+        set is the data set to be used
+        """
+        az, el = self.satellite_azel(set)
 
         x = self._satellite.altitude() * np.tan((az) * cst.DEG2RAD)
         y = self._satellite.altitude() * np.tan((el) * cst.DEG2RAD)
@@ -694,6 +1210,7 @@ class AbstractPattern(Element):
     def revert_x(self, set=0):
         """Revert pattern along x axis.
         """
+        self.field_changed()
         self._E_co[set] = self._E_co[set][::-1, :]
         if len(self._E_cr):
             self._E_cr[set] = self._E_cr[set][::-1, :]
@@ -702,6 +1219,7 @@ class AbstractPattern(Element):
     def revert_y(self, set: int = 0):
         """Revert pattern along y axis.
         """
+        self.field_changed()
         self._E_co[set] = self._E_co[set][:, ::-1]
         if len(self._E_cr):
             self._E_cr[set] = self._E_cr[set][:, ::-1]
@@ -731,13 +1249,12 @@ class AbstractPattern(Element):
         return self._latitude[set]
     # end of function latitude
 
-    def directivity(self, lon, lat):
-        """Return directivity for a vector of stations defined with
-        longitude and latitude.
+    def lonlat2azel(self, lon, lat):
+        """Return (az, el) pattern coordinates of stations defined with
+        longitude and latitude vectors. Satellite yaw and pattern offset
+        are taken into account. Stations which do not see the satellite
+        are NaN.
         """
-        if np.isnan(lon) or np.isnan(lat):
-            return None
-
         # get projection
         self.proj = prj.Proj(
             init=('epsg:4326 +proj=nsper'
@@ -768,6 +1285,10 @@ class AbstractPattern(Element):
             np.arctan2(x, self._satellite.altitude())
         el = cst.RAD2DEG * \
             np.arctan2(y, self._satellite.altitude())
+        # stations beyond the Earth limb are projected to infinity
+        visible = np.isfinite(x) & np.isfinite(y)
+        az = np.where(visible, az, np.nan)
+        el = np.where(visible, el, np.nan)
 
         # rotate back azel grid
         yaw_deg = self.set(conf=self.configure(), key='sat_yaw', fallback=0.0)
@@ -782,6 +1303,18 @@ class AbstractPattern(Element):
         # remove offset
         az -= az_offset
         el -= el_offset
+        return az, el
+    # end of function lonlat2azel
+
+    def directivity(self, lon, lat):
+        """Return directivity for a vector of stations defined with
+        longitude and latitude.
+        """
+        if np.isscalar(lon) and (np.isnan(lon) or np.isnan(lat)):
+            return None
+
+        # get az el vector
+        az, el = self.lonlat2azel(lon, lat)
 
         # get directivity vector
         gain, _ = self.interpolate_copol(az, el)
@@ -969,34 +1502,28 @@ class AbstractPattern(Element):
         utils.trace('out')
 
     def export_to_file(self, filename: str, shrunk: bool = False,
-                       set: int = 0):
-        """Export this pattern to .pat file.
+                       set: int = None, expand: bool = None):
+        """Export this pattern to .pat or .grd file, depending on filename
+        extension (.pat by default). Files whose name ends with .gz are
+        gzip compressed.
         filename is the target filename
         shrunk is a boolean specifying if the output pattern should be shrunk
-        set is the index of the data set to use
+        (or expanded if so configured)
+        set is the index of the data set to export, all sets by default
+        expand selects expansion instead of shrink, as configured by default
+        Fields are exported as plotted (see plotted): the plotted
+        polarisation is written as co-polarisation, x and y reversal apply.
+        Shrink (or expand) applies only if shrunk is True.
         """
         utils.trace('in')
-        # open file and read text data
-        file = open(filename, "w")
-
-        file.write('File generated by GrdViewer\n')
-
-        # end of comment section
-        file.write("++++0020\n")
-
-        # format of file
-        ny, nx = self._x[set].shape
-        file.write(
-            "  {nset:d}, 0, 1, 3, {nx:d}, {ny:d}, 0, 1\n".format(
-                nset=self._nb_sets,
-                nx=nx,
-                ny=ny))
-
-        # limits of grid
-        xs = np.min(self.azimuth(set)) * cst.DEG2RAD
-        xe = np.max(self.azimuth(set)) * cst.DEG2RAD
-        ys = np.min(self.elevation(set)) * cst.DEG2RAD
-        ye = np.max(self.elevation(set)) * cst.DEG2RAD
+        sets = range(self._nb_sets) if set is None else [set]
+        grd = fileformat.file_extension(filename) == '.grd'
+        cross = len(self._E_cr) > 0
+        # plotted polarisation is written as co-polarisation
+        swap = cross and self._plotted_cross
+        if expand is None:
+            expand = not self._shrink and self.set(self.configure(),
+                                                   'expand', False)
 
         # recompute boresight
         if self._offset:
@@ -1007,49 +1534,105 @@ class AbstractPattern(Element):
                 az_offset, el_offset = \
                     self.compute_azel_boresight(self._azimuth_offset,
                                                 self._elevation_offset)
-            x_offset = az_offset * cst.DEG2RAD
-            y_offset = el_offset * cst.DEG2RAD
         else:
-            x_offset = 0
-            y_offset = 0
-
-        file.write("  {xs:0.10f}, {ys:0.10f}, {xe:0.10f}, {ye:0.10f}\n".format(
-            xs=xs + x_offset,
-            ys=ys + y_offset,
-            xe=xe + x_offset,
-            ye=ye + y_offset))
-        x = np.linspace(xs, xe, nx)
-        y = np.linspace(ys, ye, ny)
-        x, y = np.meshgrid(x, y)
-        x = x * cst.RAD2DEG
-        y = y * cst.RAD2DEG
-
-        # white line
-        file.write(" \n")
-
-        # beam center
-        file.write(" 0, 0\n")
-        # Frequency
-        file.write("1\n")
-
-        # write pattern data
-        if shrunk:
-            co_to_write = self.shrink_copol(azshrink=self._azshrink,
-                                            elshrink=self._elshrink,
-                                            az_co=x, el_co=y, set=set)
-        else:
-            co_to_write, _ = self.interpolate_copol(x, y, set)
-
-        for j in range(ny):
-            for i in range(nx):
-                file.write('{co:8.3f} {cross:8.3f}\n'.format(
-                    co=co_to_write[j][i],
-                    cross=0.0))
+            az_offset = 0
+            el_offset = 0
 
-        # close file
-        file.close()
+        def limits(s):
+            """Return (xs, ys, xe, ye) of the exported grid of set s, in
+            (az, el) for .grd files and (az over el, el) for .pat files.
+            """
+            x, y = self.azimuth(s), self.elevation(s)
+            if not grd:
+                x, y = ang.azel2azovel(x, y)
+            return np.min(x), np.min(y), np.max(x), np.max(y)
+
+        if not grd:
+            # .pat files have one grid for all beams
+            bounds = np.array([limits(s) for s in sets])
+            common = np.concatenate((bounds[:, :2].min(axis=0),
+                                     bounds[:, 2:].max(axis=0)))
+
+        co_to_write = []
+        cr_to_write = []
+        grid_limits = []
+        for s in sets:
+            xs, ys, xe, ye = limits(s) if grd else common
+            # same number of points as the native grid along each axis
+            x_axis, y_axis, _ = self.native_axes(self._x[s], s, clean=False)
+            nx, ny = len(x_axis), len(y_axis)
+            x, y = np.meshgrid(np.linspace(xs, xe, nx),
+                               np.linspace(ys, ye, ny))
+            if grd:
+                az, el = x, y
+            else:
+                az, el = ang.azovel2azel(x, y)
+
+            # co and cross complex fields as plotted: polarisation and x/y
+            # reversal (see process)
+            fields = [self.field(s, swap)]
+            if cross:
+                fields.append(self.field(s, not swap))
+            fields = np.stack(fields, axis=-1)
+            if self._revert_x:
+                fields = fields[::-1, :]
+            if self._revert_y:
+                fields = fields[:, ::-1]
+            if shrunk:
+                # shrunk (or expanded, as in process) magnitude of the
+                # field whose phase is written
+                co_db = self.shrinkextend(not expand, self._azshrink,
+                                          self._elshrink, az, el, set=s,
+                                          z=todb(fields[..., 0]))
+            # resample co and cross complex fields at once
+            _, _, fields = self.native_axes(fields, s, clean=False)
+            fields = self.resampler(az, el, s, 'cubic',
+                                    cache=False).resample(fields)
+            co = fields[..., 0]
+            if shrunk:
+                # keep phase, replace magnitude
+                co = np.power(10, co_db / 20) * np.exp(1j * np.angle(co))
+            co_to_write.append(co)
+            if cross:
+                cr_to_write.append(fields[..., 1])
+            grid_limits.append((xs + az_offset, ys + el_offset,
+                                xe + az_offset, ye + el_offset))
+
+        if grd:
+            # 5: Elevation and Azimuth grid
+            fileformat.write_grd(filename, 5, grid_limits, co_to_write,
+                                 cr_to_write if cross else None)
+        else:
+            # 3: az over el grid, limits in radians
+            fileformat.write_pat(filename, 3,
+                                 np.array(grid_limits[0]) * cst.DEG2RAD,
+                                 co_to_write, cr_to_write if cross else None)
         utils.trace('out')
     # end of function export_to_file
+
+    def export_contours(self, filename: str, levels=None, sets=None,
+                        tolerance: float = 0.0):
+        """Export (lon, lat) isolevel contours of data sets of index in sets
+        (all by default) at levels (isolevels by default) to filename,
+        .gxt, .geojson (or .json) or .kml file. tolerance is the
+        simplification tolerance in degrees.
+        """
+        utils.trace('in')
+        lines = contour.pattern_contours(self, levels, sets,
+                                         tolerance=tolerance)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.basename(str(self._filename))
+        if extension == '.gxt':
+            contour.write_gxt(filename, lines)
+        elif extension in ('.geojson', '.json'):
+            contour.write_geojson(filename, lines, name)
+        elif extension == '.kml':
+            contour.write_kml(filename, lines, name)
+        else:
+            utils.trace('out')
+            raise ValueError('Unknown contour file format: ' + filename)
+        utils.trace('out')
+    # end of method export_contours
 # ==================================================================================================
 
 # Mandatory functions and methods to be implemented
@@ -1091,6 +1674,21 @@ class AbstractPattern(Element):
 # end of class AbstractPattern
 
 
+def todb(field):
+    """Return magnitude of complex field in dB (20 * log10(|field|)).
+    Undefined values (NaN and null field) are set to -99 dB.
+    The computation is done in place on the magnitude array.
+    """
+    z = np.abs(field)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.log10(z, out=z)
+    z *= 20.0
+    # NaN and -inf are the only values not greater than -inf
+    np.copyto(z, -99.0, where=~(z > -np.inf))
+    return z
+# end of function todb
+
+
 class PatternNotCreatedError(Exception):
     """Exception to flag something went wrong when creating pattern
     """
@@ -205,7 +205,8 @@ class PatternControler():
                                         directory=os.path.join(
                                             directory,
                                             default_filename),
-                                        filter='pattern file (*.pat)')
+                                        filter='pattern file (*.pat *.grd'
+                                        ' *.pat.gz *.grd.gz)')
         # get pattern to export
         if filename:
             self._pattern.export_to_file(
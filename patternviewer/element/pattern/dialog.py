@@ -157,10 +157,12 @@ class PatternDialog(QDialog):
         self.chkslope = QCheckBox('Display Slope', parent=self)
         self.chkslope.stateChanged.connect(self.chk_display_slope_changed)
         self.chksurf = QCheckBox('Color surface', parent=self)
+        self.chkcomposite = QCheckBox('Best beam', parent=self)
         optionbox = QGridLayout(None)
         optionbox.addWidget(self.chkxpol, 1, 1)
         optionbox.addWidget(self.chkslope, 1, 2)
         optionbox.addWidget(self.chksurf, 1, 3)
+        optionbox.addWidget(self.chkcomposite, 1, 4)
         vbox.addLayout(optionbox)
 
         # add offset sub form
@@ -321,6 +323,8 @@ class PatternDialog(QDialog):
         self.chk_offset.setChecked(pattern._offset)
         self.chksurf.setChecked(pattern.set(
             pattern.configure(), 'Color surface', False))
+        self.chkcomposite.setChecked(pattern.set(
+            pattern.configure(), 'composite', False))
         if pattern._shrink:
             self.azfield.setText(str(pattern._azshrink))
             self.elfield.setText(str(pattern._elshrink))
@@ -433,6 +437,7 @@ class PatternDialog(QDialog):
                                   self.isolevel_field.text().split(',')]
         config['cf'] = float(self.cf_field.text())
         config['Color surface'] = self.chksurf.isChecked()
+        config['composite'] = self.chkcomposite.isChecked()
 
         self._patternctlr.configure(config=config)
 
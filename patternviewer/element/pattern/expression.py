@@ -0,0 +1,385 @@
+"""This module provides arithmetic on loaded patterns.
+An expression such as "max(A, B) - C" is parsed into a lazy graph whose
+operands are data sets of AbstractPattern objects. Nothing is computed until
+the result is requested: operands are then resampled once on the grid of a
+reference data set (with the shared sparse resamplers) and the operations
+are evaluated by chunks of points. Values of all nodes are cached by content
+so that sub-expressions shared by several expressions are computed once.
+The result can be displayed as any pattern with ExpressionPattern.
+
+Example:
+    e = expr('psum(A, B) - C', A=pattern1, B=(pattern1, 1), C=pattern2)
+    gain = e.evaluate()
+    pattern = e.pattern(parent=controler)
+"""
+
+# parse expressions with python grammar
+import ast
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# debug
+import patternviewer.utils as utils
+# memoization of computed arrays
+from patternviewer.cache import Cache, fingerprint
+# abstract pattern class
+from patternviewer.element.pattern.abstractpattern import AbstractPattern
+
+
+def power_sum(*values):
+    """Return power sum in dB of values in dB.
+    """
+    total = np.zeros(np.broadcast(*values).shape)
+    for v in values:
+        total += np.power(10.0, np.divide(v, 10))
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(total)
+# end of function power_sum
+
+
+def _reduce(function):
+    """Return n-ary version of binary function.
+    """
+    def reduced(first, *others):
+        result = np.array(first, dtype=float)
+        for v in others:
+            result = function(result, v)
+        return result
+    return reduced
+# end of function _reduce
+
+
+# functions available in expressions, on gains in dB
+FUNCTIONS = {'max': _reduce(np.maximum),
+             'min': _reduce(np.minimum),
+             'psum': power_sum,
+             'abs': np.abs}
+
+# binary and unary operators available in expressions
+OPERATORS = {ast.Add: ('+', np.add),
+             ast.Sub: ('-', np.subtract),
+             ast.Mult: ('*', np.multiply),
+             ast.Div: ('/', np.divide),
+             ast.USub: ('-', np.negative),
+             ast.UAdd: ('+', np.positive)}
+
+# values of expression nodes, shared by all expressions
+NODES = Cache(maxsize=32)
+
+
+class Node(object):
+    """Node of an expression graph. key is the canonical text of the
+    sub-expression, children the operand nodes and operation the function
+    applied to the children values.
+    """
+
+    def __init__(self, key, children=(), operation=None, value=None):
+        self.key = key
+        self.children = tuple(children)
+        self.operation = operation
+        self.value = value
+    # end of constructor
+
+    def names(self):
+        """Return list of operand names the node depends on, in order of
+        first appearance.
+        """
+        if self.operation is None and self.value is None:
+            return [self.key]
+        names = []
+        for child in self.children:
+            names += [n for n in child.names() if n not in names]
+        return names
+    # end of function names
+
+# end of class Node
+
+
+def parse(text, nodes=None):
+    """Return root Node of expression text. Identical sub-expressions are
+    the same Node object, registered in nodes dictionary by key.
+    Raise ValueError if text is not a valid expression.
+    """
+    if nodes is None:
+        nodes = {}
+
+    def node(key, children=(), operation=None, value=None):
+        if key not in nodes:
+            nodes[key] = Node(key, children, operation, value)
+        return nodes[key]
+
+    def build(tree):
+        if isinstance(tree, ast.Name):
+            return node(tree.id)
+        if isinstance(tree, ast.Constant) and \
+                isinstance(tree.value, (int, float)):
+            return node(repr(float(tree.value)), value=float(tree.value))
+        if isinstance(tree, ast.UnaryOp) and type(tree.op) in OPERATORS:
+            symbol, operation = OPERATORS[type(tree.op)]
+            operand = build(tree.operand)
+            return node('({0}{1})'.format(symbol, operand.key), (operand,),
+                        operation)
+        if isinstance(tree, ast.BinOp) and type(tree.op) in OPERATORS:
+            symbol, operation = OPERATORS[type(tree.op)]
+            left, right = build(tree.left), build(tree.right)
+            return node('({0} {1} {2})'.format(left.key, symbol, right.key),
+                        (left, right), operation)
+        if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name) \
+                and tree.func.id in FUNCTIONS and tree.args \
+                and not tree.keywords:
+            arguments = [build(a) for a in tree.args]
+            return node('{0}({1})'.format(
+                tree.func.id, ', '.join(a.key for a in arguments)),
+                arguments, FUNCTIONS[tree.func.id])
+        raise ValueError('Unsupported expression: ' + ast.dump(tree))
+
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError('Invalid expression: ' + text) from e
+    return build(tree.body)
+# end of function parse
+
+
+class Expression(object):
+    """Lazy expression on data sets of patterns, evaluated on the grid of a
+    reference data set.
+    """
+
+    def __init__(self, text, patterns, reference=None,
+                 method: str = 'linear', chunk: int = 262144):
+        """Build expression graph of text.
+        patterns maps operand names to patterns (data set 0) or
+        (pattern, set) pairs. reference is the name of the operand whose
+        grid is used, the first operand of text by default. method is the
+        resampling method and chunk the number of points computed at once.
+        """
+        self._text = text
+        self._nodes = {}
+        self._root = parse(text, self._nodes)
+        self._operands = {}
+        for name in self._root.names():
+            if name not in patterns:
+                raise ValueError('Undefined operand {0} in {1}'.format(
+                    name, text))
+            operand = patterns[name]
+            if isinstance(operand, AbstractPattern):
+                operand = (operand, 0)
+            self._operands[name] = operand
+        if reference is None:
+            # first operand in reading order
+            reference = self._root.names()[0] if self._operands else None
+        if reference not in patterns:
+            raise ValueError('Undefined reference operand {0}'.format(
+                reference))
+        self._reference = self._operands.get(reference)
+        if self._reference is None:
+            self._reference = patterns[reference]
+            if isinstance(self._reference, AbstractPattern):
+                self._reference = (self._reference, 0)
+        self._method = method
+        self._chunk = chunk
+    # end of constructor
+
+    def text(self):
+        """Return expression text.
+        """
+        return self._text
+    # end of function text
+
+    def reference(self):
+        """Return (pattern, set) of the reference data set.
+        """
+        return self._reference
+    # end of function reference
+
+    def _bound(self, node):
+        """Return key of node with operand names replaced by the content
+        of the operands, so that cached values are shared by expressions
+        using other names for the same data.
+        """
+        if node.operation is None:
+            if node.value is not None:
+                return node.key
+            pattern, s = self._operands[node.key]
+            return 'data:' + fingerprint(pattern.plotted(s),
+                                         pattern.longitude(s),
+                                         pattern.latitude(s),
+                                         float(pattern._conversion_factor))
+        return (node.operation, tuple(self._bound(c) for c in node.children))
+    # end of function _bound
+
+    def _grid_key(self):
+        """Return fingerprint of the evaluation grid and method.
+        """
+        pattern, s = self._reference
+        return fingerprint(pattern.longitude(s), pattern.latitude(s)), \
+            self._method
+    # end of function _grid_key
+
+    def _operand(self, name):
+        """Return operand name resampled on the reference grid, with its
+        conversion factor, NaN where the operand satellite does not see the
+        grid point.
+        """
+        pattern, s = self._operands[name]
+        reference, reference_set = self._reference
+        lon = reference.longitude(reference_set)
+        lat = reference.latitude(reference_set)
+        if pattern is reference and fingerprint(
+                pattern.longitude(s), pattern.latitude(s)) == \
+                fingerprint(lon, lat):
+            # same grid, no resampling
+            return np.array(pattern.plotted(s), dtype=float) + \
+                pattern._conversion_factor
+        az, el = pattern.lonlat2azel(lon, lat)
+        return pattern.resample(az, el, [s], self._method)[..., 0] + \
+            pattern._conversion_factor
+    # end of function _operand
+
+    def _value(self, node):
+        """Return value of node on the reference grid, cached.
+        """
+        def compute():
+            if node.operation is None:
+                result = self._operand(node.key)
+                result.flags.writeable = False
+                return result
+            children = [c.value if c.operation is None and
+                        c.value is not None else self._value(c).ravel()
+                        for c in node.children]
+            shape = np.shape(self._reference[0].longitude(
+                self._reference[1]))
+            result = np.empty(int(np.prod(shape)))
+            # operations evaluated by chunks to limit temporary arrays
+            with np.errstate(invalid='ignore', divide='ignore',
+                             over='ignore'):
+                for start in range(0, len(result), self._chunk):
+                    chunk = slice(start, start + self._chunk)
+                    result[chunk] = node.operation(
+                        *[c if np.isscalar(c) else c[chunk]
+                          for c in children])
+            result = result.reshape(shape)
+            result.flags.writeable = False
+            return result
+
+        if node.value is not None:
+            shape = np.shape(self._reference[0].longitude(
+                self._reference[1]))
+            return np.full(shape, node.value)
+        return NODES.get((self._bound(node),) + self._grid_key(), compute)
+    # end of function _value
+
+    def evaluate(self):
+        """Return value of the expression on the reference grid (read-only
+        array with the shape of the reference data set).
+        """
+        utils.trace('in')
+        value = self._value(self._root)
+        utils.trace('out')
+        return value
+    # end of function evaluate
+
+    def pattern(self, conf=None, dialog=False, parent=None):
+        """Return the result of the expression as a displayable pattern.
+        conf overrides the configuration inherited from the reference
+        pattern.
+        """
+        return ExpressionPattern(self, conf=conf, dialog=dialog,
+                                 parent=parent)
+    # end of function pattern
+
+# end of class Expression
+
+
+def expr(text, reference=None, method: str = 'linear', **patterns):
+    """Return lazy Expression of text on patterns given as keyword
+    arguments (pattern or (pattern, set)), e.g.
+    expr('max(A, B) - C', A=p1, B=p2, C=(p3, 1)).
+    """
+    return Expression(text, patterns, reference=reference, method=method)
+# end of function expr
+
+
+class ExpressionPattern(AbstractPattern):
+    """This class implement an antenna pattern object whose data is the
+    result of an Expression, on the grid of its reference data set.
+    """
+
+    def __init__(self, expression, conf=None, dialog=False, parent=None):
+        """Initialize an ExpressionPattern object
+        """
+        self._expression = expression
+        reference, _ = expression.reference()
+        # configuration inherited from reference: same satellite and
+        # offset give the same geographic grid, data is already rotated,
+        # reverted and shrunk, and includes the operands conversion factors
+        config = dict(reference.configure())
+        config.update({'filename': expression.text(),
+                       'rotate': False,
+                       'revert_x': False,
+                       'revert_y': False,
+                       'use_second_pol': False,
+                       'shrink': False,
+                       'expand': False,
+                       'composite': False,
+                       'display_slope': False,
+                       'isolevel': None,
+                       'cf': 0})
+        if conf is not None:
+            config.update(conf)
+
+        # just initialize object
+        super().__init__(filename=expression.text(), conf=config,
+                         dialog=dialog, parent=parent)
+
+        # matrix to be plotted
+        self._to_plot = np.zeros(shape=np.array(
+            self._E_co[0]).shape, dtype=float)
+
+        for k in range(self._nb_sets):
+            self._longitude.append(np.zeros_like(self._x[k]))
+            self._latitude.append(np.zeros_like(self._x[k]))
+            self._azimuth.append(np.zeros_like(self._x[k]))
+            self._elevation.append(np.zeros_like(self._x[k]))
+
+        # configure
+        self.configure(config=config)
+    # end of constructor
+
+    def expression(self):
+        """Return the Expression displayed by this pattern.
+        """
+        return self._expression
+    # end of function expression
+
+    def read_file(self, filename):
+        """Evaluate the expression instead of reading a file. The result in
+        dB is stored as a real field magnitude, undefined values give -99 dB.
+        """
+        reference, s = self._expression.reference()
+        with np.errstate(invalid='ignore', over='ignore'):
+            field = np.power(10.0, self._expression.evaluate() / 20)
+        return 1, reference._grid, [np.array(reference._x[s])], \
+            [np.array(reference._y[s])], [field], []
+    # end of function read_file
+
+    def grid_type(self):
+        """Return grid type of the reference pattern.
+        """
+        return self._expression.reference()[0].grid_type()
+    # end of function grid_type
+
+    def rotate(self):
+        # if requested by the new configuration, rotate the pattern
+        for set in range(self._nb_sets):
+            if self._rotate != self._rotated:
+                self._x[set] = -1 * self._x[set]
+                self._y[set] = -1 * self._y[set]
+        self._rotated = self._rotate
+    # end of function rotate
+
+# end of class ExpressionPattern
+
+# end of module expression
@@ -0,0 +1,428 @@
+"""This module provides bulk writers and header probing of .pat (Satsoft)
+and .grd (TICRA) pattern files.
+Numbers are formatted for whole arrays at once into ASCII codes with numpy,
+so that exporting large patterns is not limited by Python string
+formatting. Files whose name ends with .gz are gzip compressed.
+"""
+
+# gzip compressed files
+import gzip
+# regular expressions to find frequency in comments
+import re
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# ASCII codes
+_SPACE = ord(' ')
+_DIGIT = ord('0')
+
+# standardised grid type per file grid type, see grid_type methods
+# 1 uv, 2 theta/phi, 3 az and el, 4 el over az, 5 az over el
+GRD_GRIDS = {1: 1, 4: 4, 5: 3, 6: 5, 7: 2}
+PAT_GRIDS = {1: 1, 2: 2, 3: 5, 4: 4, 101: 101}
+
+# frequency and its unit in comments, e.g. 'FREQUENCY: 11.7 GHz'
+_FREQUENCY = re.compile(
+    rb'freq[a-z]*\W*?([-+]?\d+\.?\d*(?:[eE][-+]?\d+)?)\s*([GMk]?Hz)?',
+    re.IGNORECASE)
+_HZ = {b'ghz': 1e9, b'mhz': 1e6, b'khz': 1e3, b'hz': 1.0}
+
+
+def open_file(filename, mode='r'):
+    """Return file object opened in text mode ('r' or 'w') or binary mode
+    ('rb' or 'wb'). Files whose name ends with .gz are opened through gzip.
+    """
+    if filename.endswith('.gz'):
+        if 'b' not in mode:
+            mode += 't'
+        # fastest compression level, text tables compress well anyway
+        return gzip.open(filename, mode, compresslevel=1)
+    return open(filename, mode)
+# end of function open_file
+
+
+def file_extension(filename):
+    """Return extension of filename ignoring a trailing .gz, e.g. '.pat'.
+    """
+    if filename.endswith('.gz'):
+        filename = filename[:-3]
+    dot = filename.rfind('.')
+    return filename[dot:].lower() if dot >= 0 else ''
+# end of function file_extension
+
+
+def _digits(out, value, stop, count):
+    """Write count decimal digits of integer array value in columns of out
+    ending at column stop (included).
+    """
+    for k in range(count):
+        out[:, stop - k] = _DIGIT + value % 10
+        value = value // 10
+# end of function _digits
+
+
+def _python_format(values, rows, fmt):
+    """Return Python formatting of values of index in rows, used for the
+    values the vectorized formatters cannot handle (NaN, inf, huge or tiny
+    values, roundings too close to a tie to be decided in floating point).
+    """
+    return [(i, fmt % values[i]) for i in rows]
+# end of function _python_format
+
+
+def _overwrite(out, others, fmt, values):
+    """Overwrite rows of out with the (index, text) pairs of others, right
+    aligned. If one of them does not fit in out width, return the whole
+    column formatted by Python as a list of strings (see table), else out.
+    """
+    width = out.shape[1]
+    if any(len(text) > width for _, text in others):
+        return [fmt % v for v in values]
+    for i, text in others:
+        out[i, :] = np.frombuffer(text.rjust(width).encode(), dtype=np.uint8)
+    return out
+# end of function _overwrite
+
+
+def _tie(t):
+    """Return True where the rounding of positive floats t to the nearest
+    integer cannot be decided, t being known to a few ulps only.
+    """
+    return np.abs(t - np.floor(t) - 0.5) <= 8 * np.spacing(t)
+# end of function _tie
+
+
+def fixed(values, width: int = 8, decimals: int = 3):
+    """Return values formatted as '%{width}.{decimals}f' in a
+    (nb values, width) array of ASCII codes. Output is the one of Python
+    formatting: if one value does not fit in width, the column is returned
+    as a list of Python formatted strings (see table).
+    """
+    values = np.ravel(np.asarray(values, dtype=float))
+    fmt = '%{0}.{1}f'.format(width, decimals)
+    scale = 10 ** decimals
+    # integer representation must be exact
+    with np.errstate(invalid='ignore'):
+        finite = np.abs(values) < 2.0 ** 52 / scale
+    t = np.abs(np.where(finite, values, 0)) * scale
+    # ties are rounded to even on the exact binary value by Python
+    finite &= ~_tie(t)
+    others = _python_format(values, np.flatnonzero(~finite), fmt)
+    q = np.floor(np.where(finite, t, 0) + 0.5).astype(np.int64)
+    integer = q // scale
+    # number of digits of the integer part
+    ndigits = np.ones(len(values), dtype=np.int64)
+    power = 10
+    while np.any(integer >= power):
+        ndigits += integer >= power
+        power *= 10
+    negative = np.signbit(values) & finite
+    point = 1 if decimals else 0
+    needed = ndigits + negative + decimals + point
+    if np.any(needed > width):
+        return [fmt % v for v in values]
+
+    out = np.full((len(values), width), _SPACE, dtype=np.uint8)
+    _digits(out, q % scale, width - 1, decimals)
+    if decimals:
+        out[:, width - decimals - 1] = ord('.')
+    stop = width - decimals - point - 1
+    for k in range(int(ndigits.max(initial=0))):
+        digit = _DIGIT + integer % 10
+        out[:, stop - k] = np.where(k < ndigits, digit, _SPACE)
+        integer = integer // 10
+    rows = np.flatnonzero(negative)
+    out[rows, stop - ndigits[rows]] = ord('-')
+    return _overwrite(out, others, fmt, values)
+# end of function fixed
+
+
+def scientific(values, width: int = 15, digits: int = 7):
+    """Return values formatted as '%{width}.{digits}E' in a
+    (nb values, width) array of ASCII codes. Output is the one of Python
+    formatting, exponents of two or three digits: if one value does not
+    fit in width, the column is returned as a list of Python formatted
+    strings (see table).
+    """
+    values = np.ravel(np.asarray(values, dtype=float))
+    fmt = '%{0}.{1}E'.format(width, digits)
+    a = np.abs(np.where(np.isfinite(values), values, 0))
+    nonzero = a > 0
+    with np.errstate(divide='ignore'):
+        exponent = np.where(nonzero, np.floor(np.log10(a)), 0)
+    exponent = exponent.astype(np.int64)
+    # scale of tiny numbers overflows, subnormal numbers lose precision
+    finite = np.isfinite(values) & ((a == 0) | (exponent > digits - 300))
+    a[~finite] = 0
+    exponent[~finite] = 0
+    nonzero &= finite
+    low = 10 ** digits
+    high = 10 ** (digits + 1)
+
+    def mantissa():
+        return a * np.power(10.0, digits - exponent)
+
+    t = mantissa()
+    # ties are rounded to even on the exact binary value by Python, they
+    # also decide whether the mantissa rounds up to the next power of ten
+    finite &= ~_tie(t)
+    # correct exponent estimated from the floating point logarithm
+    # and mantissa rounded up to the next power of ten
+    exponent += (np.floor(t + 0.5) >= high)
+    exponent -= (np.floor(t + 0.5) < low) & nonzero
+    t = mantissa()
+    finite &= ~_tie(t)
+    others = _python_format(values, np.flatnonzero(~finite), fmt)
+    m = np.floor(np.where(finite, t, 0) + 0.5).astype(np.int64)
+    # ex: 9.99999999 rounded to 10.0000000
+    carry = m >= high
+    m[carry] //= 10
+    exponent[carry] += 1
+    exponent[~finite] = 0
+
+    # three exponent digits only where needed, as Python does
+    edigits = 2 + (np.abs(exponent) >= 100)
+    negative = np.signbit(values) & finite
+    if np.any(digits + edigits + 4 + negative > width):
+        return [fmt % v for v in values]
+
+    # layout with three exponent digits, one more column for the sign
+    size = width + 1
+    out = np.full((len(values), size), _SPACE, dtype=np.uint8)
+    _digits(out, np.abs(exponent), size - 1, 3)
+    out[:, size - 4] = np.where(exponent < 0, ord('-'), ord('+'))
+    out[:, size - 5] = ord('E')
+    _digits(out, m % low, size - 6, digits)
+    first = size - digits - 7
+    out[:, first] = _DIGIT + m // low
+    out[:, first + 1] = ord('.')
+    out[negative, first - 1] = ord('-')
+    # two exponent digits: remove the leading zero of the exponent
+    rows = edigits == 2
+    out[rows, 1:size - 2] = out[rows, :size - 3]
+    out[rows, 0] = _SPACE
+    return _overwrite(out[:, 1:], others, fmt, values)
+# end of function scientific
+
+
+def table(columns):
+    """Return bytes of the text table made of columns, a list of ASCII
+    codes arrays as returned by fixed or scientific. Columns are separated
+    by a space and rows ended by a new line. Columns returned as lists of
+    strings (values wider than the column) are joined by Python.
+    """
+    if any(isinstance(column, list) for column in columns):
+        columns = [column if isinstance(column, list) else
+                   [row.tobytes().decode() for row in column]
+                   for column in columns]
+        return ''.join(' '.join(row) + '\n'
+                       for row in zip(*columns)).encode()
+    nrows = len(columns[0])
+    separator = np.full((nrows, 1), _SPACE, dtype=np.uint8)
+    parts = []
+    for column in columns:
+        parts += [column, separator]
+    parts[-1] = np.full((nrows, 1), ord('\n'), dtype=np.uint8)
+    return np.hstack(parts).tobytes()
+# end of function table
+
+
+def write_pat(filename, grid, limits, co, cr=None, centers=None,
+              frequencies=None, comment='File generated by GrdViewer'):
+    """Write complex fields to a .pat file, as magnitude (dB) and
+    phase (deg).
+    grid is the .pat grid type (1 uv, 2 theta/phi, 3 az over el,
+    4 el over az)
+    limits is (xs, ys, xe, ye) of the grid common to all beams, in radians
+    for angular grids
+    co is the list of co-polarisation fields, one (ny, nx) array per beam
+    cr is the list of cross-polarisation fields or None
+    centers is the list of (ix, iy) beam centers, (0, 0) by default
+    frequencies is the list of beam frequencies, 1 by default
+    """
+    nb_sets = len(co)
+    ny, nx = np.shape(co[0])
+    ncomp = 1 if cr is None else 2
+    if centers is None:
+        centers = [(0, 0)] * nb_sets
+    if frequencies is None:
+        frequencies = [1] * nb_sets
+
+    with open_file(filename, 'wb') as file:
+        header = [comment, '++++0020',
+                  '  {0:d}, {1:d}, {2:d}, {3:d}, {4:d}, {5:d}, 0, 1'.format(
+                      nb_sets, 3 if cr is not None else 0, ncomp, grid,
+                      nx, ny),
+                  '  {0:0.10f}, {1:0.10f}, {2:0.10f}, {3:0.10f}'.format(
+                      *limits),
+                  ' ']
+        header += [' {0}, {1}'.format(*c) for c in centers]
+        header += ['{0}'.format(f) for f in frequencies]
+        file.write(('\n'.join(header) + '\n').encode())
+        for k in range(nb_sets):
+            fields = [co[k]] if cr is None else [co[k], cr[k]]
+            columns = []
+            for field in fields:
+                field = np.asarray(field)
+                with np.errstate(divide='ignore'):
+                    magnitude = 20 * np.log10(np.abs(field))
+                columns.append(fixed(np.maximum(magnitude, -99.0), 8, 3))
+                columns.append(fixed(np.angle(field, deg=True), 8, 3))
+            file.write(table(columns))
+# end of function write_pat
+
+
+def write_grd(filename, grid, limits, co, cr=None, centers=None,
+              comment='File generated by GrdViewer'):
+    """Write complex fields to a .grd file, as real and imaginary parts.
+    grid is the .grd grid type (1 uv, 4 el over az, 5 az and el,
+    6 az over el, 7 theta/phi)
+    limits is the list of (xs, ys, xe, ye) grid limits, one per data set
+    co is the list of co-polarisation fields, one (ny, nx) array per set
+    cr is the list of cross-polarisation fields, null field if None
+    centers is the list of (ix, iy) set centers, (0, 0) by default
+    """
+    nb_sets = len(co)
+    if centers is None:
+        centers = [(0, 0)] * nb_sets
+
+    with open_file(filename, 'wb') as file:
+        header = [comment, '++++', '1',
+                  '{0:d} 3 2 {1:d}'.format(nb_sets, grid)]
+        header += ['{0:d} {1:d}'.format(*c) for c in centers]
+        file.write(('\n'.join(header) + '\n').encode())
+        for k in range(nb_sets):
+            ny, nx = np.shape(co[k])
+            file.write((' {0:.10E} {1:.10E} {2:.10E} {3:.10E}\n'.format(
+                *limits[k]) + '{0:d} {1:d} 0\n'.format(nx, ny)).encode())
+            copol = np.ravel(co[k])
+            cross = np.zeros_like(copol) if cr is None else np.ravel(cr[k])
+            file.write(table([scientific(copol.real),
+                              scientific(copol.imag),
+                              scientific(cross.real),
+                              scientific(cross.imag)]))
+# end of function write_grd
+
+
+def _fields(line):
+    """Return fields of a header line, separated by commas or spaces.
+    """
+    return line.replace(b',', b' ').split()
+# end of function _fields
+
+
+def _comment_frequency(comments):
+    """Return frequency in GHz found in comment lines, None if not found.
+    Without unit, the value is assumed in GHz.
+    """
+    match = _FREQUENCY.search(b''.join(comments))
+    if match is None:
+        return None
+    unit = (match.group(2) or b'GHz').lower()
+    return float(match.group(1)) * _HZ[unit] / 1e9
+# end of function _comment_frequency
+
+
+def _skip_lines(file, nb_lines, check):
+    """Move file position nb_lines lines forward. When lines have a fixed
+    width the position is computed from the first line and validated by
+    check, a function reading the following lines and returning True if
+    they are as expected. Otherwise lines are read one by one.
+    """
+    start = file.tell()
+    width = len(file.readline())
+    target = start + nb_lines * width
+    if nb_lines > 1:
+        file.seek(target - 1)
+        if file.read(1) == b'\n' and check(file):
+            file.seek(target)
+            return
+        file.seek(start + width)
+        for _ in range(nb_lines - 1):
+            file.readline()
+# end of function _skip_lines
+
+
+def _set_header(file):
+    """Return True if the next lines are a .grd set header: 4 grid limits
+    then 3 integers.
+    """
+    try:
+        limits = [float(t) for t in _fields(file.readline())]
+        size = [int(t) for t in _fields(file.readline())]
+    except ValueError:
+        return False
+    return len(limits) == 4 and len(size) == 3
+# end of function _set_header
+
+
+def probe(filename):
+    """Return header information of pattern file filename without reading
+    pattern data, as a dictionary:
+    format ('grd' or 'pat'), grid (standardised grid type, see grid_type),
+    nb_sets, and sets, list of per set dictionaries with nx, ny, limits
+    (xs, ys, xe, ye) in file units (degrees for angular grids, sin for uv),
+    center (ix, iy) and frequency (GHz, None if unknown).
+    """
+    extension = file_extension(filename)
+    if extension not in ('.grd', '.pat'):
+        raise ValueError('Unknown pattern file format: ' + filename)
+    with open_file(filename, 'rb') as file:
+        # comments
+        comments = []
+        line = file.readline()
+        while line and line[:4] != b'++++':
+            comments.append(line)
+            line = file.readline()
+        if not line:
+            raise ValueError('No end of comments (++++) in ' + filename)
+        frequency = _comment_frequency(comments)
+        sets = []
+        if extension == '.grd':
+            # ktype
+            file.readline()
+            nb_sets, _, _, grid = [int(t) for t in
+                                   _fields(file.readline())[:4]]
+            centers = [tuple(int(t) for t in _fields(file.readline())[:2])
+                       for _ in range(nb_sets)]
+            for k in range(nb_sets):
+                limits = tuple(float(t) for t in
+                               _fields(file.readline())[:4])
+                nx, ny, klimit = [int(t) for t in
+                                  _fields(file.readline())[:3]]
+                sets.append({'nx': nx, 'ny': ny, 'limits': limits,
+                             'center': centers[k], 'frequency': frequency})
+                if k < nb_sets - 1:
+                    if klimit == 0:
+                        _skip_lines(file, nx * ny, _set_header)
+                    else:
+                        for _ in range(ny):
+                            points = int(_fields(file.readline())[1])
+                            for _ in range(points):
+                                file.readline()
+            grid = GRD_GRIDS.get(grid, grid)
+        else:
+            header = [int(t) for t in _fields(file.readline())]
+            nb_sets, grid, nx, ny = header[0], header[3], header[4], \
+                header[5]
+            limits = [float(t) for t in _fields(file.readline())[:4]]
+            if grid != 1:
+                # angular limits are in radians
+                limits = [float(np.degrees(t)) for t in limits]
+            # white line
+            file.readline()
+            centers = [tuple(float(t) for t in _fields(file.readline())[:2])
+                       for _ in range(nb_sets)]
+            frequencies = [float(_fields(file.readline())[0])
+                           for _ in range(nb_sets)]
+            for k in range(nb_sets):
+                sets.append({'nx': nx, 'ny': ny, 'limits': tuple(limits),
+                             'center': centers[k],
+                             'frequency': frequencies[k]})
+            grid = PAT_GRIDS.get(grid, grid)
+    return {'format': extension[1:], 'grid': grid, 'nb_sets': nb_sets,
+            'sets': sets}
+# end of function probe
+
+# end of module fileformat
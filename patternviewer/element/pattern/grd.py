@@ -1,13 +1,13 @@
 import numpy as np
 
-# import interpolation routine from scipy
-from scipy import interpolate as interp
-
 # import constant file
 import patternviewer.constant as cst
 
 import patternviewer.utils as utils
 
+# pattern files opening
+import patternviewer.element.pattern.fileformat as fileformat
+
 from patternviewer.element.pattern.abstractpattern \
     import AbstractPattern, PatternNotCreatedError
 
@@ -56,7 +56,7 @@ class Grd(AbstractPattern):
 
         try:
             # open file and read text data
-            file = open(filename, "r")
+            file = fileformat.open_file(filename, "r")
             # read all lines in a table
             lines = file.readlines()
             # close file
@@ -228,38 +228,16 @@ class Grd(AbstractPattern):
             return {'Az': copol_azgrad, 'El': copol_elgrad}
     # end of function azel_slope
 
-    def interpolate_azel_slope(self, az, el, signed=False):
-        """return interpolated value of the pattern
+    def interpolate_azel_slope(self, az, el, signed=False, set=0):
+        """return interpolated value of the pattern gradient along azimuth
+        and elevation.
         """
-        if (not self.interpolated_copol_azgrad
-            or not self.interpolated_copol_elgrad):
-            # if not yet use interpolation of slopes
-            self.interpolated_copol_azgrad = interp.RectBivariateSpline(
-                self._x[set][:, 0], self._y[set][0, :],
-                self.azel_slope()['Az'])
-            self.interpolated_copol_elgrad = interp.RectBivariateSpline(
-                self._x[set][:, 0], self._y[set][0, :],
-                self.azel_slope()['El'])
-
-        # transform azel into uv (-1 because azimuth positive toward East)
-        u = -1 * np.cos(el * cst.DEG2RAD) * np.sin(az * cst.DEG2RAD)
-        v = np.sin(el * cst.DEG2RAD)
-
-        # if uv are 2D, flat them. Use absolute value depending on signed flag
+        az_grad, el_grad = self.interpolate_gradient(az, el, set)
+        # use absolute value depending on signed flag
         if not signed:
-            return {'Az': np.absolute(np.reshape(
-                    self.interpolated_copol_azgrad.ev(u.flatten(),
-                                                      v.flatten()),
-                    np.array(az).shape)),
-                    'El': np.absolute(np.reshape(
-                        self.interpolated_copol_elgrad.ev(u.flatten(),
-                                                          v.flatten()),
-                        np.array(az).shape))}
+            return {'Az': np.absolute(az_grad), 'El': np.absolute(el_grad)}
         else:
-            return {'Az': np.reshape(self.interpolated_copol_azgrad.ev(
-                u.flatten(), v.flatten()), np.array(az).shape),
-                'El': np.reshape(self.interpolated_copol_elgrad.ev(
-                    u.flatten(), v.flatten()), np.array(az).shape)}
+            return {'Az': az_grad, 'El': el_grad}
     # end of function interpolate_azel_slope
 
     def rotate(self):
@@ -9,8 +9,6 @@
 import numpy as np
 # import pyproj for coordinates conversion
 import pyproj as prj
-# for efficient loops over several dimensions
-import itertools
 
 
 # Local modules import
@@ -21,7 +19,8 @@ import patternviewer.constant as cst
 import patternviewer.angles as ang
 # patterns related modules
 from patternviewer.element.pattern.grd import Grd
-from patternviewer.element.pattern.abstractpattern import AbstractPattern
+from patternviewer.element.pattern.abstractpattern import AbstractPattern, \
+    todb
 
 
 class UnassortedGrid(Exception):
@@ -118,16 +117,10 @@ class MultiGrd(Grd):
                 raise UnassortedGrid("x coordinate grids are not identical.")
         y = y_list[0]
 
-        nb_re, nb_set, nb_rows, nb_col = np.array(E_co_list).shape
-        E_co = np.zeros((nb_set, nb_rows, nb_col, nb_re), dtype=complex)
-        E_cr = np.zeros((nb_set, nb_rows, nb_col, nb_re), dtype=complex)
-        for s, r, c, e in itertools.product(range(nb_set),
-                                            range(nb_rows),
-                                            range(nb_col),
-                                            range(nb_re)):
-            # print('{} {} {} {}'.format(s, r, c, e))
-            E_co[s][r][c][e] = E_co_list[e][s][r][c]
-            E_cr[s][r][c][e] = E_cr_list[e][s][r][c]
+        # stack elementary fields along the last axis:
+        # (nb_set, nb_rows, nb_col, nb_re)
+        E_co = np.moveaxis(np.array(E_co_list, dtype=complex), 0, -1)
+        E_cr = np.moveaxis(np.array(E_cr_list, dtype=complex), 0, -1)
 
         utils.trace('out')
         return (nb_sets, grid, x, y, E_co, E_cr)
@@ -230,43 +223,45 @@ class MultiGrd(Grd):
         return self._nb_re
     # End of function get_number_re
 
-    def copol(self, set=0):
-        """Compute copolarisation magnitude (in dBi).
-        Overloading Grd.Copol()
+    def field(self, set=0, cross=False):
+        """Return beamformed complex field: elementary fields of the
+        radiating elements combined with the applied excitation law.
+        Overloading AbstractPattern.field().
         """
-        utils.trace('in')
-        _, nb_rows, nb_cols, _ = np.array(self._E_co).shape
-        E_co = np.zeros((nb_rows, nb_cols), dtype=complex)
-        for r, c in itertools.product(range(nb_rows),
-                                      range(nb_cols)):
-            E_co[r][c] = np.dot(self._E_co[set][r][c],
-                                self._excitation_law)
-        z = 20.0 * np.log10(np.abs(E_co))
-        z[np.where(np.isnan(z))] = -99
-        z[np.where(np.isneginf(z))] = -99
-
-        utils.trace('out')
-        return z
-    # End of function copol
-
-    def cross(self, set=0):
-        """Compute crosspolarisation magnitude (in dBi).
-        Overloading Grd.cross().
+        if cross:
+            return np.asarray(self._E_cr[set]) @ self._excitation_law
+        return np.asarray(self._E_co[set]) @ self._excitation_law
+    # End of function field
+
+    def fields(self, set=0, cross=False, laws=None):
+        """Return (nx, ny, nb laws) stack of beamformed complex fields of
+        excitation laws (all loaded laws by default), computed with one
+        matrix product. Overloading AbstractPattern.fields().
         """
-        utils.trace('in')
-        _, nb_rows, nb_cols, _ = np.array(self._E_cr).shape
-        E_cr = np.zeros((nb_rows, nb_cols), dtype=complex)
-        for r, c in itertools.product(range(nb_rows),
-                                      range(nb_cols)):
-            E_cr[r][c] = np.dot(self._E_cr[set][r][c],
-                                self._excitation_law)
-        z = 20.0 * np.log10(np.abs(E_cr))
-        z[np.where(np.isnan(z))] = -99
-        z[np.where(np.isneginf(z))] = -99
-
-        utils.trace('out')
-        return z
-    # End of function cross
+        if laws is None:
+            laws = list(self._conf['law'].values())
+        matrix = np.stack([np.asarray(law) for law in laws], axis=-1)
+        elements = self._E_cr[set] if cross else self._E_co[set]
+        return np.asarray(elements) @ matrix
+    # End of function fields
+
+    def resample_laws(self, az, el, laws=None, set=0, cross=False,
+                      method='linear'):
+        """Return beamformed patterns in dB of excitation laws (all loaded
+        laws by default) at (az, el) points. Result shape is az shape
+        followed by the number of laws.
+        Elementary fields share one grid, they are resampled at once and
+        combined afterwards, which is exact since resampling is linear.
+        """
+        if laws is None:
+            laws = list(self._conf['law'].values())
+        matrix = np.stack([np.asarray(law) for law in laws], axis=-1)
+        elements = self._E_cr[set] if cross else self._E_co[set]
+        _, _, elements = self.native_axes(np.asarray(elements), set,
+                                          clean=False)
+        resampled = self.resampler(az, el, set, method).resample(elements)
+        return todb(resampled @ matrix)
+    # end of function resample_laws
 
     def apply_law(self, law_id):
         if type(law_id) is int:
@@ -278,23 +273,18 @@ class MultiGrd(Grd):
             self._conf['applied_law'] = law_id
         else:
             raise TypeError
+        # beamformed field changed
+        self.field_changed()
     # end of method apply_law
 
     def diffpolygon(self, polygon):
         """Substract the gain of the polygon to the current beamformed pattern.
+        Points out of the polygon are set to 0.
         """
-        p = polygon.path()
-        result = np.zeros(self.E_co.shape)
-        # project the polygon to the pattern grid
-
         copol = self.copol()
-        lon = self.longitude()
-        lat = self.latitude()
-        for i, j in itertools.product(copol.shape[0],
-                                      copol.shape[1]):
-            if p.contains_points((lon[i][j], lat[i][j])):
-                result[i][j] = copol[i][j] - polygon.gain
-
-        return result
+        # project the polygon to the pattern grid
+        inside = polygon.mask(self.longitude(), self.latitude())
+        return np.where(inside, copol - polygon.gain(), 0.0)
+    # end of function diffpolygon
 
 # End of class MultiGrd
@@ -14,6 +14,8 @@ import numpy as np
 import patternviewer.utils as utils
 # package constants definition
 import patternviewer.constant as cst
+# pattern files opening
+import patternviewer.element.pattern.fileformat as fileformat
 # Definition of mother class AbstractPattern
 from patternviewer.element.pattern.abstractpattern \
     import AbstractPattern, PatternNotCreatedError
@@ -50,7 +52,7 @@ class Pat(AbstractPattern):
     def read_file(self, filename):
         try:
             # open file and read text data
-            file = open(filename, "r")
+            file = fileformat.open_file(filename, "r")
             # read all lines in a table
             lines = file.readlines()
             # close file
@@ -175,52 +177,40 @@ class Pat(AbstractPattern):
                 start=ys, stop=ye, num=ny, endpoint=True) + iy[k])
             x[k], y[k] = np.meshgrid(x_vec[k], y_vec[k])
 
-        # next line
-        istart += 1
+        # next lines
+        istart += nb_sets
 
         # line 5: frequency
         freq = []
         for i in range(nb_sets):
             freq.append(float(lines[istart + i]))
 
-        # next line
-        istart += 1
+        # frequency of each data set, in GHz
+        self._frequency = freq
+
+        # next lines
+        istart += nb_sets
 
         # patterns
         E_mag_co = []  # first component of copol
         E_phs_co = []  # second component of copol
         E_mag_cr = []  # first component of crosspol
         E_phs_cr = []  # second component of crosspol
-        if ncomp == 2:
-            np.zeros((nx, ny), dtype=float)
-        # select separator
-        if ',' in lines[istart]:
-            sep = ','
-        else:
-            sep = None
+
+        # parse all beams at once, with either separator
+        table = np.array(
+            ' '.join(lines[istart:istart + nb_sets * nx * ny]).replace(
+                ',', ' ').split(), dtype=float).reshape(
+                    nb_sets, ny, nx, 2 * ncomp)
 
         # for each beam
         for k in range(nb_sets):
-            # initialize grids
-            c11 = np.zeros((ny, nx), dtype=float)
-            c12 = np.zeros((ny, nx), dtype=float)
-            if ncomp == 2:
-                c21 = np.zeros((ny, nx), dtype=float)
-                c22 = np.zeros((ny, nx), dtype=float)
-            # extract line per line
-            for j in range(ny):
-                for i in range(nx):
-                    c11[j][i] = float(lines[istart].split(sep)[0])
-                    c12[j][i] = float(lines[istart].split(sep)[1])
-                    if ncomp == 2:
-                        c21[j][i] = float(lines[istart].split(sep)[2])
-                        c22[j][i] = float(lines[istart].split(sep)[3])
-                    istart += 1
-
+            c11, c12 = table[k, :, :, 0], table[k, :, :, 1]
             # pattern is read, put it in the right format
             E_mag_co.append(self.magnitude(iunit, c11, c12))
             E_phs_co.append(self.phase(iunit, c11, c12))
             if ncomp == 2:
+                c21, c22 = table[k, :, :, 2], table[k, :, :, 3]
                 E_mag_cr.append(self.magnitude(iunit, c21, c22))
                 E_phs_cr.append(self.phase(iunit, c21, c22))
         # end for
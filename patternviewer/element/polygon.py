@@ -18,6 +18,8 @@ import numpy as np
 # ==================================================================================================
 # import constant file
 import patternviewer.constant as cst
+# rasterisation of polygons on grids
+from patternviewer.polygonmask import polygon_mask
 
 from patternviewer.element.element import Element
 
@@ -31,7 +33,10 @@ class Polygon(Element):
         """Constructor of Polygon class.
         """
         self._parent = parent
-        self._earthmap = self._parent._earth_map
+        # polygons can be read without canvas, e.g. for batch statistics
+        self._earthmap = None
+        if self._parent is not None:
+            self._earthmap = self._parent._earth_map
         # list of station representing vertex of a polygon
         self._longitude = lon
         self._latitude = lat
@@ -59,10 +64,17 @@ class Polygon(Element):
         return self._gain
 
     def path(self):
-        path = []
-        for i in range(len(self.longitude)):
-            path.append((self.longitude[i], self.latitude[i]))
-        return Path(path)
+        """Return matplotlib Path of polygon vertex in (lon, lat).
+        """
+        return Path(np.column_stack((self._longitude, self._latitude)))
+    # end of function path
+
+    def mask(self, lon, lat):
+        """Return boolean mask of (lon, lat) grid points inside the polygon,
+        with the shape of lon. Masks are cached per polygon and grid.
+        """
+        return polygon_mask(self, lon, lat).reshape(np.shape(lon))
+    # end of function mask
 
     def projected(self, map: Basemap):
         """Return list of stations position in the given Earth projection.
@@ -0,0 +1,186 @@
+"""This module provides a spatial index over pattern footprints.
+The footprint of a data set is the (lon, lat) bounding box of the region
+where the pattern is above an isolevel. Footprints are stored in a grid of
+buckets so that, for a set of locations, only the beams whose footprint
+contains them are interpolated.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+
+def footprint(lon, lat, gain, isolevel):
+    """Return (lon_min, lon_max, lat_min, lat_max) bounding box of the grid
+    points where gain is above isolevel, None if there is none.
+    Points out of the Earth disc are ignored. Footprints crossing the
+    antimeridian are returned with longitudes in [0, 360).
+    """
+    lon = np.asarray(lon)
+    lat = np.asarray(lat)
+    with np.errstate(invalid='ignore'):
+        mask = (gain >= isolevel) & (np.abs(lon) <= 360) & \
+            (np.abs(lat) <= 90)
+    if not np.any(mask):
+        return None
+    lon = lon[mask]
+    lat = lat[mask]
+    lon_min, lon_max = lon.min(), lon.max()
+    if lon_max - lon_min > 180:
+        # try the other side of the antimeridian
+        wrapped = np.mod(lon, 360)
+        if wrapped.max() - wrapped.min() < lon_max - lon_min:
+            lon_min, lon_max = wrapped.min(), wrapped.max()
+    return (float(lon_min), float(lon_max),
+            float(lat.min()), float(lat.max()))
+# end of function footprint
+
+
+class FootprintIndex(object):
+    """Grid bucket index of beam footprints.
+    Each beam is a (pattern, set) pair identified by a key, pattern being
+    any object with lonlat2azel and interpolate_copol methods
+    (see AbstractPattern).
+    """
+
+    def __init__(self, cell: float = 5.0, margin: float = 0.5):
+        """Create an empty index with buckets of cell x cell degrees.
+        Footprints are enlarged by margin degrees to include locations
+        between the last grid point above the isolevel and the next one.
+        """
+        self._cell = cell
+        self._margin = margin
+        self._keys = []
+        self._beams = []
+        self._boxes = []
+        self._buckets = {}
+    # end of constructor
+
+    def __len__(self):
+        return len(self._keys)
+    # end of function __len__
+
+    def _cells(self, lon_min, lon_max, lat_min, lat_max):
+        """Return bucket indices covering the box.
+        """
+        i = range(int(np.floor(lon_min / self._cell)),
+                  int(np.floor(lon_max / self._cell)) + 1)
+        j = range(int(np.floor(lat_min / self._cell)),
+                  int(np.floor(lat_max / self._cell)) + 1)
+        return [(a, b) for a in i for b in j]
+    # end of function _cells
+
+    def add(self, key, pattern, set: int = 0, isolevel: float = None):
+        """Add data set of index set of pattern to the index, under key.
+        The footprint is computed from the cached longitude and latitude
+        grids of the pattern and its plotted data, conversion factor
+        included as for the isolevels. isolevel defaults to the lowest
+        isolevel of the pattern.
+        Return the footprint bounding box, None if the beam is never above
+        the isolevel (it is then not indexed).
+        """
+        if isolevel is None:
+            isolevel = np.min(pattern.get_isolevel())
+        box = footprint(pattern.longitude(set), pattern.latitude(set),
+                        pattern.plotted(set) + pattern._conversion_factor,
+                        isolevel)
+        if box is not None:
+            box = (box[0] - self._margin, box[1] + self._margin,
+                   box[2] - self._margin, box[3] + self._margin)
+            index = len(self._keys)
+            self._keys.append(key)
+            self._beams.append((pattern, set, isolevel))
+            self._boxes.append(box)
+            for cell in self._cells(*box):
+                self._buckets.setdefault(cell, []).append(index)
+        return box
+    # end of function add
+
+    def add_pattern(self, key, pattern, isolevel: float = None):
+        """Add all data sets of pattern, under keys (key, set).
+        """
+        for s in range(pattern.nb_sets()):
+            self.add((key, s), pattern, s, isolevel)
+    # end of method add_pattern
+
+    def candidates(self, lon, lat):
+        """Return dictionary of the points (indices in the flattened lon and
+        lat arrays) falling in each beam footprint, indexed by beam number.
+        """
+        lon = np.ravel(lon)
+        lat = np.ravel(lat)
+        points = {}
+        # longitudes are tested in [-180, 180) and [0, 360)
+        for shifted in (np.mod(lon + 180, 360) - 180, np.mod(lon, 360)):
+            i = np.floor(shifted / self._cell).astype(int)
+            j = np.floor(lat / self._cell).astype(int)
+            cells, inverse = np.unique(np.stack((i, j), axis=-1), axis=0,
+                                       return_inverse=True)
+            # points grouped by cell
+            order = np.argsort(np.ravel(inverse), kind='stable')
+            bounds = np.searchsorted(np.ravel(inverse)[order],
+                                     np.arange(len(cells) + 1))
+            for c, cell in enumerate(map(tuple, cells)):
+                if cell not in self._buckets:
+                    continue
+                in_cell = order[bounds[c]:bounds[c + 1]]
+                for beam in self._buckets[cell]:
+                    lon_min, lon_max, lat_min, lat_max = self._boxes[beam]
+                    inside = in_cell[
+                        (shifted[in_cell] >= lon_min) &
+                        (shifted[in_cell] <= lon_max) &
+                        (lat[in_cell] >= lat_min) &
+                        (lat[in_cell] <= lat_max)]
+                    if len(inside):
+                        points.setdefault(beam, []).append(inside)
+        return {beam: np.unique(np.concatenate(p))
+                for beam, p in points.items()}
+    # end of function candidates
+
+    def query(self, lon, lat, k: int = 3, threshold: bool = True):
+        """Return the k best beams at locations (lon, lat).
+        Only beams whose footprint contains a location are interpolated.
+        If threshold is True, gains below the beam isolevel are discarded.
+        Return (keys, gains): keys is a list (one per location) of lists of
+        at most k beam keys, gains a (nb locations, k) array of gains in dBi
+        sorted in decreasing order, padded with NaN. Gains include the
+        conversion factor of the patterns.
+        """
+        lon = np.ravel(np.asarray(lon, dtype=float))
+        lat = np.ravel(np.asarray(lat, dtype=float))
+        found_points = []
+        found_beams = []
+        found_gains = []
+        for beam, points in self.candidates(lon, lat).items():
+            pattern, s, isolevel = self._beams[beam]
+            az, el = pattern.lonlat2azel(lon[points], lat[points])
+            gain, _ = pattern.interpolate_copol(az, el, s)
+            gain = gain + pattern._conversion_factor
+            if threshold:
+                kept = gain >= isolevel
+                points, gain = points[kept], gain[kept]
+            found_points.append(points)
+            found_beams.append(np.full(len(points), beam))
+            found_gains.append(gain)
+
+        keys = [[] for _ in range(len(lon))]
+        gains = np.full((len(lon), k), np.nan)
+        if found_points:
+            points = np.concatenate(found_points)
+            beams = np.concatenate(found_beams)
+            gain = np.concatenate(found_gains)
+            # sort by location then decreasing gain
+            order = np.lexsort((-gain, points))
+            points, beams, gain = points[order], beams[order], gain[order]
+            # rank of each candidate within its location
+            first = np.searchsorted(points, points, side='left')
+            rank = np.arange(len(points)) - first
+            kept = rank < k
+            gains[points[kept], rank[kept]] = gain[kept]
+            for p, b in zip(points[kept], beams[kept]):
+                keys[p].append(self._keys[b])
+        return keys, gains
+    # end of function query
+
+# end of class FootprintIndex
+
+# end of module footprint
@@ -0,0 +1,321 @@
+"""This module provides frequency sweep analysis of pattern families.
+A family is a set of patterns of one antenna on one grid at several
+frequencies: one .grd file per frequency or .pat files with one data set
+per frequency. Frequencies are read from the file headers when the family
+is created, pattern data only at first use (files in parallel with a pool
+of processes) and stored as one (nb frequencies, grid shape) array. Gains
+at stations are resampled at all frequencies with one sparse matrix
+product, and interpolated across frequency with one matrix product.
+
+Usage:
+    python -m patternviewer.frequency "beam_*.grd" --stations sites.sta
+    python -m patternviewer.frequency beam.pat --stations sites.sta \
+        --band 11.7 12.2 -o flatness.csv
+"""
+
+# import argument parser
+import argparse
+# import csv writer for the report
+import csv
+# process pool
+import multiprocessing
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# debug trace utility
+import patternviewer.utils as utils
+# memoization of computed arrays
+from patternviewer.cache import fingerprint
+# patterns configuration and stations files
+import patternviewer.batch as batch
+# pattern files reader
+from patternviewer.compliance import read_pattern
+# pattern files header
+import patternviewer.element.pattern.fileformat as fileformat
+
+
+def frequency_weights(known, wanted):
+    """Return (nb wanted, nb known) matrix of linear interpolation from
+    values at increasing frequencies known to frequencies wanted. Rows of
+    frequencies out of the known band are NaN.
+    """
+    known = np.asarray(known, dtype=float)
+    wanted = np.atleast_1d(np.asarray(wanted, dtype=float))
+    weights = np.zeros((len(wanted), len(known)))
+    if len(known) < 2:
+        weights[:, 0] = np.where(wanted == known[0], 1.0, np.nan)
+        return weights
+    k = np.clip(np.searchsorted(known, wanted, side='right') - 1, 0,
+                len(known) - 2)
+    t = (wanted - known[k]) / (known[k + 1] - known[k])
+    rows = np.arange(len(wanted))
+    weights[rows, k] = 1 - t
+    weights[rows, k + 1] = t
+    weights[(wanted < known[0]) | (wanted > known[-1])] = np.nan
+    return weights
+# end of function frequency_weights
+
+
+def read_layers(job):
+    """Return (file name, layers) of one file of a family: layers is a
+    dictionary of (grid fingerprint, gain in dB with conversion factor) per
+    data set (see _layers). job is a (file name, configuration, sets) tuple.
+    """
+    filename, config, sets = job
+    utils.mute(True)
+    return filename, _layers(read_pattern(filename, config), sets)
+# end of function read_layers
+
+
+def _layers(pattern, sets):
+    """Return dictionary of (grid fingerprint, gain) of data sets of index
+    in sets of pattern. Every layer is the displayed polarisation of the
+    raw data set plus the conversion factor: composite, shrink and revert
+    options do not apply, so that all layers of the cube are comparable.
+    """
+    def gain(s):
+        if pattern._plotted_cross:
+            return pattern.cross(s)
+        return pattern.copol(s)
+
+    return {s: (fingerprint(pattern.azimuth(s), pattern.elevation(s)),
+                gain(s) + pattern._conversion_factor)
+            for s in sets}
+# end of function _layers
+
+
+class FrequencyCube(object):
+    """Patterns of one antenna at several frequencies on a common grid.
+    """
+
+    def __init__(self, files, config=None, sets=None, frequencies=None,
+                 processes=None):
+        """Create the family of data sets of index in sets (all by default)
+        of each pattern file of files. Only file headers are read.
+        frequencies is the frequency in GHz of each file, to be given when
+        the headers do not provide it (e.g. .grd without frequency
+        comment). config is the patterns configuration
+        (batch.default_config by default). Pattern data is read at first
+        use with a pool of processes (number of CPU by default, 1 to read
+        in this process).
+        """
+        self._config = batch.default_config() if config is None \
+            else dict(config)
+        self._processes = processes
+        # (frequency, file, set) of each layer of the cube
+        layers = []
+        for k, filename in enumerate(files):
+            header = fileformat.probe(filename)
+            for s in (range(header['nb_sets']) if sets is None else sets):
+                frequency = header['sets'][s]['frequency'] \
+                    if frequencies is None else frequencies[k]
+                if frequency is None:
+                    raise ValueError('Unknown frequency of ' + filename)
+                layers.append((float(frequency), filename, s))
+        if not layers:
+            raise ValueError('Empty pattern family')
+        layers.sort()
+        self._layers = layers
+        self._frequencies = np.array([f for f, _, _ in layers])
+        if np.any(np.diff(self._frequencies) == 0):
+            raise ValueError('Several patterns at the same frequency')
+        self._reference = None
+        self._gain = None
+        self._native = None
+    # end of constructor
+
+    def __len__(self):
+        return len(self._layers)
+    # end of function __len__
+
+    def frequencies(self):
+        """Return increasing frequencies of the cube layers in GHz.
+        """
+        return self._frequencies
+    # end of function frequencies
+
+    def layers(self):
+        """Return list of (frequency, file, set) of the cube layers.
+        """
+        return self._layers
+    # end of function layers
+
+    def load(self):
+        """Read pattern data, if not done yet. The first file is read in
+        this process, it provides the grid and the coordinates conversions
+        of the family, other files are read in parallel.
+        """
+        if self._gain is not None:
+            return
+        files = list(dict.fromkeys(f for _, f, _ in self._layers))
+        jobs = [(f, self._config, [s for _, g, s in self._layers if g == f])
+                for f in files]
+        self._reference = read_pattern(files[0], self._config)
+        results = {files[0]: _layers(self._reference, jobs[0][2])}
+        if len(jobs) > 2 and self._processes != 1:
+            with multiprocessing.Pool(self._processes) as pool:
+                results.update(pool.imap_unordered(read_layers, jobs[1:]))
+        else:
+            for filename, config, sets in jobs[1:]:
+                results[filename] = _layers(read_pattern(filename, config),
+                                            sets)
+        grid = results[files[0]][jobs[0][2][0]][0]
+        for frequency, filename, s in self._layers:
+            if results[filename][s][0] != grid:
+                raise ValueError(
+                    'Grid of {0} set {1:d} differs from the family'.format(
+                        filename, s))
+        self._gain = np.stack([results[filename][s][1]
+                               for _, filename, s in self._layers])
+        self._gain.flags.writeable = False
+        # frequency along the last axis of the native grid, for resampling
+        self._native = self._reference.native_axes(
+            np.moveaxis(self._gain, 0, -1), self._layers[0][2])[2]
+    # end of method load
+
+    def cube(self):
+        """Return read-only (nb frequencies, grid shape) array of gains in
+        dB, conversion factor included.
+        """
+        self.load()
+        return self._gain
+    # end of function cube
+
+    def reference(self):
+        """Return the pattern object of the first file, which provides the
+        grid and coordinates conversions of the family.
+        """
+        self.load()
+        return self._reference
+    # end of function reference
+
+    def gain(self, lon, lat, frequencies=None, method: str = 'linear'):
+        """Return gains in dB at stations (lon, lat), resampled with method.
+        Result shape is lon shape followed by the number of frequencies:
+        frequencies in GHz (linear interpolation in dB, NaN out of the
+        band), the cube frequencies by default. Stations which do not see
+        the satellite are NaN.
+        """
+        self.load()
+        az, el = self._reference.lonlat2azel(np.asarray(lon, dtype=float),
+                                             np.asarray(lat, dtype=float))
+        resampler = self._reference.resampler(az, el, self._layers[0][2],
+                                              method)
+        gain = resampler.resample(self._native)
+        if frequencies is not None:
+            gain = gain @ frequency_weights(self._frequencies,
+                                            frequencies).T
+        return gain
+    # end of function gain
+
+    def flatness(self, lon, lat, band=None, method: str = 'linear'):
+        """Return gain flatness at stations (lon, lat) across the band
+        (fmin, fmax) in GHz (all frequencies by default), as a dictionary of
+        arrays of lon shape: min, max and mean gain in dB, flatness (max -
+        min, dB) and slope (least squares, dB/GHz).
+        """
+        gain = self.gain(lon, lat, method=method)
+        frequencies = self._frequencies
+        if band is not None:
+            inside = (frequencies >= band[0]) & (frequencies <= band[1])
+            if not np.any(inside):
+                raise ValueError('No pattern in band {0}-{1} GHz'.format(
+                    *band))
+            gain = gain[..., inside]
+            frequencies = frequencies[inside]
+        result = {'min': np.min(gain, axis=-1),
+                  'max': np.max(gain, axis=-1),
+                  'mean': np.mean(gain, axis=-1)}
+        result['flatness'] = result['max'] - result['min']
+        centered = frequencies - np.mean(frequencies)
+        if np.any(centered):
+            result['slope'] = (gain - result['mean'][..., None]) @ \
+                centered / (centered @ centered)
+        else:
+            result['slope'] = np.zeros_like(result['mean'])
+        return result
+    # end of function flatness
+
+# end of class FrequencyCube
+
+
+def write_flatness(filename, names, lon, lat, flatness, band=None):
+    """Write per station flatness (see FrequencyCube.flatness) to csv file
+    filename.
+    """
+    fields = ['station', 'longitude', 'latitude', 'band (GHz)',
+              'min (dB)', 'max (dB)', 'mean (dB)', 'flatness (dB)',
+              'slope (dB/GHz)']
+    band = '' if band is None else '{0:g}-{1:g}'.format(*band)
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for k, name in enumerate(names):
+            writer.writerow({'station': name,
+                             'longitude': lon[k],
+                             'latitude': lat[k],
+                             'band (GHz)': band,
+                             'min (dB)': '{0:0.3f}'.format(
+                                 flatness['min'][k]),
+                             'max (dB)': '{0:0.3f}'.format(
+                                 flatness['max'][k]),
+                             'mean (dB)': '{0:0.3f}'.format(
+                                 flatness['mean'][k]),
+                             'flatness (dB)': '{0:0.3f}'.format(
+                                 flatness['flatness'][k]),
+                             'slope (dB/GHz)': '{0:0.4f}'.format(
+                                 flatness['slope'][k])})
+# end of function write_flatness
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Gain flatness across frequency at stations.')
+    parser.add_argument('inputs', nargs='+',
+                        help='pattern files or glob patterns of the family'
+                        ' (*.grd, *.pat)')
+    parser.add_argument('--stations', required=True,
+                        help='stations file (name, tag, lon, lat, ...)')
+    parser.add_argument('--frequencies', type=float, nargs='+',
+                        default=None, metavar='GHZ',
+                        help='frequency of each input file (sorted by'
+                        ' name), when not in the file headers')
+    parser.add_argument('--set', type=int, action='append', default=None,
+                        help='data set of each file (default all)')
+    parser.add_argument('--band', type=float, nargs=2, default=None,
+                        metavar=('FMIN', 'FMAX'),
+                        help='band in GHz (default all frequencies)')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude in degrees')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes (default number of CPU)')
+    parser.add_argument('-o', '--output', default='flatness.csv',
+                        help='flatness csv file (default flatness.csv)')
+    args = parser.parse_args()
+
+    files = batch.input_files(args.inputs)
+    if not files:
+        parser.error('no pattern file in the inputs')
+    if args.frequencies is not None and \
+            len(args.frequencies) != len(files):
+        parser.error('one frequency per input file is expected')
+
+    config = batch.default_config()
+    config['sat_lon'] = args.sat_lon
+    cube = FrequencyCube(files, config, args.set, args.frequencies,
+                         args.jobs)
+    names, lon, lat = batch.read_stations(args.stations)
+    flatness = cube.flatness(lon, lat, args.band)
+    write_flatness(args.output, names, lon, lat, flatness, args.band)
+    print('{0:d} patterns from {1:g} to {2:g} GHz, {3:d} stations, report'
+          ' written to {4}'.format(len(cube), cube.frequencies()[0],
+                                   cube.frequencies()[-1], len(names),
+                                   args.output))
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module frequency
@@ -0,0 +1,147 @@
+"""This module provides carrier to interference (C/I) computation for
+frequency reuse planning.
+Beams (data sets of one or several patterns) are resampled once on common
+(lon, lat) points, a raster grid or a list of stations. Linear powers are
+accumulated in place per colour (frequency and polarisation reuse group)
+while the best server beam is tracked, so that memory does not grow with
+the number of beams. The wanted carrier at a point is its best server
+beam, interference is the power sum of all other beams of the same colour.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+
+class CarrierInterference(object):
+    """C/I engine on a set of (lon, lat) points.
+    """
+
+    def __init__(self, lon, lat, method: str = 'linear',
+                 chunk: int = 262144):
+        """Create engine on points (lon, lat), arrays of any shape.
+        method is the resampling method of the patterns (see resample) and
+        chunk the maximum number of points resampled at once.
+        """
+        self._shape = np.shape(lon)
+        self._lon = np.ravel(np.asarray(lon, dtype=float))
+        self._lat = np.ravel(np.asarray(lat, dtype=float))
+        self._method = method
+        self._chunk = chunk
+        # beams keys and colour index
+        self._keys = []
+        self._beam_colour = []
+        # colours labels
+        self._colours = []
+        # power sum per colour, best server gain and beam
+        self._total = np.zeros((0, len(self._lon)))
+        self._best = np.full(len(self._lon), -np.inf)
+        self._server = np.full(len(self._lon), -1)
+    # end of constructor
+
+    def _colour(self, label):
+        """Return index of colour label, created if needed.
+        """
+        if label not in self._colours:
+            self._colours.append(label)
+            self._total = np.vstack((self._total,
+                                     np.zeros((1, len(self._lon)))))
+        return self._colours.index(label)
+    # end of function _colour
+
+    def add_pattern(self, key, pattern, colours=None, sets=None):
+        """Add data sets of index in sets (all by default) of pattern as
+        beams with keys (key, set).
+        colours is the list of colour labels of the sets, same colour for
+        all by default.
+        """
+        sets = list(range(pattern.nb_sets()) if sets is None else sets)
+        if colours is None:
+            colours = [0] * len(sets)
+        colour_index = [self._colour(c) for c in colours]
+        first_beam = len(self._keys)
+        self._keys += [(key, s) for s in sets]
+        self._beam_colour += colour_index
+        # sum of set powers per colour by a matrix product
+        grouping = np.zeros((len(sets), len(self._colours)))
+        grouping[np.arange(len(sets)), colour_index] = 1.0
+
+        az, el = pattern.lonlat2azel(self._lon, self._lat)
+
+        for start in range(0, len(self._lon), self._chunk):
+            chunk = slice(start, start + self._chunk)
+            # chunks are resampled once, their matrices are not cached
+            gains = pattern.resample(az[chunk], el[chunk], sets,
+                                     self._method, cache=False) + \
+                pattern._conversion_factor
+            # points not seen by the satellite are NaN, without power
+            gains[np.isnan(gains)] = -np.inf
+            self._total[:, chunk] += (np.power(10.0, gains / 10) @
+                                      grouping).T
+            # best server update
+            best_set = np.argmax(gains, axis=1)
+            gain = np.take_along_axis(gains, best_set[:, None], 1)[:, 0]
+            better = gain > self._best[chunk]
+            self._best[chunk][better] = gain[better]
+            self._server[chunk][better] = first_beam + best_set[better]
+    # end of method add_pattern
+
+    def keys(self):
+        """Return list of beam keys, indexed by beam number.
+        """
+        return self._keys
+    # end of function keys
+
+    def server(self):
+        """Return best server beam number at each point, -1 where no beam
+        is visible.
+        """
+        return self._server.reshape(self._shape)
+    # end of function server
+
+    def carrier(self):
+        """Return best server gain in dBi at each point.
+        """
+        return self._best.reshape(self._shape)
+    # end of function carrier
+
+    def interference(self):
+        """Return power sum in dBi of the beams of the same colour as the
+        best server, excluding it, at each point.
+        """
+        served = self._server >= 0
+        interference = np.zeros(len(self._lon))
+        colour = np.asarray(self._beam_colour)[self._server[served]]
+        interference[served] = self._total[colour, np.flatnonzero(served)] \
+            - np.power(10.0, self._best[served] / 10)
+        with np.errstate(divide='ignore'):
+            return (10 * np.log10(np.maximum(interference, 0.0))).reshape(
+                self._shape)
+    # end of function interference
+
+    def ci(self):
+        """Return C/I in dB at each point.
+        """
+        with np.errstate(invalid='ignore'):
+            return self.carrier() - self.interference()
+    # end of function ci
+
+    def table(self):
+        """Return dictionary of flat arrays describing each point: lon, lat,
+        beam (best server beam number), colour (index), C (dBi), I (dBi)
+        and C/I (dB).
+        """
+        colour = np.where(self._server >= 0,
+                          np.asarray(self._beam_colour + [-1])[self._server],
+                          -1)
+        return {'lon': self._lon,
+                'lat': self._lat,
+                'beam': self._server,
+                'colour': colour,
+                'C': self._best,
+                'I': np.ravel(self.interference()),
+                'C/I': np.ravel(self.ci())}
+    # end of function table
+
+# end of class CarrierInterference
+
+# end of module interference
@@ -0,0 +1,139 @@
+"""This module provides fast interpolation of data defined on a regular grid.
+Cell indices of the query points are computed arithmetically from the grid
+origin and step, then nearest, bilinear or cubic convolution weights are
+applied in a fully vectorized way.
+Query points out of the grid are clamped to the grid boundary, as done by
+scipy RectBivariateSpline. Query points with a non finite coordinate (e.g.
+directions not seen by the satellite) are interpolated as NaN.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# available interpolation methods and their number of points per axis
+METHODS = {'nearest': 1,
+           'linear': 2,
+           'cubic': 4}
+
+
+def axis_weights(t, n, method='linear'):
+    """Return indices and weights of the grid points used to interpolate
+    along one axis.
+    t is the vector of query positions expressed in grid index unit
+    n is the number of grid points along the axis
+    method is one of 'nearest', 'linear' or 'cubic'
+    Indices and weights are (len(t), k) arrays, k depending on method.
+    Non finite positions get valid indices and NaN weights.
+    """
+    finite = np.isfinite(t)
+    # clamp to the grid boundary
+    t = np.clip(np.where(finite, t, 0), 0, n - 1)
+    if method == 'nearest':
+        index = np.rint(t).astype(np.intp)[:, None]
+        weight = np.ones_like(t)[:, None]
+    elif method == 'linear':
+        i0 = np.minimum(np.floor(t), max(n - 2, 0)).astype(np.intp)
+        f = t - i0
+        index = np.stack((i0, np.minimum(i0 + 1, n - 1)), axis=-1)
+        weight = np.stack((1 - f, f), axis=-1)
+    elif method == 'cubic':
+        # Keys cubic convolution kernel with a = -0.5
+        i0 = np.minimum(np.floor(t), max(n - 2, 0)).astype(np.intp)
+        f = t - i0
+        f2 = f * f
+        f3 = f2 * f
+        weight = np.stack((-0.5 * f3 + f2 - 0.5 * f,
+                           1.5 * f3 - 2.5 * f2 + 1,
+                           -1.5 * f3 + 2 * f2 + 0.5 * f,
+                           0.5 * f3 - 0.5 * f2), axis=-1)
+        index = i0[:, None] + np.arange(-1, 3)
+        if n >= 4:
+            # Keys boundary condition, points out of the grid are
+            # extrapolated: z[-1] = 3 * z[0] - 3 * z[1] + z[2]
+            low = i0 == 0
+            weight[low, 1:] += weight[low, :1] * [3, -3, 1]
+            weight[low, 0] = 0
+            high = i0 == n - 2
+            weight[high, :3] += weight[high, 3:] * [1, -3, 3]
+            weight[high, 3] = 0
+        index = np.clip(index, 0, n - 1)
+    else:
+        raise ValueError('Unknown interpolation method: ' + str(method))
+    weight[~finite] = np.nan
+    return index, weight
+# end of function axis_weights
+
+
+class GridInterpolator(object):
+    """Interpolator of data z defined on the regular grid x, y.
+    Conventions are the ones of scipy RectBivariateSpline: x and y are
+    increasing vectors and z[i, j] is the value at (x[i], y[j]).
+    """
+
+    def __init__(self, x, y, z=None, method='linear'):
+        """Create interpolator. Only first and last values of x and y
+        are used, the grid is assumed regular. z may be omitted when only
+        interpolation weights are needed.
+        """
+        if method not in METHODS:
+            raise ValueError('Unknown interpolation method: ' + str(method))
+        self._x0 = x[0]
+        self._y0 = y[0]
+        self._nx = len(x)
+        self._ny = len(y)
+        self._dx = (x[-1] - x[0]) / max(self._nx - 1, 1)
+        self._dy = (y[-1] - y[0]) / max(self._ny - 1, 1)
+        self._z = None if z is None else np.ascontiguousarray(z).ravel()
+        self._method = method
+    # end of constructor
+
+    def weights(self, x, y):
+        """Return flat indices in z and weights of the grid points used to
+        interpolate at points (x, y). Both are (nb points, k * k) arrays,
+        weights of points with a non finite coordinate are NaN.
+        """
+        ix, wx = axis_weights((np.ravel(x) - self._x0) / self._dx,
+                              self._nx, self._method)
+        iy, wy = axis_weights((np.ravel(y) - self._y0) / self._dy,
+                              self._ny, self._method)
+        k = ix.shape[1]
+        index = (ix[:, :, None] * self._ny + iy[:, None, :]).reshape(-1, k * k)
+        weight = (wx[:, :, None] * wy[:, None, :]).reshape(-1, k * k)
+        return index, weight
+    # end of function weights
+
+    def shape(self):
+        """Return (nx, ny) shape of the grid.
+        """
+        return self._nx, self._ny
+    # end of function shape
+
+    def ev(self, x, y):
+        """Return interpolated values at points (x, y), flattened.
+        """
+        index, weight = self.weights(x, y)
+        return np.einsum('ij,ij->i', self._z[index], weight)
+    # end of function ev
+
+# end of class GridInterpolator
+
+
+def evaluate(interpolator, x, y, chunk=None):
+    """Evaluate interpolator (any object with an ev method) at points (x, y)
+    by chunks of chunk points to bound memory usage. Result has the shape
+    of x.
+    """
+    x_flat = np.ravel(x)
+    y_flat = np.ravel(np.broadcast_to(y, np.shape(x)))
+    if chunk is None or chunk >= len(x_flat):
+        values = interpolator.ev(x_flat, y_flat)
+    else:
+        values = np.empty(len(x_flat))
+        for start in range(0, len(x_flat), chunk):
+            stop = start + chunk
+            values[start:stop] = interpolator.ev(x_flat[start:stop],
+                                                 y_flat[start:stop])
+    return np.reshape(values, np.shape(x))
+# end of function evaluate
+
+# end of module interpolation
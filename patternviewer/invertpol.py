@@ -1,53 +1,248 @@
 """Invert Grd files polarisation
+Co and cross polarisation columns of .grd files are swapped. Data blocks are
+streamed by chunks of lines and swapped with array operations: numbers of
+fixed width lines are moved byte-wise between the column slots, other lines
+are parsed and reformatted.
+Files or directories of files can be processed in parallel.
+
+Usage:
+    python -m patternviewer.invertpol file.grd [directory ...] [-j 4]
 """
 
+# import argument parser
+import argparse
+# import glob to list directories
+import glob
+# efficient iteration on file lines
+import itertools
+# process pool
+import multiprocessing
 # import os
 import os
-# system module
-import sys
-from sys import argv
 
+# import numpy for arrays manipulation
+import numpy as np
 
-if __name__ == '__main__':
-    print(argv)
-    if len(argv) > 1:
-        # get input file name
-        infilename = argv[1]
-        # generate output filename
-        outfilename = infilename[:-4] + '_out.grd'
-
-        # read input file
-        infile = open(infilename, 'r')
-        lines = infile.readlines()
-        infile.close()
-        print('Number of lines in file: {0:d}'.format(len(lines)))
-
-        # generate output file
-        header = True
-        dataheader = False
-        dataheaderlinenb = 0
-        outfile = open(outfilename, 'w')
-        for line in lines:
-            if header is True:
-                if line[:4] == '++++':
-                    header = False
-                    dataheader = True
-                outfile.write(line)
-                print(line[:-1])
-            elif dataheader is True:
+# pattern files opening and numbers formatting
+from patternviewer.element.pattern.fileformat import open_file, \
+    scientific, table
+
+# lookup table of ASCII codes which are not white spaces
+_FILLED = np.ones(256, dtype=bool)
+_FILLED[[ord(c) for c in ' \t\r\n']] = False
+
+
+def swapped_order(ncomp):
+    """Return order of data columns with co and cross polarisation
+    (real, imag) pairs swapped. ncomp is the number of field components.
+    """
+    return [2, 3, 0, 1] + list(range(4, 2 * ncomp))
+# end of function swapped_order
+
+
+def _reorder_fixed(lines, order):
+    """Return bytes of lines with columns reordered if all lines have the
+    same width and columns are right aligned, None otherwise. Each number
+    is moved into the slot of its new column, right aligned, so that the
+    layout of the lines is kept.
+    """
+    data = np.frombuffer(b''.join(lines), dtype=np.uint8)
+    width = len(lines[0])
+    if len(data) != width * len(lines):
+        return None
+    data = data.reshape(-1, width)
+    # one new line per line, at the end: all lines have the same width
+    if not (np.all(data[:, -1] == ord('\n'))
+            and np.count_nonzero(data == ord('\n')) == len(lines)):
+        return None
+    filled = _FILLED[data]
+    # columns are separated by white spaces in all lines
+    used = filled.any(axis=0)
+    starts = np.flatnonzero(used & ~np.concatenate(([False], used[:-1])))
+    ends = np.flatnonzero(used & ~np.concatenate((used[1:], [False]))) + 1
+    if len(starts) != len(order) or used[0]:
+        return None
+    # exactly one number per column in each line, ending at the column end
+    first = filled & ~np.concatenate(
+        (np.zeros((len(data), 1), dtype=bool), filled[:, :-1]), axis=1)
+    if not (np.all(np.add.reduceat(first, starts, axis=1) == 1)
+            and np.all(filled[:, ends - 1])):
+        return None
+    # a slot is a column with its leading white spaces, its number must
+    # fit in the slot it is moved to with at least one space before
+    slots = np.concatenate(([0], ends))
+    sizes = ends - starts
+    if np.any(sizes[order] > np.diff(slots) - 1):
+        return None
+    swapped = data.copy()
+    swapped[:, :ends[-1]] = ord(' ')
+    for k, source in enumerate(order):
+        swapped[:, ends[k] - sizes[source]:ends[k]] = \
+            data[:, starts[source]:ends[source]]
+    return swapped.tobytes()
+# end of function _reorder_fixed
+
+
+def swap_columns(lines, order):
+    """Return bytes of data lines with columns reordered. Lines which are
+    not fixed width are reformatted, with the line terminator of the first
+    line.
+    """
+    swapped = _reorder_fixed(lines, order)
+    if swapped is None:
+        values = np.array(b''.join(lines).split(), dtype=float)
+        values = values.reshape(len(lines), -1)[:, order]
+        # ' {:17.10E}' columns, the empty first column gives the leading
+        # space
+        swapped = table([np.zeros((len(lines), 0), dtype=np.uint8)] +
+                        [scientific(values[:, k], 17, 10)
+                         for k in range(values.shape[1])])
+        if lines[0].endswith(b'\r\n'):
+            swapped = swapped.replace(b'\n', b'\r\n')
+    return swapped
+# end of function swap_columns
+
+
+def output_filename(infilename):
+    """Return default output file name of infilename: name_out.grd
+    """
+    compressed = infilename.endswith('.gz')
+    if compressed:
+        infilename = infilename[:-3]
+    outfilename = os.path.splitext(infilename)[0] + '_out.grd'
+    if compressed:
+        outfilename += '.gz'
+    return outfilename
+# end of function output_filename
+
+
+def invert_file(infilename, outfilename=None, chunk: int = 100000):
+    """Swap co and cross polarisation of .grd file infilename and write
+    result to outfilename (name_out.grd by default). Data lines are
+    processed by chunks of chunk lines. Return output file name.
+    """
+    if outfilename is None:
+        outfilename = output_filename(infilename)
+
+    with open_file(infilename, 'rb') as infile, \
+            open_file(outfilename, 'wb') as outfile:
+
+        def copy(nb_lines):
+            """Copy nb_lines lines and return the last one.
+            """
+            line = b''
+            for line in itertools.islice(infile, nb_lines):
                 outfile.write(line)
-                dataheaderlinenb += 1
-                if dataheaderlinenb > 4:
-                    dataheader = False
-                print('dataheaderlinenb : {0:d}'.format(dataheaderlinenb))
-                print(line[:-1])
+            return line
+
+        def swap(nb_lines):
+            """Swap columns of the nb_lines next lines.
+            """
+            while nb_lines > 0:
+                lines = list(itertools.islice(infile, min(chunk, nb_lines)))
+                if not lines:
+                    raise ValueError('Unexpected end of file in ' +
+                                     infilename)
+                outfile.write(swap_columns(lines, order))
+                nb_lines -= len(lines)
+
+        # comments
+        for line in infile:
+            outfile.write(line)
+            if line[:4] == b'++++':
+                break
+        # ktype
+        copy(1)
+        # number of sets, field components, number of components, grid
+        nset, _, ncomp, _ = [int(t) for t in copy(1).split()[:4]]
+        order = swapped_order(ncomp)
+        # centers of sets
+        copy(nset)
+        for _ in range(nset):
+            # grid limits
+            copy(1)
+            # grid size and limits type
+            nx, ny, klimit = [int(t) for t in copy(1).split()[:3]]
+            if klimit == 0:
+                swap(nx * ny)
             else:
-                tab = line.split()
-                outline = \
-                    ' {2:17.10E} {3:17.10E} {0:17.10E} {1:17.10E}\n'.format(
-                        *[float(t) for t in tab]
-                    )
-                # print(outline)
-                outfile.write(outline)
-
-        outfile.close()
+                # each row starts with its first index and number of points
+                for _ in range(ny):
+                    _, nb_points = [int(t) for t in copy(1).split()[:2]]
+                    swap(nb_points)
+    return outfilename
+# end of function invert_file
+
+
+def grd_files(paths):
+    """Return .grd files of paths, directories are replaced by the .grd
+    files they contain (outputs of a previous run excluded).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob.glob(os.path.join(path, '*.grd')) +
+                           glob.glob(os.path.join(path, '*.grd.gz')))
+            # do not invert again files already inverted
+            files += [f for f in found
+                      if not f.endswith(('_out.grd', '_out.grd.gz'))]
+        else:
+            files.append(path)
+    return files
+# end of function grd_files
+
+
+def invert_files(filenames, outputdir=None, processes=None,
+                 progress=print):
+    """Swap polarisation of filenames in parallel with a pool of processes
+    (number of CPU by default). Outputs are written next to inputs or in
+    outputdir if provided. progress is called with a message each time a
+    file is done.
+    """
+    jobs = []
+    for f in filenames:
+        outfilename = output_filename(f)
+        if outputdir is not None:
+            outfilename = os.path.join(outputdir,
+                                       os.path.basename(outfilename))
+        jobs.append((f, outfilename))
+    if outputdir is not None:
+        os.makedirs(outputdir, exist_ok=True)
+    with multiprocessing.Pool(processes) as pool:
+        for k, outfilename in enumerate(
+                pool.imap_unordered(_invert_job, jobs)):
+            progress('[{0:d}/{1:d}] {2}'.format(k + 1, len(jobs),
+                                                outfilename))
+# end of function invert_files
+
+
+def _invert_job(job):
+    """Process pool entry point.
+    """
+    return invert_file(*job)
+# end of function _invert_job
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Swap co and cross polarisation of .grd files.')
+    parser.add_argument('paths', nargs='+',
+                        help='.grd files or directories of .grd files')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='output directory (default next to inputs)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes (default number of CPU)')
+    args = parser.parse_args()
+
+    files = grd_files(args.paths)
+    if len(files) == 1 and args.output_dir is None:
+        print(invert_file(files[0]))
+    else:
+        invert_files(files, args.output_dir, args.jobs)
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module invertpol
@@ -0,0 +1,318 @@
+"""This module provides link budgets of terminals in the coverage of a
+pattern. For each terminal (stations or points of a longitude/latitude
+raster) it computes the elevation and azimuth of the satellite, the slant
+range, the free space path loss and, from the pattern gain, the EIRP and
+power flux density (downlink) or G/T (uplink). The geometry is computed
+with vectors on a spherical Earth, once per terminals grid and satellite
+position, and shared by all patterns.
+
+Usage:
+    python -m patternviewer.linkbudget beam.grd --stations sites.sta \
+        --power 20 -o budget.csv
+    python -m patternviewer.linkbudget beam.grd --raster -20 20 30 60 0.25 \
+        --temperature 28 --quantity gt -o gt.asc
+"""
+
+# import argument parser
+import argparse
+# import csv writer for the station table
+import csv
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# debug trace utility
+import patternviewer.utils as utils
+# import constant file
+import patternviewer.constant as cst
+# memoization of computed arrays
+from patternviewer.cache import Cache, fingerprint
+# patterns configuration and stations files
+import patternviewer.batch as batch
+# pattern files reader
+from patternviewer.compliance import read_pattern
+
+# terminals geometry shared by all patterns
+GEOMETRY = Cache(maxsize=32)
+
+# link budget quantities per terminal and data set
+QUANTITIES = ('gain', 'fspl', 'eirp', 'pfd', 'gt')
+
+
+def _position(lon, lat, radius):
+    """Return (..., 3) Earth centered vectors of points (lon, lat) in
+    degrees at distance radius, NaN for invalid coordinates (e.g. points
+    out of the Earth disc of a map).
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    with np.errstate(invalid='ignore'):
+        valid = np.isfinite(lon) & (np.abs(lat) <= 90)
+    lon = np.where(valid, lon, np.nan) * cst.DEG2RAD
+    lat = np.where(valid, lat, np.nan) * cst.DEG2RAD
+    return radius * np.stack((np.cos(lat) * np.cos(lon),
+                              np.cos(lat) * np.sin(lon),
+                              np.sin(lat)), axis=-1)
+# end of function _position
+
+
+def geometry(lon, lat, satellite):
+    """Return the geometry of the satellite (object with longitude, latitude
+    and altitude methods, e.g. Viewer) seen from terminals (lon, lat), as a
+    dictionary of read-only arrays of lon shape: elevation and azimuth
+    (clockwise from North) in degrees, range (slant range in km) and
+    visible (elevation not negative). Cached by terminals and satellite
+    position.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    position = (satellite.longitude(), satellite.latitude(),
+                satellite.altitude())
+
+    def compute():
+        radius = cst.EARTH_RAD_EQUATOR_M
+        terminal = _position(lon, lat, radius)
+        zenith = terminal / radius
+        los = _position(position[0], position[1],
+                        radius + position[2]) - terminal
+        distance = np.sqrt(np.einsum('...i,...i', los, los))
+        up = np.einsum('...i,...i', los, zenith)
+        # local east and north directions
+        east = np.stack((-zenith[..., 1], zenith[..., 0],
+                         np.zeros(lon.shape)), axis=-1)
+        east /= np.sqrt(np.einsum('...i,...i', east, east))[..., None]
+        north = np.cross(zenith, east)
+        with np.errstate(invalid='ignore'):
+            result = {
+                'elevation': cst.RAD2DEG * np.arcsin(
+                    np.clip(up / distance, -1, 1)),
+                'azimuth': np.mod(cst.RAD2DEG * np.arctan2(
+                    np.einsum('...i,...i', los, east),
+                    np.einsum('...i,...i', los, north)), 360),
+                'range': distance / 1000}
+            result['visible'] = result['elevation'] >= 0
+        for value in result.values():
+            value.flags.writeable = False
+        return result
+
+    return GEOMETRY.get((fingerprint(lon, lat), position), compute)
+# end of function geometry
+
+
+def elevation(lon, lat, satellite):
+    """Return elevation in degrees of the satellite seen from terminals
+    (lon, lat), see geometry.
+    """
+    return geometry(lon, lat, satellite)['elevation']
+# end of function elevation
+
+
+def free_space_loss(distance, frequency):
+    """Return free space path loss in dB over distance in km at frequency
+    in GHz (arrays broadcast against each other).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 20 * np.log10(4 * np.pi * np.asarray(distance, dtype=float) *
+                             1e12 * np.asarray(frequency, dtype=float) /
+                             cst.SPEED_OF_LIGHT)
+# end of function free_space_loss
+
+
+def spreading_loss(distance):
+    """Return spreading loss 10 log10(4 pi d^2) in dB.m2 over distance in
+    km.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 10 * np.log10(4 * np.pi *
+                             (np.asarray(distance, dtype=float) * 1e3) ** 2)
+# end of function spreading_loss
+
+
+def raster_grid(lon_min, lon_max, lat_min, lat_max, step):
+    """Return (lon, lat) 2D grids of a regular raster of cell step in
+    degrees, rows from North to South.
+    """
+    lon = np.arange(lon_min, lon_max + step / 2, step)
+    lat = np.arange(lat_max, lat_min - step / 2, -step)
+    return np.meshgrid(lon, lat)
+# end of function raster_grid
+
+
+class LinkBudget(object):
+    """Link budget of terminals in the coverage of a loaded pattern.
+    """
+
+    def __init__(self, pattern, power=None, temperature=None,
+                 losses: float = 0.0, frequency=None,
+                 method: str = 'linear'):
+        """Create the link budget of pattern.
+        power is the power in dBW at the antenna input, giving EIRP and
+        power flux density. temperature is the system noise temperature in
+        dBK, giving G/T. losses in dB are subtracted from the gain.
+        frequency in GHz is the frequency of the data sets (pattern
+        frequency by default, see AbstractPattern.frequency). Gains are
+        resampled with method.
+        """
+        self._pattern = pattern
+        self._power = power
+        self._temperature = temperature
+        self._losses = losses
+        self._frequency = frequency
+        self._method = method
+    # end of constructor
+
+    def frequencies(self, sets):
+        """Return frequency in GHz of data sets of index in sets, NaN if
+        unknown.
+        """
+        if self._frequency is not None:
+            return np.full(len(sets), float(self._frequency))
+        return np.array([np.nan if f is None else f for f in
+                         (self._pattern.frequency(s) for s in sets)],
+                        dtype=float)
+    # end of function frequencies
+
+    def evaluate(self, lon, lat, sets=None):
+        """Return link budget of terminals (lon, lat) for data sets of index
+        in sets (all by default), as a dictionary: geometry arrays of lon
+        shape (see geometry), and arrays of lon shape followed by the
+        number of sets: gain (dBi), fspl (free space path loss, dB), eirp
+        (dBW) and pfd (power flux density, dBW/m2) if power is defined, gt
+        (dB/K) if temperature is defined. Terminals which do not see the
+        satellite are NaN.
+        """
+        utils.trace('in')
+        if sets is None:
+            sets = range(self._pattern.nb_sets())
+        sets = list(sets)
+        result = dict(geometry(lon, lat, self._pattern.satellite()))
+        gain = self._pattern.station_gains(lon, lat, sets, self._method)
+        gain[~result['visible']] = np.nan
+        distance = result['range'][..., None]
+        result['gain'] = gain
+        result['fspl'] = free_space_loss(distance, self.frequencies(sets))
+        if self._power is not None:
+            result['eirp'] = self._power + gain - self._losses
+            result['pfd'] = result['eirp'] - spreading_loss(distance)
+        if self._temperature is not None:
+            result['gt'] = gain - self._losses - self._temperature
+        utils.trace('out')
+        return result
+    # end of function evaluate
+
+    def raster(self, lon_min, lon_max, lat_min, lat_max, step,
+               sets=None):
+        """Return (lon, lat, link budget) of a regular raster of cell step
+        in degrees, see raster_grid and evaluate.
+        """
+        lon, lat = raster_grid(lon_min, lon_max, lat_min, lat_max, step)
+        return lon, lat, self.evaluate(lon, lat, sets)
+    # end of function raster
+
+# end of class LinkBudget
+
+
+def write_table(filename, names, lon, lat, budget, sets=None):
+    """Write link budget of stations (see LinkBudget.evaluate) to csv file
+    filename, one row per station and data set (set numbers in sets, index
+    in the budget by default).
+    """
+    quantities = [q for q in QUANTITIES if q in budget]
+    if sets is None:
+        sets = range(budget['gain'].shape[-1])
+    fields = ['station', 'longitude', 'latitude', 'set', 'elevation',
+              'azimuth', 'range'] + quantities
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for k, name in enumerate(names):
+            for i, s in enumerate(sets):
+                row = {'station': name, 'longitude': lon[k],
+                       'latitude': lat[k], 'set': s}
+                row.update({key: '{0:0.3f}'.format(budget[key][k])
+                            for key in ('elevation', 'azimuth', 'range')})
+                row.update({key: '{0:0.3f}'.format(budget[key][k, i])
+                            for key in quantities})
+                writer.writerow(row)
+# end of function write_table
+
+
+def write_raster(filename, lon, lat, values, nodata: float = -9999.0):
+    """Write 2D values of a regular raster (see raster_grid) to ESRI ASCII
+    grid file filename (readable by GIS tools). NaN are written as nodata.
+    """
+    step = abs(lon[0, 1] - lon[0, 0])
+    with open(filename, 'w') as file:
+        file.write('ncols {0:d}\nnrows {1:d}\n'.format(lon.shape[1],
+                                                      lon.shape[0]))
+        file.write('xllcorner {0:0.6f}\nyllcorner {1:0.6f}\n'.format(
+            lon[0, 0] - step / 2, lat[-1, 0] - step / 2))
+        file.write('cellsize {0:0.6f}\nNODATA_value {1:g}\n'.format(
+            step, nodata))
+        np.savetxt(file, np.where(np.isfinite(values), values, nodata),
+                   fmt='%0.3f')
+# end of function write_raster
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Link budget of terminals in a pattern coverage.')
+    parser.add_argument('pattern', help='pattern file (.grd, .pat)')
+    terminals = parser.add_mutually_exclusive_group(required=True)
+    terminals.add_argument('--stations', default=None,
+                           help='stations file (name, tag, lon, lat, ...),'
+                           ' written as a csv table')
+    terminals.add_argument('--raster', type=float, nargs=5, default=None,
+                           metavar=('LONMIN', 'LONMAX', 'LATMIN', 'LATMAX',
+                                    'STEP'),
+                           help='regular raster in degrees, written as an'
+                           ' ESRI ASCII grid')
+    parser.add_argument('--quantity', choices=QUANTITIES + (
+        'elevation', 'range'), default='gain',
+                        help='raster quantity (default gain)')
+    parser.add_argument('--set', type=int, default=0,
+                        help='raster data set (default 0)')
+    parser.add_argument('--power', type=float, default=None,
+                        help='power at antenna input in dBW (EIRP, PFD)')
+    parser.add_argument('--temperature', type=float, default=None,
+                        help='system noise temperature in dBK (G/T)')
+    parser.add_argument('--losses', type=float, default=0.0,
+                        help='losses in dB')
+    parser.add_argument('--frequency', type=float, default=None,
+                        help='frequency in GHz (default from the file)')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude in degrees')
+    parser.add_argument('-o', '--output', default=None,
+                        help='output file (default budget.csv or'
+                        ' budget.asc)')
+    args = parser.parse_args()
+
+    config = batch.default_config()
+    config['sat_lon'] = args.sat_lon
+    budget = LinkBudget(read_pattern(args.pattern, config), args.power,
+                        args.temperature, args.losses, args.frequency)
+    if args.stations is not None:
+        output = args.output or 'budget.csv'
+        names, lon, lat = batch.read_stations(args.stations)
+        write_table(output, names, lon, lat, budget.evaluate(lon, lat))
+        print('{0:d} stations, table written to {1}'.format(len(names),
+                                                            output))
+    else:
+        output = args.output or 'budget.asc'
+        lon, lat, result = budget.raster(*args.raster, sets=[args.set])
+        if args.quantity not in result:
+            parser.error(args.quantity + ' requires --power or'
+                         ' --temperature')
+        values = result[args.quantity]
+        if values.ndim == 3:
+            values = values[..., 0]
+        write_raster(output, lon, lat, values)
+        print('{0:d}x{1:d} raster written to {2}'.format(
+            lon.shape[1], lon.shape[0], output))
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module linkbudget
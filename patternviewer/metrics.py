@@ -0,0 +1,294 @@
+"""This module provides beam metrics for catalogue quality checks.
+For each data set, the main lobe is thresholded at levels relative to the
+peak (-3 and -6 dB by default) and described by its area in (az, el) and
+on ground, and by the ellipse with the same image moments (axes and
+orientation in az/el). The roll-off is the gain decrease per degree of
+equivalent radius between consecutive levels. Sets sharing a grid shape
+are processed at once, files in parallel with a pool of processes.
+
+Usage:
+    python -m patternviewer.metrics "beams/*.grd" -o metrics.csv
+    python -m patternviewer.metrics --catalog patterns.db --grid 3
+"""
+
+# import argument parser
+import argparse
+# import csv writer for the table
+import csv
+# process pool
+import multiprocessing
+
+# import numpy for arrays manipulation
+import numpy as np
+# connected regions labelling
+from scipy import ndimage
+
+# debug trace utility
+import patternviewer.utils as utils
+# patterns readers and default configuration
+import patternviewer.batch as batch
+# catalog of pattern files
+from patternviewer.catalog import Catalog
+# ground area of grid points
+from patternviewer.coverage import cell_areas
+# pattern files extension
+from patternviewer.element.pattern.fileformat import file_extension
+
+# default levels relative to the peak, in dB
+DEFAULT_LEVELS = (-3, -6)
+
+
+def azel_areas(az, el):
+    """Return the (az, el) area in square degrees represented by each point
+    of the (..., nx, ny) grids az and el (Jacobian of the grid indices).
+    """
+    daz_di, daz_dj = np.gradient(az, axis=(-2, -1))
+    del_di, del_dj = np.gradient(el, axis=(-2, -1))
+    return np.abs(daz_di * del_dj - daz_dj * del_di)
+# end of function azel_areas
+
+
+def main_lobe(gain, peak, level):
+    """Return (nb sets, nx, ny) mask of the region connected to the maximum
+    of each set of the stack gain where gain is above peak + level.
+    """
+    with np.errstate(invalid='ignore'):
+        above = gain >= (peak + level)[:, None, None]
+    # sets are not connected to each other
+    structure = np.zeros((3, 3, 3), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(2, 1)
+    labels, _ = ndimage.label(above, structure=structure)
+    flat = np.where(np.isfinite(gain), gain, -np.inf).reshape(len(gain), -1)
+    top = labels.reshape(len(gain), -1)[np.arange(len(gain)),
+                                        np.argmax(flat, axis=1)]
+    return (labels == top[:, None, None]) & (top > 0)[:, None, None]
+# end of function main_lobe
+
+
+def beam_metrics(az, el, gain, levels=DEFAULT_LEVELS, peak=None,
+                 ground=None):
+    """Return metrics of the main lobe of each set of the stacks (nb sets,
+    nx, ny) az, el (grids in degrees) and gain (in dB).
+    peak is the peak gain of each set, maximum of gain by default. ground
+    is the ground area in km2 of each grid point (see coverage.cell_areas)
+    or None.
+    Return a dictionary of (nb sets,) arrays: peak and for each level L
+    (e.g. -3): area L (square degrees), ground L (km2, if ground is
+    provided), az L and el L (centroid), major L and minor L (ellipse semi
+    axes in degrees), angle L (orientation of the major axis from the
+    azimuth axis in degrees), and rolloff L (dB per degree between the
+    previous and current level).
+    """
+    az = np.asarray(az, dtype=float)
+    el = np.asarray(el, dtype=float)
+    gain = np.asarray(gain, dtype=float)
+    if peak is None:
+        peak = np.nanmax(np.where(np.isfinite(gain), gain, -np.inf),
+                         axis=(1, 2))
+    peak = np.asarray(peak, dtype=float)
+    weights = azel_areas(az, el)
+    result = {'peak': peak}
+    previous = None
+    for level in sorted(levels, reverse=True):
+        name = '{0:g}'.format(level)
+        lobe = main_lobe(gain, peak, level)
+        w = np.where(lobe, weights, 0.0)
+        # image moments
+        area = w.sum(axis=(1, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            az0 = (w * az).sum(axis=(1, 2)) / area
+            el0 = (w * el).sum(axis=(1, 2)) / area
+            daz = az - az0[:, None, None]
+            delev = el - el0[:, None, None]
+            caa = (w * daz ** 2).sum(axis=(1, 2)) / area
+            cee = (w * delev ** 2).sum(axis=(1, 2)) / area
+            cae = (w * daz * delev).sum(axis=(1, 2)) / area
+        # eigenvalues of the covariance, a filled ellipse of semi axis a
+        # has a variance a^2 / 4 along it
+        half_trace = (caa + cee) / 2
+        spread = np.sqrt(((caa - cee) / 2) ** 2 + cae ** 2)
+        result['area ' + name] = area
+        if ground is not None:
+            result['ground ' + name] = np.where(lobe, ground, 0.0).sum(
+                axis=(1, 2))
+        result['az ' + name] = az0
+        result['el ' + name] = el0
+        result['major ' + name] = 2 * np.sqrt(half_trace + spread)
+        result['minor ' + name] = 2 * np.sqrt(
+            np.maximum(half_trace - spread, 0.0))
+        result['angle ' + name] = np.degrees(
+            0.5 * np.arctan2(2 * cae, caa - cee))
+        # roll-off on the equivalent radius
+        radius = np.sqrt(area / np.pi)
+        if previous is not None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result['rolloff ' + name] = (previous[0] - level) / \
+                    (radius - previous[1])
+        previous = level, radius
+    return result
+# end of function beam_metrics
+
+
+def pattern_metrics(pattern, levels=DEFAULT_LEVELS, sets=None):
+    """Return list of metrics dictionaries (see beam_metrics) of data sets
+    of index in sets (all by default) of pattern, one per set. Peaks are
+    the refined main peaks of the pattern (see AbstractPattern.peaks).
+    """
+    if sets is None:
+        sets = range(pattern.nb_sets())
+    sets = list(sets)
+    peaks = pattern.peaks(sets, count=0)
+    rows = [None] * len(sets)
+    # group data sets by grid shape
+    groups = {}
+    for i, s in enumerate(sets):
+        groups.setdefault(np.shape(pattern.azimuth(s)), []).append((i, s))
+    for members in groups.values():
+        index = [i for i, _ in members]
+        ground = np.stack([cell_areas(pattern.longitude(s),
+                                      pattern.latitude(s))
+                           for _, s in members])
+        metrics = beam_metrics(
+            np.stack([pattern.azimuth(s) for _, s in members]),
+            np.stack([pattern.elevation(s) for _, s in members]),
+            np.stack([pattern.plotted(s) for _, s in members]) +
+            pattern._conversion_factor,
+            levels, peaks['gain'][index, 0], ground)
+        for k, (i, s) in enumerate(members):
+            rows[i] = {'set': s,
+                       'peak az': peaks['az'][i, 0],
+                       'peak el': peaks['el'][i, 0],
+                       'peak lon': peaks['lon'][i, 0],
+                       'peak lat': peaks['lat'][i, 0]}
+            rows[i].update({key: value[k] for key, value in metrics.items()})
+    return rows
+# end of function pattern_metrics
+
+
+def file_metrics(job):
+    """Return (rows, error message) of metrics of all sets of one file.
+    job is a (file name, configuration, levels) tuple. Exceptions are
+    reported instead of being raised, so that one corrupted file does not
+    stop the batch.
+    """
+    filename, config, levels = job
+    utils.mute(True)
+    try:
+        config = dict(config)
+        config['filename'] = filename
+        if config.get('use_second_pol') is None:
+            config['use_second_pol'] = batch.second_pol(filename)
+        pattern = batch.READERS[file_extension(filename)](
+            conf=config, parent=None)
+        rows = pattern_metrics(pattern, levels)
+        for row in rows:
+            row['file'] = filename
+        return rows, ''
+    except Exception as e:
+        return [], repr(e)
+# end of function file_metrics
+
+
+def run(files, config=None, levels=DEFAULT_LEVELS, processes=None,
+        progress=print):
+    """Compute metrics of all sets of files with a pool of processes
+    (number of CPU by default). config is the patterns configuration
+    (batch.default_config by default).
+    Return (rows, errors): metrics rows in files order and list of
+    (file, error message) of the files which could not be processed.
+    """
+    if config is None:
+        config = batch.default_config()
+    jobs = [(f, config, tuple(levels)) for f in files]
+    results = {}
+    with multiprocessing.Pool(processes) as pool:
+        for k, (filename, result) in enumerate(pool.imap_unordered(
+                _metrics_job, jobs)):
+            results[filename] = result
+            progress('[{0:d}/{1:d}] {2} {3}'.format(
+                k + 1, len(jobs), filename,
+                'failed' if result[1] else 'done'))
+    rows = []
+    errors = []
+    for f in files:
+        rows += results[f][0]
+        if results[f][1]:
+            errors.append((f, results[f][1]))
+    return rows, errors
+# end of function run
+
+
+def _metrics_job(job):
+    """Process pool entry point, keeps track of the file name.
+    """
+    return job[0], file_metrics(job)
+# end of function _metrics_job
+
+
+def write_table(filename, rows):
+    """Write metrics rows to csv file filename.
+    """
+    fields = ['file', 'set']
+    for row in rows:
+        fields += [k for k in row if k not in fields]
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: '{0:0.4f}'.format(v)
+                             if isinstance(v, (float, np.floating)) else v
+                             for k, v in row.items()})
+# end of function write_table
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Beam metrics of pattern files.')
+    parser.add_argument('inputs', nargs='*',
+                        help='pattern files or glob patterns (*.grd, *.pat)')
+    parser.add_argument('--catalog', default=None,
+                        help='catalog database, its files are added to the'
+                        ' inputs (see patternviewer.catalog)')
+    parser.add_argument('--grid', type=int, default=None,
+                        help='grid type of the catalog files')
+    parser.add_argument('--frequency', type=float, nargs='+', default=None,
+                        metavar='GHZ',
+                        help='frequency or frequency range of the catalog'
+                        ' files')
+    parser.add_argument('--levels', type=float, nargs='+',
+                        default=list(DEFAULT_LEVELS),
+                        help='levels relative to peak in dB')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude in degrees')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of processes (default number of CPU)')
+    parser.add_argument('-o', '--output', default='metrics.csv',
+                        help='metrics csv file (default metrics.csv)')
+    args = parser.parse_args()
+
+    files = batch.input_files(args.inputs)
+    if args.catalog is not None:
+        frequency = args.frequency
+        if frequency is not None and len(frequency) == 1:
+            frequency = frequency[0]
+        catalog = Catalog(args.catalog)
+        files += [row['path'] for row in catalog.query(args.grid, frequency)
+                  if row['path'] not in files]
+        catalog.close()
+    if not files:
+        parser.error('no pattern file in the inputs')
+
+    config = batch.default_config()
+    config['sat_lon'] = args.sat_lon
+    rows, errors = run(files, config, args.levels, args.jobs)
+    write_table(args.output, rows)
+    print('{0:d} beams, table written to {1}'.format(len(rows), args.output))
+    for filename, error in errors:
+        print('failed: {0}: {1}'.format(filename, error))
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module metrics
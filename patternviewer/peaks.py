@@ -0,0 +1,117 @@
+"""This module provides peak finding on pattern grids.
+Local maxima are found with a neighbourhood maximum filter, vectorized over
+a stack of data sets sharing the same grid shape. The strongest maximum of
+each set is the main beam peak, the next ones its sidelobes. Peaks
+positions and values are refined below the grid step by fitting a parabola
+through the peak and its neighbours along each grid axis.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# neighbourhood filters and interpolation on grid indices
+from scipy import ndimage
+
+
+def _parabola(minus, center, plus):
+    """Return (offset, correction) of the vertex of the parabola through
+    values minus, center and plus at -1, 0 and 1: offset in [-0.5, 0.5] and
+    correction to add to center. Non concave or undefined triplets give a
+    null offset.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        curvature = minus - 2 * center + plus
+        offset = 0.5 * (minus - plus) / curvature
+        offset = np.where((curvature < 0) & np.isfinite(offset),
+                          np.clip(offset, -0.5, 0.5), 0.0)
+        correction = np.where(offset != 0, 0.25 * (plus - minus) * offset,
+                              0.0)
+    return offset, correction
+# end of function _parabola
+
+
+def find_peaks(z, count: int = 5, size: int = 3):
+    """Return the count + 1 strongest local maxima of each data set of the
+    (nb sets, nx, ny) stack z, strongest first: (row, col, value) arrays of
+    shape (nb sets, count + 1) with fractional refined grid indices. A
+    local maximum is the maximum of its size x size neighbourhood, which
+    must not be flat, and strictly above the neighbours preceding it in
+    row major order: of equal neighbouring samples (peak between samples,
+    plateau) only the first is a maximum. The maximum of each set is always
+    found.
+    Missing peaks are NaN. Non finite values are ignored.
+    """
+    z = np.asarray(z, dtype=float)
+    nb_sets, nx, ny = z.shape
+    z = np.where(np.isfinite(z), z, -np.inf)
+    neighbourhood = ndimage.maximum_filter(z, size=(1, size, size),
+                                           mode='constant', cval=-np.inf)
+    # flat neighbourhoods (e.g. -99 dB floor) are not maxima, except the
+    # maximum of the set
+    lowest = ndimage.minimum_filter(z, size=(1, size, size), mode='nearest')
+    # ties are broken in favour of the first sample in row major order
+    preceding = np.zeros(size * size, dtype=bool)
+    preceding[:(size // 2) * size + size // 2] = True
+    before = ndimage.maximum_filter(
+        z, footprint=preceding.reshape(1, size, size), mode='constant',
+        cval=-np.inf)
+    maximum = np.zeros(z.shape, dtype=bool).reshape(nb_sets, -1)
+    maximum[np.arange(nb_sets), np.argmax(z.reshape(nb_sets, -1), axis=1)] = \
+        True
+    maximum = maximum.reshape(z.shape)
+    candidates = np.where((((z == neighbourhood) & (z > lowest) &
+                            (z > before)) | maximum) & (z > -np.inf), z,
+                          -np.inf)
+    flat = candidates.reshape(nb_sets, -1)
+    k = min(count + 1, flat.shape[1])
+    # strongest candidates, sorted
+    best = np.argpartition(-flat, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(flat, best, axis=1), axis=1,
+                       kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    found = np.take_along_axis(flat, best, axis=1) > -np.inf
+    row, col = np.divmod(best, ny)
+    s = np.arange(nb_sets)[:, None]
+
+    # neighbours along each axis, clamped at the grid edges
+    def value(r, c):
+        return z[s, np.clip(r, 0, nx - 1), np.clip(c, 0, ny - 1)]
+
+    center = value(row, col)
+    row_offset, row_correction = _parabola(
+        np.where(row > 0, value(row - 1, col), -np.inf), center,
+        np.where(row < nx - 1, value(row + 1, col), -np.inf))
+    col_offset, col_correction = _parabola(
+        np.where(col > 0, value(row, col - 1), -np.inf), center,
+        np.where(col < ny - 1, value(row, col + 1), -np.inf))
+
+    result = (row + row_offset, col + col_offset,
+              center + row_correction + col_correction)
+    padding = np.full((nb_sets, count + 1 - k), np.nan)
+    return tuple(np.hstack((np.where(found, r, np.nan), padding))
+                 for r in result)
+# end of function find_peaks
+
+
+def grid_value(grid, row, col):
+    """Return values of the 2D grid at fractional indices (row, col), NaN
+    indices giving NaN. Bilinear interpolation is used; where it is not
+    finite (e.g. next to points out of the Earth disc) the nearest grid
+    value is returned.
+    """
+    row = np.asarray(row, dtype=float)
+    col = np.asarray(col, dtype=float)
+    valid = np.isfinite(row) & np.isfinite(col)
+    coordinates = np.array([np.where(valid, row, 0), np.where(valid, col, 0)])
+    values = ndimage.map_coordinates(np.asarray(grid, dtype=float),
+                                     coordinates.reshape(2, -1), order=1,
+                                     mode='nearest').reshape(row.shape)
+    nearest = np.asarray(grid)[
+        np.clip(np.rint(coordinates[0]).astype(int), 0,
+                np.shape(grid)[0] - 1),
+        np.clip(np.rint(coordinates[1]).astype(int), 0,
+                np.shape(grid)[1] - 1)]
+    values = np.where(np.isfinite(values), values, nearest)
+    return np.where(valid, values, np.nan)
+# end of function grid_value
+
+# end of module peaks
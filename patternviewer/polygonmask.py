@@ -0,0 +1,129 @@
+"""This module provides rasterisation of polygons on pattern grids.
+A polygon (e.g. read from a .gxt file by polygon.getpolygons) is converted
+into a boolean mask of the (lon, lat) grid points it contains, with a single
+vectorized call. Masks are cached by polygon vertices and grid, so that the
+statistics of many patterns sharing a grid are computed inside hundreds of
+polygons without testing the grid points again.
+"""
+
+# silence empty slices warnings
+import warnings
+
+# import numpy for arrays manipulation
+import numpy as np
+# point in polygon test
+from matplotlib.path import Path
+
+# memoization of computed masks
+from patternviewer.cache import Cache, fingerprint
+
+# masks shared by all patterns
+MASKS = Cache(maxsize=1024)
+
+# default percentiles of gain inside polygons
+DEFAULT_PERCENTILES = (5, 50)
+
+
+def vertices(polygon):
+    """Return (lon, lat, gain) vectors of polygon, an object with longitude,
+    latitude and gain methods (see Polygon) or a (lon, lat, gain) tuple.
+    """
+    if isinstance(polygon, tuple):
+        lon, lat, gain = polygon
+    else:
+        lon, lat, gain = polygon.longitude(), polygon.latitude(), \
+            polygon.gain()
+    return np.asarray(lon, dtype=float), np.asarray(lat, dtype=float), gain
+# end of function vertices
+
+
+def rasterize(lon_vertex, lat_vertex, lon, lat):
+    """Return boolean mask of points (lon, lat), arrays of any shape, inside
+    the polygon of vertices (lon_vertex, lat_vertex).
+    Only points in the polygon bounding box are tested. Polygons defined
+    beyond the [-180, 180] longitude range are tested with points
+    longitudes shifted by 360 degrees.
+    """
+    path = Path(np.column_stack((lon_vertex, lat_vertex)))
+    lon = np.ravel(lon)
+    lat = np.ravel(lat)
+    mask = np.zeros(len(lon), dtype=bool)
+    lon_min, lon_max = np.min(lon_vertex), np.max(lon_vertex)
+    lat_min, lat_max = np.min(lat_vertex), np.max(lat_vertex)
+    for shift in (0, 360, -360):
+        if (shift > 0 and lon_max <= 180) or (shift < 0 and lon_min >= -180):
+            continue
+        shifted = lon + shift
+        with np.errstate(invalid='ignore'):
+            candidates = np.flatnonzero(
+                (shifted >= lon_min) & (shifted <= lon_max) &
+                (lat >= lat_min) & (lat <= lat_max))
+        if len(candidates):
+            mask[candidates] |= path.contains_points(
+                np.column_stack((shifted[candidates], lat[candidates])))
+    return mask
+# end of function rasterize
+
+
+def polygon_mask(polygon, lon, lat, grid=None):
+    """Return read-only boolean mask (flattened) of the grid points
+    (lon, lat) inside polygon. Masks are cached by polygon and grid.
+    grid is the fingerprint of (lon, lat), computed if not provided.
+    """
+    lon_vertex, lat_vertex, _ = vertices(polygon)
+
+    def compute():
+        mask = rasterize(lon_vertex, lat_vertex, lon, lat)
+        mask.flags.writeable = False
+        return mask
+
+    if grid is None:
+        grid = fingerprint(lon, lat)
+    key = fingerprint(lon_vertex, lat_vertex), grid
+    return MASKS.get(key, compute)
+# end of function polygon_mask
+
+
+def statistics(polygons, gains, lon, lat,
+               percentiles=DEFAULT_PERCENTILES):
+    """Return statistics of gains inside each polygon.
+    gains are defined on the (lon, lat) grid, with optional trailing axes
+    (e.g. data sets or patterns sharing the grid) processed at once.
+    Return a dictionary of (nb polygons,) + trailing shape arrays: points
+    (number of grid points inside), required (polygon gain), min, mean,
+    one 'pXX' entry per percentile and margin (min minus required gain).
+    Undefined gains (NaN) are ignored, statistics of polygons without any
+    grid point are NaN.
+    """
+    gains = np.asarray(gains, dtype=float)
+    trailing = gains.shape[np.ndim(lon):]
+    gains = gains.reshape((np.size(lon),) + trailing)
+    shape = (len(polygons),) + trailing
+    result = {'points': np.zeros(len(polygons), dtype=int),
+              'required': np.zeros(len(polygons)),
+              'min': np.full(shape, np.nan),
+              'mean': np.full(shape, np.nan)}
+    for p in percentiles:
+        result['p{0:g}'.format(p)] = np.full(shape, np.nan)
+    grid = fingerprint(lon, lat)
+    for k, polygon in enumerate(polygons):
+        result['required'][k] = vertices(polygon)[2]
+        inside = gains[polygon_mask(polygon, lon, lat, grid)]
+        result['points'][k] = len(inside)
+        if len(inside) == 0:
+            continue
+        with warnings.catch_warnings():
+            # polygons where all gains are undefined give NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result['min'][k] = np.nanmin(inside, axis=0)
+            result['mean'][k] = np.nanmean(inside, axis=0)
+            if len(percentiles):
+                values = np.nanpercentile(inside, percentiles, axis=0)
+                for p, v in zip(percentiles, values):
+                    result['p{0:g}'.format(p)][k] = v
+    result['margin'] = result['min'] - np.reshape(
+        result['required'], (len(polygons),) + (1,) * len(trailing))
+    return result
+# end of function statistics
+
+# end of module polygonmask
@@ -0,0 +1,142 @@
+"""This module provides integration of patterns over the sphere.
+The solid angle represented by each point of a native grid is the product
+of trapezoidal weights along both grid axes and of the Jacobian of the grid
+coordinates (uv, theta/phi, az/el, el over az, az over el). Weights are
+computed once per grid, and the mask of the directions which see the Earth
+once per grid and satellite altitude. Integrals of |E|^2 of any number of
+layers (data sets, excitation laws) are computed with one tensor product.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# import constant file
+import patternviewer.constant as cst
+# memoization of computed arrays
+from patternviewer.cache import Cache, fingerprint
+
+# solid angle weights and Earth masks shared by all patterns
+WEIGHTS = Cache(maxsize=32)
+EARTH_MASKS = Cache(maxsize=32)
+
+
+def _uv(x, y):
+    """Return solid angle per unit of uv grid: du dv = cos(theta) dOmega,
+    directions beyond the unit circle do not exist.
+    """
+    w2 = 1 - x ** 2 - y ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(w2 > 0, 1 / np.sqrt(np.maximum(w2, 0.0)), 0.0)
+# end of function _uv
+
+
+def _thetaphi(x, y):
+    """Return solid angle per unit of theta/phi grid:
+    dOmega = sin(theta) dtheta dphi.
+    """
+    return np.abs(np.sin(x * cst.DEG2RAD)) * cst.DEG2RAD ** 2
+# end of function _thetaphi
+
+
+def _azel(x, y):
+    """Return solid angle per unit of az/el grid, (az, el) being polar
+    coordinates: daz del = theta dtheta dphi.
+    """
+    theta = np.hypot(x, y) * cst.DEG2RAD
+    return np.sinc(theta / np.pi) * cst.DEG2RAD ** 2
+# end of function _azel
+
+
+def _elovaz(x, y):
+    """Return solid angle per unit of el over az grid:
+    u = -sin(az) cos(el), v = sin(el), dOmega = cos(el) daz del.
+    """
+    return np.abs(np.cos(y * cst.DEG2RAD)) * cst.DEG2RAD ** 2
+# end of function _elovaz
+
+
+def _azovel(x, y):
+    """Return solid angle per unit of az over el grid:
+    u = -sin(az), v = cos(az) sin(el), dOmega = cos(az) daz del.
+    """
+    return np.abs(np.cos(x * cst.DEG2RAD)) * cst.DEG2RAD ** 2
+# end of function _azovel
+
+
+# solid angle per unit of native coordinates, by standardised grid type
+JACOBIANS = {1: _uv,
+             2: _thetaphi,
+             3: _azel,
+             4: _elovaz,
+             5: _azovel}
+
+
+def trapezoid(v):
+    """Return trapezoidal integration weights of the points of vector v.
+    """
+    v = np.asarray(v, dtype=float)
+    if len(v) < 2:
+        return np.ones(len(v))
+    step = np.abs(np.diff(v))
+    weights = np.zeros(len(v))
+    weights[:-1] += step / 2
+    weights[1:] += step / 2
+    return weights
+# end of function trapezoid
+
+
+def solid_angles(x, y, grid):
+    """Return solid angle in steradians represented by each point of the
+    regular native grid (x, y) of standardised type grid (see
+    AbstractPattern.grid_type), x varying along either axis. Angles are in
+    degrees, u and v without unit. Result is read-only and cached.
+    """
+    def compute():
+        gx = np.asarray(x, dtype=float)
+        gy = np.asarray(y, dtype=float)
+        # x varies along the second axis of transposed grids
+        if gx[0, 0] == gx[1, 0]:
+            rows, columns = gy[:, 0], gx[0, :]
+        else:
+            rows, columns = gx[:, 0], gy[0, :]
+        weights = trapezoid(rows)[:, None] * trapezoid(columns)[None, :] * \
+            JACOBIANS[grid](gx, gy)
+        weights.flags.writeable = False
+        return weights
+
+    return WEIGHTS.get((grid, fingerprint(x, y)), compute)
+# end of function solid_angles
+
+
+def earth_disc(az, el, altitude):
+    """Return read-only mask of the (az, el) directions of the satellite
+    frame (degrees, see AbstractPattern.satellite_azel) which see the
+    Earth from altitude (m). Cached by directions and altitude.
+    """
+    def compute():
+        # Earth half angle seen from the satellite
+        half_angle = np.arcsin(cst.EARTH_RAD_EQUATOR_M /
+                               (cst.EARTH_RAD_EQUATOR_M + altitude))
+        with np.errstate(invalid='ignore'):
+            mask = (np.abs(az) < 90) & (np.abs(el) < 90) & \
+                (np.tan(az * cst.DEG2RAD) ** 2 +
+                 np.tan(el * cst.DEG2RAD) ** 2 <= np.tan(half_angle) ** 2)
+        mask.flags.writeable = False
+        return mask
+
+    return EARTH_MASKS.get((fingerprint(az, el), altitude), compute)
+# end of function earth_disc
+
+
+def integrate(power, weights, mask=None):
+    """Return integral of power over the grid: power is a (nx, ny, ...)
+    array, trailing axes are integrated at once. mask restricts the
+    integration to part of the grid.
+    """
+    if mask is not None:
+        weights = np.where(mask, weights, 0.0)
+    return np.tensordot(weights, np.nan_to_num(power), axes=([0, 1],
+                                                            [0, 1]))
+# end of function integrate
+
+# end of module quadrature
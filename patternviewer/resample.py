@@ -0,0 +1,79 @@
+"""This module provides resampling of data from a regular source grid onto
+arbitrary target points with a precomputed sparse weight matrix.
+Once the matrix is built, resampling any number of data layers (data sets,
+excitation laws, polarisations) is a single sparse matrix product.
+Matrices are cached by source and target grids fingerprint, except for
+callers resampling target points chunk by chunk, whose matrices are used
+once and would only evict the reusable ones.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# sparse matrices
+from scipy import sparse
+
+# memoization of computed matrices
+from patternviewer.cache import Cache, fingerprint
+# interpolation weights on regular grid
+from patternviewer.interpolation import GridInterpolator
+
+# resamplers shared by all patterns
+RESAMPLERS = Cache(maxsize=16)
+
+
+class Resampler(object):
+    """Sparse linear operator resampling data defined on the regular grid
+    x, y (RectBivariateSpline conventions) onto target points.
+    """
+
+    def __init__(self, x, y, target_x, target_y, method='linear'):
+        """Build the weight matrix from grid x, y to points
+        (target_x, target_y). method is one of the GridInterpolator methods.
+        """
+        interpolator = GridInterpolator(x, y, method=method)
+        index, weight = interpolator.weights(target_x, target_y)
+        nb_points, k = index.shape
+        self._source_shape = interpolator.shape()
+        self._target_shape = np.shape(target_x)
+        self._matrix = sparse.csr_matrix(
+            (weight.ravel(), index.ravel(),
+             np.arange(0, nb_points * k + 1, k)),
+            shape=(nb_points, self._source_shape[0] * self._source_shape[1]))
+    # end of constructor
+
+    def matrix(self):
+        """Return the sparse (nb target points, nb grid points) matrix.
+        """
+        return self._matrix
+    # end of function matrix
+
+    def resample(self, values):
+        """Return values resampled on the target points.
+        values first two axes are the source grid axes, trailing axes
+        (e.g. data sets or laws) are resampled at once. Result shape is the
+        target points shape followed by the trailing axes.
+        """
+        values = np.asarray(values)
+        trailing = values.shape[2:]
+        layers = values.reshape(self._matrix.shape[1], -1)
+        result = self._matrix @ layers
+        return result.reshape(self._target_shape + trailing)
+    # end of function resample
+
+# end of class Resampler
+
+
+def get_resampler(x, y, target_x, target_y, method='linear',
+                  cache: bool = True):
+    """Return a Resampler from grid x, y to points (target_x, target_y).
+    Resamplers are cached by grids fingerprint and method, unless cache is
+    False (target points used once, e.g. chunks of a large target).
+    """
+    if not cache:
+        return Resampler(x, y, target_x, target_y, method)
+    key = fingerprint(x, y), fingerprint(target_x, target_y), method
+    return RESAMPLERS.get(
+        key, lambda: Resampler(x, y, target_x, target_y, method))
+# end of function get_resampler
+
+# end of module resample
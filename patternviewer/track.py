@@ -0,0 +1,380 @@
+"""This module provides streaming evaluation of pattern gains along
+terminal tracks (aircraft, vessels). Tracks are csv files of timestamped
+positions or KML files (gx:Track, LineString or timestamped Point
+placemarks). They are read by chunks of positions. The gains of all data
+sets of all patterns are interpolated with interpolators built once per
+grid, and written chunk by chunk, so that memory does not depend on the
+track length. With several beams, the best beam (highest gain) of each
+position is reported.
+
+Usage:
+    python -m patternviewer.track flight.csv beams.grd -o gains.csv
+    python -m patternviewer.track vessel.kml east.grd west.grd --chunk 16384
+"""
+
+# import argument parser
+import argparse
+# import csv reader and writer
+import csv
+# queue of KML timestamps
+from collections import deque
+# streaming xml parser
+import xml.etree.ElementTree as ET
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# debug trace utility
+import patternviewer.utils as utils
+# memoization of computed arrays
+from patternviewer.cache import fingerprint
+# regular grid interpolation weights
+from patternviewer.interpolation import GridInterpolator
+# patterns configuration
+import patternviewer.batch as batch
+# pattern files reader
+from patternviewer.compliance import read_pattern
+
+# default number of positions processed at once
+DEFAULT_CHUNK = 65536
+
+# accepted csv column names, lower case
+TIME_COLUMNS = ('time', 'timestamp', 'datetime', 'date', 'when')
+LON_COLUMNS = ('lon', 'longitude', 'long')
+LAT_COLUMNS = ('lat', 'latitude')
+
+
+def _chunk(times, lon, lat):
+    """Return chunk tuple (times, lon, lat) of accumulated positions.
+    """
+    return times, np.array(lon, dtype=float), np.array(lat, dtype=float)
+# end of function _chunk
+
+
+def read_csv(filename, chunk: int = DEFAULT_CHUNK):
+    """Yield (times, lon, lat) chunks of at most chunk positions of the csv
+    track file filename: times is a list of strings (empty when the file
+    has no time column), lon and lat arrays in degrees. Columns are found
+    by name in the header (e.g. time, lon, lat). Without header, columns
+    are time, lon, lat (or lon, lat for two columns).
+    """
+    with open(filename, 'r', newline='') as file:
+        reader = csv.reader(file)
+        first = next(reader, None)
+        if first is None:
+            return
+        names = [name.strip().lower() for name in first]
+        try:
+            float(names[-1])
+            header = False
+        except ValueError:
+            header = True
+        if header:
+            def column(candidates):
+                for name in candidates:
+                    if name in names:
+                        return names.index(name)
+                return None
+            time_col = column(TIME_COLUMNS)
+            lon_col = column(LON_COLUMNS)
+            lat_col = column(LAT_COLUMNS)
+            if lon_col is None or lat_col is None:
+                raise ValueError('No longitude or latitude column in ' +
+                                 filename)
+            rows = reader
+        else:
+            time_col, lon_col, lat_col = (None, 0, 1) if len(first) < 3 \
+                else (0, 1, 2)
+            rows = _prepend(first, reader)
+        times, lon, lat = [], [], []
+        for row in rows:
+            if not row:
+                continue
+            times.append('' if time_col is None else row[time_col])
+            lon.append(row[lon_col])
+            lat.append(row[lat_col])
+            if len(lon) == chunk:
+                yield _chunk(times, lon, lat)
+                times, lon, lat = [], [], []
+        if lon:
+            yield _chunk(times, lon, lat)
+# end of function read_csv
+
+
+def _prepend(row, rows):
+    """Yield row then the rows of iterator rows.
+    """
+    yield row
+    yield from rows
+# end of function _prepend
+
+
+def _tag(element):
+    """Return tag of element without namespace.
+    """
+    return element.tag.rsplit('}', 1)[-1]
+# end of function _tag
+
+
+def _elements(filename):
+    """Yield (event, tag, element, parent tag) of the start and end events
+    of xml file filename, tags without namespace. Elements are removed from
+    their parent once read, so that memory does not depend on the file
+    size.
+    """
+    parents = []
+    for event, element in ET.iterparse(filename, events=('start', 'end')):
+        if event == 'end':
+            parents.pop()
+        parent = _tag(parents[-1]) if parents else None
+        yield event, _tag(element), element, parent
+        if event == 'start':
+            parents.append(element)
+        elif parents:
+            parents[-1].remove(element)
+# end of function _elements
+
+
+def _track_whens(filename):
+    """Yield (track number, time) of the when elements of the gx:Track
+    elements of KML file filename, tracks numbered in document order.
+    """
+    track = -1
+    for event, tag, element, parent in _elements(filename):
+        if event == 'start':
+            if tag == 'Track':
+                track += 1
+        elif tag == 'when' and parent == 'Track':
+            yield track, (element.text or '').strip()
+# end of function _track_whens
+
+
+def read_kml(filename, chunk: int = DEFAULT_CHUNK):
+    """Yield (times, lon, lat) chunks of at most chunk positions of the KML
+    track file filename. Positions are the gx:coord of gx:Track elements,
+    paired by order with their when elements, and the coordinates of
+    LineString and Point placemarks (timed by a TimeStamp if any). The file
+    is parsed incrementally and read elements are removed. KML writes all
+    the when elements of a gx:Track before its gx:coord elements: they are
+    read by a second parser of the file, advanced as coordinates arrive,
+    so that memory does not depend on the track length.
+    """
+    times, lon, lat = [], [], []
+    whens = _track_whens(filename)
+    # next track when, None once all read
+    pending = next(whens, None)
+    # number of the current gx:Track
+    track = -1
+    # TimeStamp of the current placemark
+    stamps = deque()
+    try:
+        for event, tag, element, parent in _elements(filename):
+            if event == 'start':
+                if tag == 'Track':
+                    track += 1
+                elif tag == 'Placemark':
+                    stamps.clear()
+            elif tag == 'when' and parent != 'Track':
+                stamps.append((element.text or '').strip())
+            elif tag in ('coord', 'coordinates'):
+                text = (element.text or '').strip()
+                if tag == 'coord':
+                    # gx:coord is lon lat alt
+                    points = [text.split()] if text else []
+                    # when of the same rank in the same track
+                    while pending is not None and pending[0] < track:
+                        pending = next(whens, None)
+                    if pending is not None and pending[0] == track:
+                        time = [pending[1]]
+                        pending = next(whens, None)
+                    else:
+                        time = ['']
+                else:
+                    # coordinates is a list of lon,lat[,alt] tuples
+                    points = [p.split(',') for p in text.split()]
+                    time = [stamps.popleft() if stamps else ''
+                            for _ in points]
+                for t, point in zip(time, points):
+                    times.append(t)
+                    lon.append(point[0])
+                    lat.append(point[1])
+                    if len(lon) == chunk:
+                        yield _chunk(times, lon, lat)
+                        times, lon, lat = [], [], []
+    finally:
+        whens.close()
+    if lon:
+        yield _chunk(times, lon, lat)
+# end of function read_kml
+
+
+def read_track(filename, chunk: int = DEFAULT_CHUNK):
+    """Yield (times, lon, lat) chunks of track file filename, csv or KML
+    according to its extension.
+    """
+    if filename.lower().endswith('.kml'):
+        return read_kml(filename, chunk)
+    if filename.lower().endswith(('.csv', '.txt')):
+        return read_csv(filename, chunk)
+    raise ValueError('Unknown track file format: ' + filename)
+# end of function read_track
+
+
+def _format(fmt, values):
+    """Return list of the values of array values formatted with fmt.
+    """
+    return [fmt % v for v in values.tolist()]
+# end of function _format
+
+
+class TrackEvaluator(object):
+    """Gains of all data sets of several patterns at batches of positions.
+    """
+
+    def __init__(self, patterns, method: str = 'linear'):
+        """Create the evaluator of patterns, a dictionary of pattern objects
+        by key. Data sets of one pattern sharing a grid are interpolated
+        at once: interpolation weights are computed once per position and
+        grid. method is 'nearest', 'linear' or 'cubic' (see
+        interpolation.GridInterpolator).
+        """
+        utils.trace('in')
+        # (key, set) of each beam, i.e. each column of the gains
+        self._beams = []
+        # (pattern, [(interpolator, data, columns)]) per pattern
+        self._patterns = []
+        for key, pattern in patterns.items():
+            groups = {}
+            for s in range(pattern.nb_sets()):
+                x, y, z = pattern.native_axes(pattern.plotted(s), s)
+                group = groups.setdefault(fingerprint(x, y),
+                                          (x, y, [], []))
+                group[2].append(z.ravel() + pattern._conversion_factor)
+                group[3].append(len(self._beams))
+                self._beams.append((key, s))
+            self._patterns.append((pattern, [
+                (GridInterpolator(x, y, method=method),
+                 np.stack(data, axis=-1), columns)
+                for x, y, data, columns in groups.values()]))
+        utils.trace('out')
+    # end of constructor
+
+    def beams(self):
+        """Return list of (pattern key, set) of the beams, in gains columns
+        order.
+        """
+        return self._beams
+    # end of function beams
+
+    def evaluate(self, lon, lat):
+        """Return (nb positions, nb beams) gains in dB at positions (lon,
+        lat) vectors. Positions which do not see the satellite are NaN.
+        """
+        lon = np.ravel(np.asarray(lon, dtype=float))
+        lat = np.ravel(np.asarray(lat, dtype=float))
+        gains = np.empty((len(lon), len(self._beams)))
+        for pattern, groups in self._patterns:
+            x, y = pattern.azel2xy(*pattern.lonlat2azel(lon, lat))
+            for interpolator, data, columns in groups:
+                index, weight = interpolator.weights(x, y)
+                for k, c in enumerate(columns):
+                    gains[:, c] = np.einsum('ij,ij->i', data[index, k],
+                                            weight)
+        return gains
+    # end of function evaluate
+
+    def best(self, gains):
+        """Return (beam index, gain) of the best beam of each position of
+        gains, -1 and NaN where no beam is defined.
+        """
+        finite = np.where(np.isfinite(gains), gains, -np.inf)
+        index = np.argmax(finite, axis=1)
+        gain = finite[np.arange(len(gains)), index]
+        defined = gain > -np.inf
+        return np.where(defined, index, -1), np.where(defined, gain, np.nan)
+    # end of function best
+
+    def labels(self):
+        """Return column label of each beam: pattern key, followed by the
+        set number for patterns with several sets.
+        """
+        counts = {}
+        for key, _ in self._beams:
+            counts[key] = counts.get(key, 0) + 1
+        return [str(key) if counts[key] == 1 else
+                '{0} set {1:d}'.format(key, s) for key, s in self._beams]
+    # end of function labels
+
+    def run(self, track, output, chunk: int = DEFAULT_CHUNK,
+            best: bool = True, progress=None):
+        """Evaluate gains along track file track (see read_track) and write
+        them to csv file output chunk by chunk: time, longitude, latitude,
+        gain of each beam and, if best is True, best beam label and gain.
+        progress is called with the number of positions processed after
+        each chunk. Return the number of positions.
+        """
+        labels = self.labels()
+        count = 0
+        with open(output, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['time', 'longitude', 'latitude'] + labels +
+                            (['best beam', 'best gain'] if best else []))
+            for times, lon, lat in read_track(track, chunk):
+                gains = self.evaluate(lon, lat)
+                # numbers are formatted by column, csv quotes the strings
+                columns = [times, _format('%0.6f', lon),
+                           _format('%0.6f', lat)] + \
+                    [_format('%0.3f', g) for g in gains.T]
+                if best:
+                    index, gain = self.best(gains)
+                    columns.append([labels[i] if i >= 0 else ''
+                                    for i in index])
+                    columns.append(_format('%0.3f', gain))
+                writer.writerows(zip(*columns))
+                count += len(lon)
+                if progress is not None:
+                    progress(count)
+        return count
+    # end of function run
+
+# end of class TrackEvaluator
+
+
+def main():
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Pattern gains along terminal tracks.')
+    parser.add_argument('track', help='track file (.csv or .kml)')
+    parser.add_argument('patterns', nargs='+',
+                        help='pattern files or glob patterns (*.grd, *.pat)')
+    parser.add_argument('--method', default='linear',
+                        choices=['nearest', 'linear', 'cubic'],
+                        help='interpolation method (default linear)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK,
+                        help='positions processed at once')
+    parser.add_argument('--no-best', action='store_true',
+                        help='do not report the best beam')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude in degrees')
+    parser.add_argument('-o', '--output', default='track.csv',
+                        help='gains csv file (default track.csv)')
+    args = parser.parse_args()
+
+    files = batch.input_files(args.patterns)
+    if not files:
+        parser.error('no pattern file in the inputs')
+    config = batch.default_config()
+    config['sat_lon'] = args.sat_lon
+    patterns = {f: read_pattern(f, config) for f in files}
+    evaluator = TrackEvaluator(patterns, args.method)
+    count = evaluator.run(
+        args.track, args.output, args.chunk, not args.no_best,
+        lambda n: print('{0:d} positions'.format(n), end='\r'))
+    print('{0:d} positions, {1:d} beams, gains written to {2}'.format(
+        count, len(evaluator.beams()), args.output))
+# end of main function
+
+
+if __name__ == '__main__':
+    main()
+# end of module track
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Report of the gain loss at stations under a Gaussian pointing error.
+For each station of a .sta file, the nominal gain and the mean, standard
+deviation and percentiles of the gain loss are written in a csv file.
+"""
+
+# import argument parser
+import argparse
+
+# import numpy
+import numpy as np
+
+# import patterns classes
+from patternviewer.element.pattern.grd import Grd
+from patternviewer.element.pattern.pat import Pat
+import patternviewer.constant as cst
+import patternviewer.element.station as stn
+import patternviewer.utils as utils
+
+
+def main():
+    utils.mute(True)
+
+    # parse command line
+    parser = argparse.ArgumentParser(
+        description='Gain loss statistics under Gaussian pointing error.')
+    parser.add_argument('pattern', help='.grd or .pat pattern file')
+    parser.add_argument('stations', help='.sta stations file')
+    parser.add_argument('output', help='output csv file')
+    parser.add_argument('--sat-lon', type=float, default=0.0,
+                        help='satellite longitude (deg)')
+    parser.add_argument('--sat-alt', type=float, default=cst.ALTGEO,
+                        help='satellite altitude (m)')
+    parser.add_argument('--sigma-az', type=float, default=0.1,
+                        help='pointing error standard deviation in az (deg)')
+    parser.add_argument('--sigma-el', type=float, default=0.1,
+                        help='pointing error standard deviation in el (deg)')
+    parser.add_argument('--rho', type=float, default=0.0,
+                        help='az/el pointing error correlation coefficient')
+    parser.add_argument('--percentiles', default='50,90,95,99',
+                        help='comma separated percentiles of the loss')
+    parser.add_argument('--rotate', action='store_true',
+                        help='rotate pattern by 180 degrees')
+    parser.add_argument('--second-pol', action='store_true',
+                        help='use second polarisation as copol')
+    args = parser.parse_args()
+
+    # pattern config
+    config = {}
+    config['filename'] = args.pattern
+    config['sat_lon'] = args.sat_lon
+    config['sat_lat'] = 0
+    config['sat_alt'] = args.sat_alt
+    config['rotate'] = args.rotate
+    config['use_second_pol'] = args.second_pol
+
+    # import data
+    if args.pattern[-3:] == 'pat':
+        pattern = Pat(conf=config, parent=None)
+    else:
+        pattern = Grd(conf=config, parent=None)
+    stations_list = stn.get_station_from_file(
+        filename=args.stations, earthplot=None)
+    lon = np.array([s.configure()['longitude'] for s in stations_list])
+    lat = np.array([s.configure()['latitude'] for s in stations_list])
+
+    # pointing error covariance
+    cov_azel = args.rho * args.sigma_az * args.sigma_el
+    covariance = [[args.sigma_az ** 2, cov_azel],
+                  [cov_azel, args.sigma_el ** 2]]
+    percentiles = [float(p) for p in args.percentiles.split(',')]
+    stats = pattern.pointing_loss(lon, lat, covariance, percentiles)
+
+    # write report
+    outfile = open(args.output, 'w')
+    temp = 'Name,Tag,Longitude,Latitude,Gain,Mean loss,Std loss,'
+    temp = temp + ','.join('P{0:g} loss'.format(p) for p in percentiles)
+    outfile.write(temp + '\n')
+    for i, station in enumerate(stations_list):
+        conf = station.configure()
+        temp = '{0},{1},{2:0.4f},{3:0.4f},{4:0.2f},{5:0.3f},{6:0.3f}'.format(
+            conf['name'], conf['tag'], lon[i], lat[i],
+            stats['nominal'][i], stats['mean'][i], stats['std'][i])
+        for p in percentiles:
+            temp = temp + ',{0:0.3f}'.format(stats['percentiles'][p][i])
+        outfile.write(temp + '\n')
+    outfile.close()
+# end of main function
+
+
+# Main execution
+if __name__ == '__main__':
+    main()
+# end of module pointingloss
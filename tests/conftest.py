@@ -0,0 +1,38 @@
+"""Shared fixtures of the tests. Pattern objects need the display
+dependencies, tests using them are skipped without them.
+"""
+
+# import pytest for fixtures and optional dependencies
+import pytest
+
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+
+@pytest.fixture
+def make_pattern(tmp_path):
+    """Return function writing a .grd file and reading it back as a pattern
+    object: make_pattern(co, grid, limits, cr=None, name='beam.grd',
+    **config). co and cr are lists of (ny, nx) fields, grid the .grd grid
+    type, limits the list of (xs, ys, xe, ye) of each set and config the
+    changes to the default configuration.
+    """
+    pytest.importorskip('PyQt5.QtWidgets')
+    pytest.importorskip('mpl_toolkits.basemap')
+    pytest.importorskip('pyproj')
+    # patterns configuration
+    import patternviewer.batch as batch
+    # pattern files reader
+    from patternviewer.compliance import read_pattern
+
+    def make(co, grid, limits, cr=None, name='beam.grd', **config):
+        filename = str(tmp_path / name)
+        fileformat.write_grd(filename, grid, limits, co, cr)
+        conf = batch.default_config()
+        conf.update(config)
+        return read_pattern(filename, conf)
+
+    return make
+# end of function make_pattern
+
+# end of module conftest
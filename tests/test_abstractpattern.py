@@ -0,0 +1,191 @@
+"""Tests of the pattern processing features of AbstractPattern, on .grd files
+of analytic beams.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# import pytest for parametrized tests
+import pytest
+
+# import angles conversion functions
+import patternviewer.angles as angles
+
+# curvatures in dB/deg^2 and center in degrees of the paraboloid beam
+A, B = 2.0, 3.0
+AZ0, EL0 = 0.5, -0.2
+
+# az/el .grd grid
+GRID = 5
+LIMITS = [(-4, -3, 4, 3)]
+AZ, EL = np.meshgrid(np.linspace(-4, 4, 81), np.linspace(-3, 3, 61))
+
+
+def paraboloid(az, el):
+    """Return gain in dBi of the paraboloid beam.
+    """
+    return 40 - A * (az - AZ0) ** 2 - B * (el - EL0) ** 2
+# end of function paraboloid
+
+
+def field(gain):
+    """Return field of gain in dB.
+    """
+    return np.power(10, gain / 20)
+# end of function field
+
+
+def test_pointing_loss(make_pattern):
+    pattern = make_pattern([field(paraboloid(AZ, EL))], GRID, LIMITS)
+    lon, lat = np.array([0.0, 3.0]), np.array([0.0, 2.0])
+    az, el = pattern.lonlat2azel(lon, lat)
+    covariance = np.array([[0.04, 0.01], [0.01, 0.09]])
+    result = pattern.pointing_loss(lon, lat, covariance, (50, 90))
+    assert np.allclose(result['nominal'], paraboloid(az, el))
+
+    # loss of a paraboloid: u.d + d.A.d
+    curvature = np.diag([A, B])
+    u = 2 * np.stack((A * (az - AZ0), B * (el - EL0)), axis=-1)
+    mean = np.trace(curvature @ covariance)
+    variance = np.einsum('si,ij,sj->s', u, covariance, u) + \
+        2 * np.trace(curvature @ covariance @ curvature @ covariance)
+    assert np.allclose(result['mean'], mean)
+    assert np.allclose(result['std'], np.sqrt(variance))
+
+    # Monte Carlo of the depointed gain
+    samples = np.random.default_rng(1).multivariate_normal(
+        [0, 0], covariance, 100000)
+    for k in range(2):
+        gain, _ = pattern.interpolate_copol(az[k] + samples[:, 0],
+                                            el[k] + samples[:, 1])
+        loss = result['nominal'][k] - gain
+        error = 4 * np.std(loss) / np.sqrt(len(loss))
+        assert abs(result['mean'][k] - np.mean(loss)) < error
+        for p in (50, 90):
+            assert np.isclose(result['percentiles'][p][k],
+                              np.percentile(loss, p), rtol=0.05)
+# end of function test_pointing_loss
+
+
+def test_pointing_loss_per_station(make_pattern):
+    pattern = make_pattern([field(paraboloid(AZ, EL))], GRID, LIMITS)
+    lon, lat = np.array([0.0, 3.0]), np.array([0.0, 2.0])
+    # error along azimuth only for the first station
+    covariance = np.array([[[0.04, 0.0], [0.0, 0.0]],
+                           [[0.01, 0.0], [0.0, 0.09]]])
+    result = pattern.pointing_loss(lon, lat, covariance)
+    assert np.allclose(result['mean'], [A * 0.04, A * 0.01 + B * 0.09])
+# end of function test_pointing_loss_per_station
+
+
+@pytest.mark.parametrize('grid, limits, to_azel', [
+    (5, (-4, -3, 4, 3), None),
+    (1, (-0.07, -0.05, 0.07, 0.05), angles.uv2azel),
+    (4, (-4, -3, 4, 3), angles.elovaz2azel)])
+def test_gradient(make_pattern, grid, limits, to_azel):
+    x, y = np.meshgrid(np.linspace(limits[0], limits[2], 81),
+                       np.linspace(limits[1], limits[3], 61))
+    az, el = (x, y) if to_azel is None else to_azel(x, y)
+    pattern = make_pattern([field(paraboloid(az, el))], grid, [limits])
+    points_az = np.array([[0.0, 1.5], [-2.0, 0.5]])
+    points_el = np.array([[0.0, -1.0], [1.5, 0.3]])
+    grad_az, grad_el = pattern.interpolate_gradient(points_az, points_el)
+    assert grad_az.shape == (2, 2)
+    # analytic gradient
+    assert np.allclose(grad_az, -2 * A * (points_az - AZ0), atol=0.05)
+    assert np.allclose(grad_el, -2 * B * (points_el - EL0), atol=0.05)
+    # finite differences of the interpolated pattern
+    h = 1e-4
+    for k, (d_az, d_el) in enumerate(((h, 0), (0, h))):
+        plus, _ = pattern.interpolate_copol(points_az + d_az,
+                                            points_el + d_el)
+        minus, _ = pattern.interpolate_copol(points_az - d_az,
+                                             points_el - d_el)
+        assert np.allclose((grad_az, grad_el)[k], (plus - minus) / (2 * h),
+                           atol=1e-4)
+    # stations
+    lon, lat = np.array([0.0, 3.0]), np.array([0.0, 2.0])
+    station_az, station_el = pattern.lonlat2azel(lon, lat)
+    slope = pattern.interpolate_azel_slope(station_az, station_el,
+                                           signed=True)
+    assert np.allclose(pattern.station_slope(lon, lat),
+                       (slope['Az'], slope['El']))
+    assert np.allclose(slope['Az'], -2 * A * (station_az - AZ0), atol=0.05)
+# end of function test_gradient
+
+
+def test_magnitude_cache(make_pattern):
+    co = [field(paraboloid(AZ, EL)), field(paraboloid(AZ, EL) - 3)]
+    cr = [field(paraboloid(AZ, EL) - 30), field(paraboloid(AZ, EL) - 20)]
+    # null field
+    cr[1][0, 0] = 0
+    pattern = make_pattern(co, GRID, LIMITS * 2, cr)
+    for s in (0, 1):
+        assert np.allclose(pattern.copol(s),
+                           20 * np.log10(np.abs(pattern.field(s))))
+    cross = pattern.cross(1)
+    assert cross.min() == -99
+    assert np.allclose(pattern.xpd(0), 30, atol=1e-6)
+    xpd = pattern.xpd(1)
+    assert np.count_nonzero(np.isinf(xpd)) == 1
+    assert np.allclose(xpd[np.isfinite(xpd)], 17, atol=1e-6)
+    # magnitudes are computed once
+    stats = pattern.cache_stats()
+    assert pattern.cross(1) is cross
+    assert pattern.cache_stats()['hits'] == stats['hits'] + 1
+    assert pattern.cache_stats()['misses'] == stats['misses']
+    # and again when the fields change
+    pattern.field_changed()
+    assert pattern.cross(1) is not cross
+    assert np.array_equal(pattern.cross(1), cross)
+# end of function test_magnitude_cache
+
+
+def test_azel_grid_cache(make_pattern):
+    limits = [(-0.07, -0.05, 0.07, 0.05)]
+    u, v = np.meshgrid(np.linspace(-0.07, 0.07, 81),
+                       np.linspace(-0.05, 0.05, 61))
+    first = make_pattern([field(paraboloid(u, v))], 1, limits, name='a.grd')
+    second = make_pattern([field(paraboloid(v, u))], 1, limits,
+                          name='b.grd')
+    az, el = first.azel_grid()
+    # conversion shared by patterns with the same grid
+    assert second.azel_grid()[0] is az
+    assert not az.flags.writeable and not el.flags.writeable
+    expected = angles.uv2azel(first._x[0], first._y[0])
+    assert np.allclose(az, expected[0]) and np.allclose(el, expected[1])
+    # same coordinates on another grid type
+    other = make_pattern([field(paraboloid(u, v))], 4, limits,
+                         name='c.grd')
+    assert other.azel_grid()[0] is not az
+    assert np.allclose(other.azel_grid()[0],
+                       angles.elovaz2azel(other._x[0], other._y[0])[0])
+# end of function test_azel_grid_cache
+
+
+def test_composite(make_pattern):
+    centers = [(-2, 0), (2, 1), (0, -2)]
+    co = [field(40 - (AZ - a) ** 2 - (EL - e) ** 2) for a, e in centers]
+    # spot beam on a smaller grid, of the same size
+    co.append(field(45 - 4 * ((AZ / 4) ** 2 + (EL / 4) ** 2)))
+    pattern = make_pattern(co, GRID, LIMITS * 3 + [(-1, -0.75, 1, 0.75)])
+    best, winner, second_best = pattern.composite(cross=False, second=True,
+                                                  method='cubic')
+    # composite on the grid of set 0
+    az, el = pattern._x[0], pattern._y[0]
+    assert best.shape == az.shape
+    gains = [40 - (az - a) ** 2 - (el - e) ** 2 for a, e in centers]
+    inside = (np.abs(az) <= 1) & (np.abs(el) <= 0.75)
+    gains.append(np.where(inside, 45 - 4 * (az ** 2 + el ** 2), -np.inf))
+    ranked = np.sort(gains, axis=0)
+    assert np.allclose(best, ranked[-1], atol=1e-5)
+    assert np.allclose(second_best, ranked[-2], atol=1e-5)
+    # winners where the two best gains are distinct
+    distinct = ranked[-1] - ranked[-2] > 1e-3
+    assert np.array_equal(winner[distinct],
+                          np.argmax(gains, axis=0)[distinct])
+    assert set(np.unique(winner)) == {0, 1, 2, 3}
+    # second best is only computed on demand
+    assert pattern.composite(cross=False)[2] is None
+# end of function test_composite
+
+# end of module test_abstractpattern
@@ -0,0 +1,102 @@
+"""Tests of the vectorized angle conversions against point by point
+implementations of the same formulae.
+"""
+
+# import math for scalar reference conversions
+import math
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# import angles conversion functions
+import patternviewer.angles as angles
+
+# uv grid including the origin and the axes
+U, V = np.meshgrid(np.linspace(-0.2, 0.2, 21), np.linspace(-0.15, 0.15, 31))
+# az/el grid in degrees including the origin and the axes
+AZ, EL = np.meshgrid(np.linspace(-10, 10, 21), np.linspace(-8, 8, 17))
+
+
+def scalar_uv2azel(u, v):
+    """Return (az, el) in degrees of direction (u, v).
+    """
+    r = math.hypot(u, v)
+    factor = math.asin(r) / r if r else 1
+    return -angles.RAD2DEG * u * factor, angles.RAD2DEG * v * factor
+# end of function scalar_uv2azel
+
+
+def scalar_uv2elovaz(u, v):
+    """Return (az, el) el over az in degrees of direction (u, v).
+    """
+    el = math.asin(v)
+    if v:
+        az = -math.asin(u / v * math.tan(el))
+    else:
+        az = -math.asin(u)
+    return az * angles.RAD2DEG, el * angles.RAD2DEG
+# end of function scalar_uv2elovaz
+
+
+def scalar_azel2uv(az, el):
+    """Return (u, v) of direction (az, el) in degrees.
+    """
+    az, el = az * angles.DEG2RAD, el * angles.DEG2RAD
+    r = math.hypot(az, el)
+    factor = math.sin(r) / r if r else 1
+    return -az * factor, el * factor
+# end of function scalar_azel2uv
+
+
+def pointwise(function, x, y):
+    """Return (x, y) arrays of scalar function applied to each point.
+    """
+    result = np.array([function(a, b) for a, b in zip(x.ravel(), y.ravel())])
+    return result[:, 0].reshape(x.shape), result[:, 1].reshape(x.shape)
+# end of function pointwise
+
+
+def test_uv2azel():
+    assert np.allclose(angles.uv2azel(U, V), pointwise(scalar_uv2azel, U, V),
+                       rtol=1e-12, atol=1e-12)
+# end of function test_uv2azel
+
+
+def test_uv2elovaz():
+    assert np.allclose(angles.uv2elovaz(U, V),
+                       pointwise(scalar_uv2elovaz, U, V),
+                       rtol=1e-12, atol=1e-12)
+# end of function test_uv2elovaz
+
+
+def test_azel2uv():
+    assert np.allclose(angles.azel2uv(AZ, EL),
+                       pointwise(scalar_azel2uv, AZ, EL),
+                       rtol=1e-12, atol=1e-12)
+# end of function test_azel2uv
+
+
+def test_round_trips():
+    for forward, backward in ((angles.azel2uv, angles.uv2azel),
+                              (angles.azel2elovaz, angles.elovaz2azel),
+                              (angles.azel2azovel, angles.azovel2azel),
+                              (angles.azel2thetaphi, angles.thetaphi2azel)):
+        az, el = backward(*forward(AZ, EL))
+        assert np.allclose(az, AZ) and np.allclose(el, EL)
+# end of function test_round_trips
+
+
+def test_buffers():
+    out = (np.empty(U.shape), np.empty(U.shape))
+    result = angles.uv2azel(U, V, out=out)
+    assert result[0] is out[0] and result[1] is out[1]
+    assert np.array_equal(out, angles.uv2azel(U, V))
+    # single precision is kept
+    az, _ = angles.azel2uv(AZ.astype(np.float32), EL.astype(np.float32))
+    assert az.dtype == np.float32
+    # scalars
+    assert np.allclose(angles.uv2elovaz(0.1, 0.0), scalar_uv2elovaz(0.1, 0))
+    assert np.allclose(angles.azel2uv(0, 0), (0, 0))
+# end of function test_buffers
+
+# end of module test_angles
@@ -0,0 +1,83 @@
+"""Tests of the batch conversion of pattern files. Pattern objects need the
+display dependencies, conversion tests are skipped without them.
+"""
+
+# file manipulation
+import os
+
+# import pytest for optional dependencies
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+
+@pytest.fixture
+def batch(tmp_path):
+    """Return batch module once the display dependencies are checked, with
+    two .grd files of a gaussian beam in tmp_path/inputs.
+    """
+    pytest.importorskip('PyQt5.QtWidgets')
+    pytest.importorskip('mpl_toolkits.basemap')
+    pytest.importorskip('pyproj')
+    # batch conversion
+    import patternviewer.batch as batch
+
+    x, y = np.meshgrid(np.linspace(-4, 4, 41), np.linspace(-3, 3, 31))
+    co = np.power(10, (40 - 1.2 * (x ** 2 + y ** 2)) / 20)
+    os.makedirs(str(tmp_path / 'inputs'))
+    for name in ('a.grd', 'b.grd'):
+        fileformat.write_grd(str(tmp_path / 'inputs' / name), 5,
+                             [(-4, -3, 4, 3)], [co])
+    return batch
+# end of function batch
+
+
+def test_convert_parallel(batch, tmp_path):
+    files = batch.input_files([str(tmp_path / 'inputs' / '*.grd')])
+    outputdir = str(tmp_path / 'outputs')
+    config = batch.default_config()
+    messages = []
+    summaries = batch.convert(files, outputdir, config, processes=2,
+                              progress=messages.append)
+    assert [s['input'] for s in summaries] == files
+    assert [s['status'] for s in summaries] == ['converted'] * 2
+    assert len(messages) == 2
+    for s in summaries:
+        assert os.path.exists(s['output'])
+        assert batch.read_options(s['output']) == config
+        assert batch.up_to_date(s['input'], s['output'], config)
+
+    # resumed batch skips the outputs up to date
+    summaries = batch.convert(files, outputdir, config, processes=2,
+                              progress=messages.append)
+    assert [s['status'] for s in summaries] == ['skipped'] * 2
+
+    # unless the options change or the conversion is forced
+    shrunk = dict(config, shrink=True)
+    assert not batch.up_to_date(files[0], summaries[0]['output'], shrunk)
+    summaries = batch.convert(files[:1], outputdir, shrunk, processes=2,
+                              progress=messages.append)
+    assert summaries[0]['status'] == 'converted'
+    assert batch.read_options(summaries[0]['output'])['shrink']
+    summaries = batch.convert(files, outputdir, config, processes=2,
+                              force=True, progress=messages.append)
+    assert [s['status'] for s in summaries] == ['converted'] * 2
+# end of function test_convert_parallel
+
+
+def test_convert_failure(batch, tmp_path):
+    corrupted = str(tmp_path / 'inputs' / 'c.grd')
+    with open(corrupted, 'w') as file:
+        file.write('not a pattern\n')
+    outputdir = str(tmp_path / 'outputs')
+    summary, = batch.convert([corrupted], outputdir, batch.default_config(),
+                             processes=1, progress=lambda message: None)
+    assert summary['status'] == 'failed'
+    assert not os.path.exists(summary['output'])
+    assert batch.read_options(summary['output']) is None
+# end of function test_convert_failure
+
+# end of module test_batch
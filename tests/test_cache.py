@@ -0,0 +1,44 @@
+"""Tests of the memoization container.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# memoization of computed arrays
+from patternviewer.cache import Cache, fingerprint
+
+
+def test_cache():
+    cache = Cache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get('a', lambda: compute(1)) == 1
+    assert cache.get('a', lambda: compute(2)) == 1
+    cache.get('b', lambda: compute(3))
+    # oldest value is forgotten first
+    cache.get('c', lambda: compute(4))
+    assert cache.get('a', lambda: compute(5)) == 5
+    assert calls == [1, 3, 4, 5]
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'size': 2}
+    cache.clear()
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'size': 0}
+# end of function test_cache
+
+
+def test_fingerprint():
+    a = np.arange(6.0).reshape(2, 3)
+    assert fingerprint(a) == fingerprint(a.copy())
+    # content, shape and dtype matter
+    assert fingerprint(a) != fingerprint(a + 1)
+    assert fingerprint(a) != fingerprint(a.reshape(3, 2))
+    assert fingerprint(a) != fingerprint(a.astype(np.float32))
+    # non contiguous arrays are hashed by content
+    assert fingerprint(a.T) == fingerprint(np.ascontiguousarray(a.T))
+    assert fingerprint(a, a) != fingerprint(a)
+# end of function test_fingerprint
+
+# end of module test_cache
@@ -0,0 +1,83 @@
+"""Tests of the SQLite catalog of pattern files.
+"""
+
+# file manipulation
+import os
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# catalog of pattern files
+from patternviewer.catalog import Catalog, azel_extent
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+
+def test_azel_extent():
+    assert np.allclose(azel_extent(3, (-4, -3, 4, 3)), (-4, 4, -3, 3))
+    # .grd centers are in grid steps, .pat centers in grid units
+    assert np.allclose(azel_extent(3, (-4, -3, 4, 3), 9, 7, (1, -1)),
+                       (-3, 5, -4, 2))
+    assert np.allclose(azel_extent(3, (-4, -3, 4, 3), 9, 7, (1, -1), 'pat'),
+                       (-3, 5, -4, 2))
+    assert azel_extent(101, (-4, -3, 4, 3)) == (None,) * 4
+# end of function test_azel_extent
+
+
+def test_catalog(tmp_path):
+    root = tmp_path / 'patterns'
+    os.makedirs(str(root / 'sub'))
+    co = [np.ones((3, 4))]
+    fileformat.write_grd(str(root / 'a.grd'), 5, [(-4, -3, 4, 3)], co,
+                         comment='FREQUENCY: 11.7 GHz')
+    fileformat.write_grd(str(root / 'sub' / 'b.grd.gz'), 5,
+                         [(10, 0, 12, 2)], co,
+                         comment='FREQUENCY: 12.5 GHz')
+    fileformat.write_pat(str(root / 'c.pat'), 3,
+                         np.radians([-1, -1, 1, 1]), co * 2,
+                         frequencies=[11.7, 14.0])
+    (root / 'd.grd').write_text('corrupted\n')
+
+    dbfile = str(tmp_path / 'catalog.db')
+    catalog = Catalog(dbfile)
+    probed = []
+    assert catalog.update(str(root), probed.append) == \
+        {'added': 4, 'updated': 0, 'removed': 0, 'unchanged': 0}
+    assert len(probed) == 4
+    assert [os.path.basename(p) for p, _ in catalog.errors()] == ['d.grd']
+    catalog.close()
+
+    # round trip through the database file
+    catalog = Catalog(dbfile)
+    files = catalog.query()
+    assert [f['name'] for f in files] == ['a.grd', 'c.pat', 'b.grd.gz']
+    first = files[0]
+    assert (first['format'], first['grid'], first['nb_sets']) == \
+        ('grd', 3, 1)
+    assert np.allclose([first['az_min'], first['az_max'], first['el_min'],
+                        first['el_max']], [-4, 4, -3, 3])
+    sets = catalog.sets(files[1]['path'])
+    assert [s['frequency'] for s in sets] == [11.7, 14.0]
+    assert [(s['nx'], s['ny']) for s in sets] == [(4, 3), (4, 3)]
+
+    # queries
+    def names(**criteria):
+        return [f['name'] for f in catalog.query(**criteria)]
+
+    assert names(frequency=11.7) == ['a.grd', 'c.pat']
+    assert names(frequency=(12, 13)) == ['b.grd.gz']
+    assert names(grid=5) == ['c.pat']
+    assert names(extent=(9, 11, 0, 1)) == ['b.grd.gz']
+    assert names(extent=(-2, 2, -1, 1), contains=True) == ['a.grd']
+    assert names(name='*.grd*') == ['a.grd', 'b.grd.gz']
+
+    # incremental update
+    os.remove(str(root / 'c.pat'))
+    os.utime(str(root / 'a.grd'), (0, 0))
+    assert catalog.update(str(root)) == \
+        {'added': 0, 'updated': 1, 'removed': 1, 'unchanged': 2}
+    assert catalog.sets(files[1]['path']) == []
+    catalog.close()
+# end of function test_catalog
+
+# end of module test_catalog
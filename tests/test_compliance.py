@@ -0,0 +1,94 @@
+"""Tests of the batch polygon compliance check. Pattern objects need the
+display dependencies, tests are skipped without them.
+"""
+
+# import pytest for optional dependencies
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('mpl_toolkits.basemap')
+pytest.importorskip('pyproj')
+
+# compliance check
+import patternviewer.compliance as compliance
+# patterns configuration
+import patternviewer.batch as batch
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+GXT = """[COHeader]
+n_cont=2
+[C1]
+gain=30
+n_point=4
+p1=2;-8
+p2=10;-8
+p3=10;2
+p4=2;2
+[C2]
+gain=30
+n_point=4
+p1=-6;-6
+p2=6;-6
+p3=6;6
+p4=-6;6
+"""
+
+
+@pytest.fixture
+def files(tmp_path):
+    """Return (.grd file of two beams on an az/el grid, .gxt file).
+    """
+    x, y = np.meshgrid(np.linspace(-4, 4, 41), np.linspace(-3, 3, 31))
+    co = [np.power(10, (40 - 1.2 * ((x - a) ** 2 + 0.7 * (y - b) ** 2)) / 20)
+          for a, b in ((0.0, 0.0), (1.0, -0.5))]
+    grd = str(tmp_path / 'beams.grd')
+    fileformat.write_grd(grd, 5, [(-4, -3, 4, 3)] * 2, co)
+    gxt = tmp_path / 'spec.gxt'
+    gxt.write_text(GXT)
+    return grd, str(gxt)
+# end of function files
+
+
+def statistics(rows, key):
+    """Return dictionary of statistic key per (azshrink, azoffset, set,
+    polygon).
+    """
+    return {(r['azshrink'], r['azoffset'], r['set'], r['polygon']): r[key]
+            for r in rows}
+# end of function statistics
+
+
+def test_shrink_all_sets(files):
+    grd, gxt = files
+    rows, error = compliance.check_pattern(
+        (grd, [gxt], None, [None, (0.3, 0.3)], [None],
+         batch.default_config(), (50,), (0, 1)))
+    assert error == ''
+    assert len(rows) == 8
+    minimum = statistics(rows, 'min')
+    for s in (0, 1):
+        for p in (1, 2):
+            # shrunk gain is lower in every polygon of every set
+            assert minimum[(0.3, 0.0, s, p)] < minimum[(0.0, 0.0, s, p)] - 0.5
+# end of function test_shrink_all_sets
+
+
+def test_parts(files):
+    grd, gxt = files
+    job = (grd, [gxt], None, [None, (0.3, 0.3), (0.1, 0.2)], [None, (0, 1)],
+           batch.default_config(), (50,))
+    rows, _ = compliance.check_pattern(job + ((0, 1),))
+    parts = []
+    for k in range(4):
+        part_rows, error = compliance.check_pattern(job + ((k, 4),))
+        assert error == ''
+        assert len(part_rows) > 0
+        parts += part_rows
+    assert len(parts) == len(rows) == 24
+    assert statistics(parts, 'mean') == statistics(rows, 'mean')
+# end of function test_parts
+
+# end of module test_compliance
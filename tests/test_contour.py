@@ -0,0 +1,134 @@
+"""Tests of the headless contour extraction and export.
+"""
+
+# import configparser to read .gxt files
+import configparser
+# json reader
+import json
+# xml parser
+import xml.etree.ElementTree as ET
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# contours extraction and export
+import patternviewer.contour as contour
+
+# grid of the test surfaces
+X, Y = np.meshgrid(np.linspace(-3, 3, 61), np.linspace(-2, 2, 41),
+                   indexing='ij')
+
+
+def is_closed(line):
+    """Return True if line first and last vertex are the same.
+    """
+    return np.array_equal(line[0], line[-1])
+# end of function is_closed
+
+
+def test_circle():
+    z = -np.hypot(X, Y)
+    lines = contour.marching_squares(X, Y, z, -1)
+    assert len(lines) == 1
+    line = lines[0]
+    assert is_closed(line)
+    # linear interpolation along the edges of a cone
+    assert np.allclose(np.hypot(*line.T), 1, atol=5e-3)
+    # enclosed area
+    area = 0.5 * abs(np.sum(line[:-1, 0] * line[1:, 1] -
+                            line[1:, 0] * line[:-1, 1]))
+    assert abs(area - np.pi) < 0.02
+# end of function test_circle
+
+
+def test_two_beams():
+    z = np.maximum(-np.hypot(X - 1.5, Y), -np.hypot(X + 1.5, Y))
+    lines = contour.marching_squares(X, Y, z, -1)
+    assert len(lines) == 2
+    centers = sorted(np.mean(line[:-1, 0]) for line in lines)
+    assert np.allclose(centers, [-1.5, 1.5], atol=1e-2)
+# end of function test_two_beams
+
+
+def test_open_line():
+    lines = contour.marching_squares(X, Y, X, 0.25)
+    assert len(lines) == 1
+    assert not is_closed(lines[0])
+    assert np.allclose(lines[0][:, 0], 0.25)
+    assert len(lines[0]) == 41
+    assert contour.marching_squares(X, Y, X, 10) == []
+# end of function test_open_line
+
+
+def test_non_finite_cells():
+    z = X.copy()
+    z[:, 20] = np.nan
+    lines = contour.marching_squares(X, Y, z, 0.25)
+    # the line is cut at the undefined column
+    assert len(lines) == 2
+    assert sum(len(line) for line in lines) == 41 - 1
+# end of function test_non_finite_cells
+
+
+def test_simplify():
+    line = np.column_stack((np.linspace(0, 1, 11), np.zeros(11)))
+    line[5, 1] = 0.1
+    assert np.array_equal(contour.simplify(line, 0.2), line[[0, 10]])
+    assert np.array_equal(contour.simplify(line, 0.05),
+                          line[[0, 4, 5, 6, 10]])
+    assert np.array_equal(contour.simplify(line, 0.09), line[[0, 5, 10]])
+    assert contour.simplify(line, 0) is line
+# end of function test_simplify
+
+
+def test_contours():
+    z = -np.hypot(X, Y)
+    found = contour.contours(X, Y, z, [-1, -1.5], tolerance=0.01)
+    assert [c['level'] for c in found] == [-1, -1.5]
+    for c in found:
+        assert len(c['lines']) == 1
+        assert np.allclose(np.hypot(*c['lines'][0].T), -c['level'],
+                           atol=0.02)
+        assert len(c['lines'][0]) < 4 * 61
+# end of function test_contours
+
+
+def test_writers(tmp_path):
+    z = -np.hypot(X, Y)
+    found = contour.contours(X, Y, z, [-1]) + \
+        [dict(c, set=1) for c in contour.contours(X, Y, X, [0.25])]
+    circle = found[0]['lines'][0]
+
+    gxt = str(tmp_path / 'contours.gxt')
+    contour.write_gxt(gxt, found)
+    config = configparser.ConfigParser()
+    config.read(gxt)
+    # open lines are skipped
+    assert config.getint('COHeader', 'n_cont') == 1
+    assert config.getfloat('C1', 'gain') == -1
+    assert config.getint('C1', 'n_point') == len(circle) - 1
+    assert np.allclose([float(v) for v in config.get('C1', 'p1').split(';')],
+                       circle[0], atol=1e-5)
+
+    geojson = str(tmp_path / 'contours.geojson')
+    contour.write_geojson(geojson, found, 'beam')
+    with open(geojson) as file:
+        features = json.load(file)['features']
+    assert [f['geometry']['type'] for f in features] == ['Polygon',
+                                                         'LineString']
+    assert [f['properties']['set'] for f in features] == [0, 1]
+    assert np.allclose(features[0]['geometry']['coordinates'][0], circle,
+                       atol=1e-6)
+
+    kml = str(tmp_path / 'contours.kml')
+    contour.write_kml(kml, found, 'east & west')
+    root = ET.parse(kml).getroot()
+    namespace = '{http://www.opengis.net/kml/2.2}'
+    names = [e.text for e in root.iter(namespace + 'name')]
+    assert names == ['east & west', 'east & west set 0 -1.00 dB',
+                     'east & west set 1 0.25 dB']
+    coordinates = [e.text for e in root.iter(namespace + 'coordinates')]
+    assert len(coordinates[0].split()) == len(circle)
+# end of function test_writers
+
+# end of module test_contour
@@ -0,0 +1,100 @@
+"""Tests of coverage areas and overlaps.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# coverage areas
+import patternviewer.coverage as coverage
+
+
+def raster(step):
+    """Return (lon, lat) whole Earth raster of step degrees.
+    """
+    return np.meshgrid(np.arange(-180, 180 + step / 2, step),
+                       np.arange(-90, 90 + step / 2, step), indexing='ij')
+# end of function raster
+
+
+class Beam(object):
+    """Pattern whose gain depends on longitude only, with azimuth and
+    elevation equal to longitude and latitude.
+    """
+
+    def __init__(self, lon, lat, cf):
+        self._lon, self._lat = lon, lat
+        self._conversion_factor = cf
+
+    def nb_sets(self):
+        return 1
+
+    def get_isolevel(self):
+        return [30.0]
+
+    def longitude(self, set=0):
+        return self._lon
+
+    def latitude(self, set=0):
+        return self._lat
+
+    def plotted(self, set=0):
+        return 40.0 - np.abs(self._lon)
+
+    def lonlat2azel(self, lon, lat):
+        return lon, lat
+
+    def resample(self, az, el, sets, method):
+        return (40.0 - np.abs(az))[..., None]
+# end of class Beam
+
+
+def test_cell_areas():
+    lon, lat = raster(2.0)
+    areas = coverage.cell_areas(lon, lat)
+    earth = 4 * np.pi * coverage.EARTH_RADIUS_KM ** 2
+    np.testing.assert_allclose(areas.sum(), earth, rtol=1e-12)
+    # northern hemisphere, half of the points of the equator
+    north = areas[:, lat[0] > 0].sum() + areas[:, lat[0] == 0].sum() / 2
+    np.testing.assert_allclose(north, earth / 2, rtol=1e-12)
+    assert not areas.flags.writeable
+# end of function test_cell_areas
+
+
+def test_areas_and_overlaps():
+    lon, lat = raster(1.0)
+    cover = coverage.Coverage(lon, lat)
+    earth = 4 * np.pi * coverage.EARTH_RADIUS_KM ** 2
+    cover.add('north', lat, 0.0)
+    cover.add('east', lon, 0.0)
+    cover.add('none', lon, 1000.0)
+    # half of the cells along the equator and the meridian are covered
+    north, east, none = cover.areas()
+    assert abs(north / earth - 0.5) < 0.01
+    assert abs(east / earth - 0.5) < 0.01
+    assert none == 0.0
+    intersection, union = cover.overlap(0, 1)
+    assert abs(intersection / earth - 0.25) < 0.01
+    np.testing.assert_allclose(union, north + east - intersection)
+    matrix, union_matrix = cover.overlap_matrix(chunk=1000)
+    np.testing.assert_allclose(np.diag(matrix), cover.areas(), rtol=1e-5)
+    np.testing.assert_allclose(matrix[0, 1], intersection, rtol=1e-5)
+    np.testing.assert_allclose(union_matrix[0, 1], union, rtol=1e-5)
+    assert np.array_equal(cover.mask(0), lat >= 0)
+# end of function test_areas_and_overlaps
+
+
+def test_add_pattern_conversion_factor():
+    lon, lat = raster(1.0)
+    cover = coverage.Coverage(lon, lat)
+    # native grid: 40 + 5 - |lon| >= 30 for |lon| <= 15
+    cover.add_pattern('native', Beam(lon, lat, 5.0))
+    # resampled on the coverage grid: 40 - 5 - |lon| >= 30 for |lon| <= 5
+    other = np.meshgrid(np.arange(-50.0, 51.0), np.arange(-50.0, 51.0),
+                        indexing='ij')
+    cover.add_pattern('resampled', Beam(other[0], other[1], -5.0))
+    assert cover.keys() == [('native', 0, 30.0), ('resampled', 0, 30.0)]
+    assert np.array_equal(cover.mask(0), np.abs(lon) <= 15)
+    assert np.array_equal(cover.mask(1), np.abs(lon) <= 5)
+# end of function test_add_pattern_conversion_factor
+
+# end of module test_coverage
@@ -0,0 +1,60 @@
+"""Tests of the arithmetic on loaded patterns. Pattern objects need the
+display dependencies, tests are skipped without them.
+"""
+
+# import pytest for optional dependencies and expected exceptions
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('mpl_toolkits.basemap')
+pytest.importorskip('pyproj')
+
+# expressions on patterns
+from patternviewer.element.pattern.expression import power_sum, expr
+
+# az/el grid of the .grd files
+LIMITS = [(-2, -1.5, 2, 1.5)]
+AZ, EL = np.meshgrid(np.linspace(-2, 2, 41), np.linspace(-1.5, 1.5, 31))
+
+
+def beam(az0):
+    """Return field of paraboloid beam centered on (az0, 0).
+    """
+    return np.power(10, (40 - 10 * ((AZ - az0) ** 2 + EL ** 2)) / 20)
+# end of function beam
+
+
+def test_power_sum():
+    assert np.allclose(power_sum(10, 10), 10 + 10 * np.log10(2))
+    assert np.allclose(power_sum([0, 20], -np.inf), [0, 20])
+# end of function test_power_sum
+
+
+def test_conversion_factor(make_pattern):
+    west = make_pattern([beam(-0.2)], 5, LIMITS, name='west.grd')
+    east = make_pattern([beam(0.2)], 5, LIMITS, name='east.grd', cf=3.0)
+    expected = (east.plotted(0) + 3.0) - west.plotted(0)
+    # east on its own grid, west resampled on it
+    result = expr('E - W', E=east, W=west).evaluate()
+    assert np.allclose(result, expected, atol=1e-4)
+    # east resampled on the grid of west
+    result = expr('E - W', E=east, W=west, reference='W').evaluate()
+    assert np.allclose(result, expected, atol=1e-4)
+    # factors are part of the cached values
+    east.configure({'cf': 5.0})
+    result = expr('E - W', E=east, W=west).evaluate()
+    assert np.allclose(result, expected + 2.0, atol=1e-4)
+# end of function test_conversion_factor
+
+
+def test_undefined_operand(make_pattern):
+    west = make_pattern([beam(-0.2)], 5, LIMITS)
+    with pytest.raises(ValueError):
+        expr('W - E', W=west)
+    with pytest.raises(ValueError):
+        expr('W + 1', W=west, reference='E')
+# end of function test_undefined_operand
+
+# end of module test_expression
@@ -0,0 +1,145 @@
+"""Tests of the vectorized number formatters of the pattern file writers,
+which must give the output of Python formatting.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# import pytest for parametrized tests
+import pytest
+
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+
+def text(column):
+    """Return list of strings of a formatted column.
+    """
+    if isinstance(column, list):
+        return column
+    return [row.tobytes().decode() for row in column]
+# end of function text
+
+
+def test_fixed_random():
+    values = np.random.default_rng(0).normal(0.0, 30.0, 10000)
+    assert text(fileformat.fixed(values, 8, 3)) == \
+        ['%8.3f' % v for v in values]
+# end of function test_fixed_random
+
+
+def test_fixed_rounding():
+    # decimal ties are not exact in binary, exact binary ties round to even
+    values = np.array([99.9995, -99.9995, 123.4565, 0.0625, -0.0625, 2.5e-3,
+                       0.0005, -0.0004, 0.0, -0.0, 999.9999, 1.5])
+    assert text(fileformat.fixed(values, 8, 3)) == \
+        ['%8.3f' % v for v in values]
+    ties = np.arange(-20000, 20000) / 2000.0
+    assert text(fileformat.fixed(ties, 8, 3)) == ['%8.3f' % v for v in ties]
+# end of function test_fixed_rounding
+
+
+def test_fixed_special():
+    values = np.array([1.0, np.nan, np.inf, -np.inf, 123456.7895, 1e20])
+    assert text(fileformat.fixed(values, 8, 3)) == \
+        ['%8.3f' % v for v in values]
+# end of function test_fixed_special
+
+
+def test_scientific_random():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0.0, 1.0, 10000) * \
+        10.0 ** rng.integers(-320, 300, 10000)
+    assert text(fileformat.scientific(values, 15, 7)) == \
+        ['%15.7E' % v for v in values]
+    assert text(fileformat.scientific(values, 18, 10)) == \
+        ['%18.10E' % v for v in values]
+# end of function test_scientific_random
+
+
+def test_scientific_rounding():
+    values = np.array([9.99999995, 9.999999949, 9.99999996, 0.0, -0.0,
+                       1.00000005, 1e-300, -1e-300, 5e-324, 1e-310,
+                       2.2250738585072014e-308, 1.7976931348623157e308,
+                       np.nan, np.inf, -np.inf])
+    assert text(fileformat.scientific(values, 15, 7)) == \
+        ['%15.7E' % v for v in values]
+# end of function test_scientific_rounding
+
+
+def test_scientific_exponent_width():
+    # one three digits exponent does not widen the others
+    values = np.array([1.0, -2.5, 1e-120, 3e150])
+    column = fileformat.scientific(values, 15, 7)
+    assert column.shape == (4, 15)
+    assert text(column) == ['%15.7E' % v for v in values]
+# end of function test_scientific_exponent_width
+
+
+def test_table():
+    columns = [fileformat.fixed(np.array([1.5, -2.0]), 8, 3),
+               fileformat.scientific(np.array([1e-3, 2.0]), 15, 7)]
+    assert fileformat.table(columns) == \
+        b'   1.500   1.0000000E-03\n  -2.000   2.0000000E+00\n'
+    # values wider than the column
+    columns[0] = fileformat.fixed(np.array([1.5, -2e6]), 8, 3)
+    assert fileformat.table(columns) == \
+        b'   1.500   1.0000000E-03\n-2000000.000   2.0000000E+00\n'
+# end of function test_table
+
+
+@pytest.mark.parametrize('name', ['beam.grd', 'beam.grd.gz'])
+def test_probe_grd(tmp_path, name):
+    filename = str(tmp_path / name)
+    co = [np.ones((3, 4)), np.ones((5, 2))]
+    limits = [(-4, -3, 4, 3), (-1, -0.5, 1, 0.5)]
+    fileformat.write_grd(filename, 6, limits, co, centers=[(0, 0), (2, -1)],
+                         comment='FREQUENCY: 11700 MHz')
+    header = fileformat.probe(filename)
+    assert header['format'] == 'grd'
+    # az over el
+    assert header['grid'] == 5
+    assert header['nb_sets'] == 2
+    assert [(s['nx'], s['ny']) for s in header['sets']] == [(4, 3), (2, 5)]
+    assert [s['limits'] for s in header['sets']] == limits
+    assert header['sets'][1]['center'] == (2, -1)
+    assert [s['frequency'] for s in header['sets']] == [11.7, 11.7]
+    # frequency unknown without comment
+    fileformat.write_grd(filename, 1, limits[:1], co[:1])
+    header = fileformat.probe(filename)
+    assert header['grid'] == 1
+    assert header['sets'][0]['frequency'] is None
+# end of function test_probe_grd
+
+
+@pytest.mark.parametrize('name', ['beam.pat', 'beam.pat.gz'])
+def test_probe_pat(tmp_path, name):
+    filename = str(tmp_path / name)
+    co = [np.ones((3, 4))] * 2
+    limits = np.radians([-4, -3, 4, 3])
+    fileformat.write_pat(filename, 3, limits, co, co,
+                         centers=[(0.5, 0.25), (0, 0)],
+                         frequencies=[11.7, 12.2])
+    header = fileformat.probe(filename)
+    assert header['format'] == 'pat'
+    # az over el
+    assert header['grid'] == 5
+    assert header['nb_sets'] == 2
+    for s in header['sets']:
+        assert (s['nx'], s['ny']) == (4, 3)
+        # angular limits in degrees
+        assert np.allclose(s['limits'], [-4, -3, 4, 3])
+    assert header['sets'][0]['center'] == (0.5, 0.25)
+    assert [s['frequency'] for s in header['sets']] == [11.7, 12.2]
+# end of function test_probe_pat
+
+
+def test_probe_errors(tmp_path):
+    with pytest.raises(ValueError):
+        fileformat.probe(str(tmp_path / 'beam.txt'))
+    filename = tmp_path / 'beam.grd'
+    filename.write_text('comment without end\n')
+    with pytest.raises(ValueError):
+        fileformat.probe(str(filename))
+# end of function test_probe_errors
+
+# end of module test_fileformat
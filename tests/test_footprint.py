@@ -0,0 +1,74 @@
+"""Tests of the spatial index over pattern footprints.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# footprints index
+from patternviewer.footprint import footprint, FootprintIndex
+
+
+class Beam(object):
+    """Gaussian beam on a (lon, lat) grid, with azimuth and elevation equal
+    to longitude and latitude.
+    """
+
+    def __init__(self, center, peak, cf):
+        self._center = center
+        self._peak = peak
+        self._conversion_factor = cf
+        self._lon, self._lat = np.meshgrid(np.linspace(-20, 20, 81),
+                                           np.linspace(-10, 10, 41),
+                                           indexing='ij')
+
+    def gain(self, lon, lat):
+        return self._peak - 0.5 * ((lon - self._center[0]) ** 2 +
+                                   (lat - self._center[1]) ** 2)
+
+    def nb_sets(self):
+        return 1
+
+    def longitude(self, set=0):
+        return self._lon
+
+    def latitude(self, set=0):
+        return self._lat
+
+    def plotted(self, set=0):
+        return self.gain(self._lon, self._lat)
+
+    def get_isolevel(self):
+        return [self._peak + self._conversion_factor - 8.0]
+
+    def lonlat2azel(self, lon, lat):
+        return lon, lat
+
+    def interpolate_copol(self, az, el, set=0):
+        return self.gain(az, el), None
+# end of class Beam
+
+
+def test_footprint():
+    lon, lat = np.meshgrid(np.arange(-5.0, 6.0), np.arange(-3.0, 4.0))
+    gain = 10 - np.abs(lon - 1) - np.abs(lat)
+    assert footprint(lon, lat, gain, 8) == (-1.0, 3.0, -2.0, 2.0)
+    assert footprint(lon, lat, gain, 11) is None
+    # antimeridian crossing
+    lon, lat = np.array([175.0, 179.0, -179.0]), np.zeros(3)
+    assert footprint(lon, lat, np.ones(3), 0) == (175.0, 181.0, 0.0, 0.0)
+# end of function test_footprint
+
+
+def test_conversion_factor():
+    index = FootprintIndex(cell=5.0, margin=0.0)
+    # 4 dB above the isolevel at the center with its conversion factor
+    box = index.add('east', Beam((5.0, 0.0), 30.0, 4.0), isolevel=30.0)
+    assert box == (2.5, 7.5, -2.5, 2.5)
+    index.add('west', Beam((-5.0, 0.0), 35.0, 0.0))
+    keys, gains = index.query([5.0, -5.0, 0.0], [0.0, 0.0, 0.0], k=2)
+    assert keys == [['east'], ['west'], []]
+    np.testing.assert_allclose(gains[:, 0], [34.0, 35.0, np.nan])
+    assert np.all(np.isnan(gains[:, 1]))
+# end of function test_conversion_factor
+
+# end of module test_footprint
@@ -0,0 +1,90 @@
+"""Tests of the frequency sweep analysis. Pattern objects need the display
+dependencies, tests are skipped without them.
+"""
+
+# import pytest for optional dependencies
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('mpl_toolkits.basemap')
+pytest.importorskip('pyproj')
+
+# frequency sweep analysis
+import patternviewer.frequency as frequency
+# patterns configuration
+import patternviewer.batch as batch
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+
+def test_frequency_weights():
+    weights = frequency.frequency_weights([11, 12, 14], [11, 11.5, 13, 14])
+    assert np.allclose(weights, [[1, 0, 0],
+                                 [0.5, 0.5, 0],
+                                 [0, 0.5, 0.5],
+                                 [0, 0, 1]])
+# end of function test_frequency_weights
+
+
+def test_frequency_weights_out_of_band():
+    weights = frequency.frequency_weights([11, 12], [10.9, 11.5, 12.1])
+    assert np.all(np.isnan(weights[[0, 2]]))
+    assert np.allclose(weights[1], [0.5, 0.5])
+    # a single frequency is only known at itself
+    single = frequency.frequency_weights([12], [12, 12.5])
+    assert single[0, 0] == 1
+    assert np.isnan(single[1, 0])
+# end of function test_frequency_weights_out_of_band
+
+
+@pytest.fixture
+def family(tmp_path):
+    """Return two .grd files of an asymmetric beam on an az/el grid, the
+    second file 6 dB above the first.
+    """
+    x, y = np.meshgrid(np.linspace(-4, 4, 41), np.linspace(-3, 3, 31))
+    co = np.power(10, (40 - 1.2 * ((x - 1) ** 2 + 0.7 * (y + 0.5) ** 2)) / 20)
+    files = []
+    for k, gain in enumerate((0.0, 6.0)):
+        filename = str(tmp_path / 'beam{0:d}.grd'.format(k))
+        fileformat.write_grd(filename, 5, [(-4, -3, 4, 3)],
+                             [co * np.power(10, gain / 20)])
+        files.append(filename)
+    return files
+# end of function family
+
+
+def test_gain(family):
+    cube = frequency.FrequencyCube(family, frequencies=[11.0, 13.0],
+                                   processes=1)
+    assert len(cube) == 2
+    assert np.allclose(cube.frequencies(), [11, 13])
+    lon, lat = np.array([0.0, 3.0, 100.0]), np.array([0.0, 2.0, 0.0])
+    gain = cube.gain(lon, lat)
+    assert gain.shape == (3, 2)
+    assert np.allclose(gain[:2, 1] - gain[:2, 0], 6, atol=1e-6)
+    # linear interpolation in dB across frequency
+    middle = cube.gain(lon, lat, [12.0, 14.0])
+    assert np.allclose(middle[:2, 0], gain[:2, 0] + 3, atol=1e-6)
+    assert np.all(np.isnan(middle[:, 1]))
+    # stations beyond the Earth edge do not see the satellite
+    assert np.all(np.isnan(gain[2]))
+# end of function test_gain
+
+
+def test_layers_ignore_revert(family):
+    config = batch.default_config()
+    config['revert_x'] = True
+    cube = frequency.FrequencyCube(family, config, frequencies=[11.0, 13.0],
+                                   processes=1)
+    reference = cube.reference()
+    assert not np.allclose(reference.plotted(0), reference.copol(0))
+    # every layer is the raw copolar data set
+    for k, offset in enumerate((0, 6)):
+        assert np.allclose(cube.cube()[k], reference.copol(0) + offset +
+                           reference._conversion_factor, atol=1e-6)
+# end of function test_layers_ignore_revert
+
+# end of module test_frequency
@@ -0,0 +1,66 @@
+"""Tests of the carrier to interference computation.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# C/I engine
+from patternviewer.interference import CarrierInterference
+
+# az/el grid of the .grd files
+LIMITS = [(-2, -1.5, 2, 1.5)]
+AZ, EL = np.meshgrid(np.linspace(-2, 2, 81), np.linspace(-1.5, 1.5, 61))
+
+
+def beam(az0):
+    """Return field of paraboloid beam centered on (az0, 0).
+    """
+    return np.power(10, (40 - 10 * ((AZ - az0) ** 2 + EL ** 2)) / 20)
+# end of function beam
+
+
+def test_conversion_factor(make_pattern):
+    west = make_pattern([beam(-0.2)], 5, LIMITS, name='west.grd')
+    east = make_pattern([beam(0.2)], 5, LIMITS, name='east.grd', cf=3.0)
+    # last station is not seen by the satellite
+    lon = np.append(np.linspace(-2, 2, 9), 100.0)
+    lat = np.zeros_like(lon)
+    engine = CarrierInterference(lon, lat)
+    engine.add_pattern('west', west)
+    engine.add_pattern('east', east)
+    assert engine.keys() == [('west', 0), ('east', 0)]
+
+    gains = np.hstack((west.station_gains(lon, lat),
+                       east.station_gains(lon, lat)))
+    visible = np.isfinite(gains[:, 0])
+    assert not visible[-1] and np.all(visible[:-1])
+    # the conversion factor decides the best server of some stations
+    raw = gains[:, 1] - 3.0
+    assert np.any((gains[:, 0] > raw) & (gains[:, 0] < gains[:, 1]))
+    assert np.array_equal(engine.server()[visible],
+                          np.argmax(gains[visible], axis=1))
+    assert np.allclose(engine.carrier()[visible],
+                       np.max(gains[visible], axis=1))
+    assert np.allclose(engine.interference()[visible],
+                       np.min(gains[visible], axis=1))
+    assert np.allclose(engine.ci()[visible],
+                       np.abs(gains[visible, 0] - gains[visible, 1]))
+    assert engine.server()[-1] == -1
+    assert engine.carrier()[-1] == -np.inf
+# end of function test_conversion_factor
+
+
+def test_colours(make_pattern):
+    pattern = make_pattern([beam(-0.2), beam(0.2)], 5, LIMITS * 2)
+    lon, lat = np.linspace(-2, 2, 9), np.zeros(9)
+    engine = CarrierInterference(lon, lat, chunk=4)
+    engine.add_pattern('beams', pattern, colours=['red', 'blue'])
+    # no interference between beams of different colours
+    assert np.all(engine.interference() == -np.inf)
+    table = engine.table()
+    assert np.array_equal(table['colour'], table['beam'])
+    assert np.allclose(table['C'], np.max(pattern.station_gains(lon, lat),
+                                          axis=1))
+# end of function test_colours
+
+# end of module test_interference
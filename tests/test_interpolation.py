@@ -0,0 +1,118 @@
+"""Tests of the regular grid interpolation.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# import pytest for parametrized tests
+import pytest
+# reference interpolation
+from scipy import interpolate as interp
+
+# regular grid interpolation
+from patternviewer.interpolation import GridInterpolator, evaluate, \
+    axis_weights
+
+# regular grid and query points inside it
+X = np.linspace(-3, 5, 17)
+Y = np.linspace(-2, 2, 21)
+RNG = np.random.default_rng(0)
+QX = RNG.uniform(-3, 5, 500)
+QY = RNG.uniform(-2, 2, 500)
+
+
+def quadratic(x, y):
+    """Return quadratic polynomial of x and y.
+    """
+    return 1 + 2 * x - 3 * y + 0.5 * x * x - x * y + 0.25 * y * y
+# end of function quadratic
+
+
+def grid_values(function):
+    """Return function evaluated at the nodes of grid X, Y.
+    """
+    x, y = np.meshgrid(X, Y, indexing='ij')
+    return function(x, y)
+# end of function grid_values
+
+
+@pytest.mark.parametrize('method', ['nearest', 'linear', 'cubic'])
+def test_weights_sum(method):
+    index, weight = axis_weights(np.linspace(-1, 12, 50), 11, method)
+    assert np.allclose(weight.sum(axis=1), 1)
+    assert index.min() >= 0 and index.max() <= 10
+# end of function test_weights_sum
+
+
+def test_nodes():
+    z = grid_values(quadratic)
+    x, y = np.meshgrid(X, Y, indexing='ij')
+    for method in ('nearest', 'linear', 'cubic'):
+        interpolator = GridInterpolator(X, Y, z, method)
+        assert np.allclose(interpolator.ev(x, y), z.ravel())
+# end of function test_nodes
+
+
+def test_linear():
+    z = grid_values(quadratic)
+    spline = interp.RectBivariateSpline(X, Y, z, kx=1, ky=1)
+    interpolator = GridInterpolator(X, Y, z, 'linear')
+    assert np.allclose(interpolator.ev(QX, QY), spline.ev(QX, QY))
+# end of function test_linear
+
+
+def test_cubic_quadratic():
+    # cubic convolution, boundary condition included, is exact for
+    # quadratic polynomials
+    interpolator = GridInterpolator(X, Y, grid_values(quadratic), 'cubic')
+    assert np.allclose(interpolator.ev(QX, QY), quadratic(QX, QY))
+# end of function test_cubic_quadratic
+
+
+def test_nearest():
+    z = grid_values(quadratic)
+    interpolator = GridInterpolator(X, Y, z, 'nearest')
+    # a quarter of a step away from the nodes
+    x, y = np.meshgrid(X[:-1] + 0.125, Y[:-1] - 0.05, indexing='ij')
+    assert np.allclose(interpolator.ev(x, y), z[:-1, :-1].ravel())
+# end of function test_nearest
+
+
+def test_clamp():
+    z = grid_values(quadratic)
+    interpolator = GridInterpolator(X, Y, z, 'linear')
+    assert np.allclose(interpolator.ev([-10, 10, 0], [0, 10, -10]),
+                       [quadratic(-3, 0), quadratic(5, 2), quadratic(0, -2)])
+# end of function test_clamp
+
+
+def test_evaluate():
+    interpolator = GridInterpolator(X, Y, grid_values(quadratic), 'cubic')
+    x, y = QX.reshape(20, 25), QY.reshape(20, 25)
+    values = evaluate(interpolator, x, y)
+    assert values.shape == (20, 25)
+    assert np.array_equal(evaluate(interpolator, x, y, chunk=7), values)
+    # y is broadcast to x shape
+    assert np.allclose(evaluate(interpolator, x, 0.5),
+                       quadratic(x, 0.5))
+# end of function test_evaluate
+
+
+def test_non_finite():
+    index, weight = axis_weights(np.array([np.nan, 2.5, np.inf]), 11, 'cubic')
+    assert index.min() >= 0 and index.max() <= 10
+    assert np.all(np.isnan(weight[[0, 2]]))
+    assert np.allclose(weight[1].sum(), 1)
+    for method in ('nearest', 'linear', 'cubic'):
+        interpolator = GridInterpolator(X, Y, grid_values(quadratic), method)
+        values = interpolator.ev([np.nan, 0.5, 1.0], [0.5, 0.5, np.nan])
+        assert np.isnan(values[0]) and np.isnan(values[2])
+        assert np.isfinite(values[1])
+# end of function test_non_finite
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        GridInterpolator(X, Y, method='quintic')
+# end of function test_unknown_method
+
+# end of module test_interpolation
@@ -0,0 +1,58 @@
+"""Tests of the polarisation swapping of .grd files.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# polarisation swapping
+import patternviewer.invertpol as invertpol
+# pattern files writers
+import patternviewer.element.pattern.fileformat as fileformat
+
+ORDER = invertpol.swapped_order(2)
+
+
+def test_fixed_width_slots():
+    # first slot is one column narrower than the others
+    lines = [b'  1.0000000E+00  -2.0000000E+00   3.0000000E+00'
+             b'  -4.0000000E+00\n',
+             b' -5.0000000E+00   6.0000000E+00  -7.0000000E+00'
+             b'   8.0000000E+00\n']
+    assert invertpol.swap_columns(lines, ORDER) == \
+        b'  3.0000000E+00  -4.0000000E+00   1.0000000E+00  -2.0000000E+00\n' \
+        b' -7.0000000E+00   8.0000000E+00  -5.0000000E+00   6.0000000E+00\n'
+# end of function test_fixed_width_slots
+
+
+def test_line_terminator():
+    fixed = [b' 1.0 2.0 3.0 4.0\r\n', b' 5.0 6.0 7.0 8.0\r\n']
+    assert invertpol.swap_columns(fixed, ORDER) == \
+        b' 3.0 4.0 1.0 2.0\r\n 7.0 8.0 5.0 6.0\r\n'
+    # lines of different widths are reformatted
+    irregular = [b'1.0 2.0 3.0 4.0\r\n', b'-5.0  6.0 7.0 8.0\r\n']
+    assert invertpol.swap_columns(irregular, ORDER) == \
+        b'  3.0000000000E+00  4.0000000000E+00  1.0000000000E+00' \
+        b'  2.0000000000E+00\r\n' \
+        b'  7.0000000000E+00  8.0000000000E+00 -5.0000000000E+00' \
+        b'  6.0000000000E+00\r\n'
+# end of function test_line_terminator
+
+
+def test_invert_file(tmp_path):
+    rng = np.random.default_rng(0)
+    shape = (3, 5)
+    co = [rng.normal(size=shape) + 1j * rng.normal(size=shape)
+          for _ in range(2)]
+    cr = [rng.normal(size=shape) + 1j * rng.normal(size=shape)
+          for _ in range(2)]
+    limits = [(-1.0, -2.0, 1.0, 2.0)] * 2
+    fileformat.write_grd(str(tmp_path / 'a.grd'), 5, limits, co, cr)
+    fileformat.write_grd(str(tmp_path / 'b.grd'), 5, limits, cr, co)
+    output = invertpol.invert_file(str(tmp_path / 'a.grd'))
+    assert output == str(tmp_path / 'a_out.grd')
+    with open(output, 'rb') as swapped, \
+            open(str(tmp_path / 'b.grd'), 'rb') as expected:
+        assert swapped.read() == expected.read()
+# end of function test_invert_file
+
+# end of module test_invertpol
@@ -0,0 +1,162 @@
+"""Tests of the link budget. The linkbudget module reads patterns, it needs
+the display dependencies, tests are skipped without them.
+"""
+
+# import csv reader of the reports
+import csv
+
+# import pytest for optional dependencies
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('mpl_toolkits.basemap')
+pytest.importorskip('pyproj')
+
+# link budget
+import patternviewer.linkbudget as linkbudget
+# import constant file
+import patternviewer.constant as cst
+
+# Earth radius and geostationary orbit radius in km
+EARTH = cst.EARTH_RAD_EQUATOR_M / 1000
+ORBIT = EARTH + cst.ALTGEO / 1000
+
+
+class Satellite(object):
+    """Satellite at (lon, lat, altitude in m).
+    """
+
+    def __init__(self, lon=0.0, lat=0.0, altitude=cst.ALTGEO):
+        self._position = lon, lat, altitude
+
+    def longitude(self):
+        return self._position[0]
+
+    def latitude(self):
+        return self._position[1]
+
+    def altitude(self):
+        return self._position[2]
+# end of class Satellite
+
+
+class Pattern(object):
+    """Pattern of two data sets of gains 30 and 20 dBi everywhere.
+    """
+
+    def nb_sets(self):
+        return 2
+
+    def satellite(self):
+        return Satellite()
+
+    def frequency(self, set):
+        return [12.0, None][set]
+
+    def station_gains(self, lon, lat, sets, method):
+        return np.zeros(np.shape(lon) + (len(sets),)) + \
+            np.array([30.0, 20.0])[sets]
+# end of class Pattern
+
+
+def test_geometry():
+    lat = np.array([0.0, 45.0, -45.0, 0.0, 0.0, np.nan])
+    lon = np.array([0.0, 0.0, 0.0, -30.0, 30.0, 0.0])
+    result = linkbudget.geometry(lon, lat, Satellite())
+    assert not result['elevation'].flags.writeable
+    assert np.isclose(result['elevation'][0], 90)
+    assert np.isclose(result['range'][0], cst.ALTGEO / 1000)
+    # terminal on the satellite meridian
+    phi = 45 * cst.DEG2RAD
+    expected = np.arctan((np.cos(phi) - EARTH / ORBIT) / np.sin(phi)) / \
+        cst.DEG2RAD
+    assert np.allclose(result['elevation'][1:3], expected)
+    assert np.allclose(result['range'][1:3],
+                       np.sqrt(EARTH ** 2 + ORBIT ** 2 -
+                               2 * EARTH * ORBIT * np.cos(phi)))
+    # satellite to the South, North, East and West
+    assert np.allclose(result['azimuth'][1:5], [180, 0, 90, 270])
+    assert list(result['visible']) == [True] * 5 + [False]
+    assert np.isnan(result['elevation'][5])
+    # Earth limb
+    assert linkbudget.elevation([85.0], [0.0], Satellite())[0] < 0
+    assert linkbudget.elevation([80.0], [0.0], Satellite(10.0))[0] > 0
+# end of function test_geometry
+
+
+def test_losses():
+    assert np.isclose(linkbudget.free_space_loss(1000, 1),
+                      20 * np.log10(4 * np.pi * 1e15 / cst.SPEED_OF_LIGHT))
+    # 6 dB per octave of distance and frequency
+    loss = linkbudget.free_space_loss([[1000], [2000]], [10, 20])
+    assert np.allclose(np.diff(loss, axis=0), 20 * np.log10(2))
+    assert np.allclose(np.diff(loss, axis=1), 20 * np.log10(2))
+    assert np.isclose(linkbudget.spreading_loss(1000),
+                      10 * np.log10(4 * np.pi * 1e12))
+# end of function test_losses
+
+
+def test_raster_grid():
+    lon, lat = linkbudget.raster_grid(-10, 10, -5, 5, 2.5)
+    assert lon.shape == (5, 9)
+    assert lat[0, 0] == 5 and lat[-1, 0] == -5
+    assert lon[0, 0] == -10 and lon[0, -1] == 10
+# end of function test_raster_grid
+
+
+def test_evaluate(tmp_path):
+    budget = linkbudget.LinkBudget(Pattern(), power=10, temperature=25,
+                                   losses=1)
+    lon, lat = np.array([0.0, 20.0, 120.0]), np.array([0.0, 30.0, 0.0])
+    result = budget.evaluate(lon, lat)
+    distance = result['range'][:, None]
+    assert np.allclose(result['gain'][:2], [[30, 20]] * 2)
+    assert np.all(np.isnan(result['gain'][2]))
+    assert np.allclose(result['eirp'][:2], [[39, 29]] * 2)
+    assert np.allclose(result['pfd'][:2], result['eirp'][:2] -
+                       linkbudget.spreading_loss(distance[:2]))
+    assert np.allclose(result['gt'][:2], [[4, -6]] * 2)
+    # unknown frequency of the second set
+    assert np.allclose(result['fspl'][:, 0],
+                       linkbudget.free_space_loss(distance[:, 0], 12))
+    assert np.all(np.isnan(result['fspl'][:, 1]))
+    fixed = linkbudget.LinkBudget(Pattern(), frequency=14).evaluate(
+        lon, lat, [1])
+    assert 'eirp' not in fixed and 'gt' not in fixed
+    assert fixed['gain'].shape == (3, 1)
+    assert np.allclose(fixed['fspl'][:, 0],
+                       linkbudget.free_space_loss(distance[:, 0], 14))
+
+    filename = str(tmp_path / 'budget.csv')
+    linkbudget.write_table(filename, ['a', 'b', 'c'], lon, lat, result)
+    with open(filename, newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 6
+    assert [r['set'] for r in rows[:2]] == ['0', '1']
+    assert rows[1]['station'] == 'a'
+    assert float(rows[1]['gt']) == -6
+    assert rows[4]['gain'] == 'nan'
+# end of function test_evaluate
+
+
+def test_write_raster(tmp_path):
+    lon, lat = linkbudget.raster_grid(-10, 10, -5, 5, 2.5)
+    values = lon + lat
+    values[0, 0] = np.nan
+    filename = str(tmp_path / 'raster.asc')
+    linkbudget.write_raster(filename, lon, lat, values)
+    with open(filename) as file:
+        header = [next(file).split() for _ in range(6)]
+        data = np.loadtxt(file)
+    assert dict(header) == {'ncols': '9', 'nrows': '5',
+                            'xllcorner': '-11.250000',
+                            'yllcorner': '-6.250000',
+                            'cellsize': '2.500000',
+                            'NODATA_value': '-9999'}
+    assert data[0, 0] == -9999
+    assert np.allclose(data.ravel()[1:], values.ravel()[1:])
+# end of function test_write_raster
+
+# end of module test_linkbudget
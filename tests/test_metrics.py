@@ -0,0 +1,93 @@
+"""Tests of the beam metrics. The metrics module reads patterns, it needs
+the display dependencies, tests are skipped without them.
+"""
+
+# import pytest for optional dependencies
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('mpl_toolkits.basemap')
+pytest.importorskip('pyproj')
+
+# beam metrics
+import patternviewer.metrics as metrics
+
+# (az, el) grid in degrees
+AZ, EL = np.meshgrid(np.linspace(-3, 3, 601), np.linspace(-2, 2, 401),
+                     indexing='ij')
+
+
+def gaussian(peak, az0, el0, width_major, width_minor, angle):
+    """Return gain in dB of an elliptic gaussian beam centered on
+    (az0, el0), of full -3 dB widths width_major and width_minor in
+    degrees, major axis at angle degrees from the azimuth axis.
+    """
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    u = c * (AZ - az0) + s * (EL - el0)
+    v = -s * (AZ - az0) + c * (EL - el0)
+    return peak - 12 * ((u / width_major) ** 2 + (v / width_minor) ** 2)
+# end of function gaussian
+
+
+def test_beam_metrics():
+    beams = [(40, 0.4, -0.3, 1.6, 0.8, 30), (35, -0.5, 0.2, 1.2, 1.0, -70)]
+    gain = np.stack([gaussian(*b) for b in beams])
+    ground = np.ones(gain.shape)
+    result = metrics.beam_metrics(np.stack([AZ, AZ]), np.stack([EL, EL]),
+                                  gain, ground=ground)
+    assert np.allclose(result['peak'], [40, 35], atol=1e-3)
+    for k, (_, az0, el0, width_major, width_minor, angle) in \
+            enumerate(beams):
+        radius = {}
+        for level in (-3, -6):
+            name = '{0:g}'.format(level)
+            # semi axes of the level ellipse
+            scale = np.sqrt(-level / 12)
+            major, minor = width_major * scale, width_minor * scale
+            assert np.isclose(result['area ' + name][k],
+                              np.pi * major * minor, rtol=1e-2)
+            assert np.isclose(result['major ' + name][k], major, rtol=1e-2)
+            assert np.isclose(result['minor ' + name][k], minor, rtol=1e-2)
+            assert np.isclose(result['az ' + name][k], az0, atol=1e-3)
+            assert np.isclose(result['el ' + name][k], el0, atol=1e-3)
+            assert np.isclose(result['angle ' + name][k], angle, atol=0.5)
+            # one grid point per km2
+            assert np.isclose(result['ground ' + name][k],
+                              result['area ' + name][k] / 0.01 ** 2,
+                              rtol=1e-2)
+            radius[level] = np.sqrt(major * minor)
+        # 3 dB between the equivalent radii of the -3 and -6 dB ellipses
+        assert np.isclose(result['rolloff -6'][k],
+                          3 / (radius[-6] - radius[-3]), rtol=2e-2)
+    assert 'rolloff -3' not in result
+# end of function test_beam_metrics
+
+
+def test_main_lobe():
+    # sidelobe above the level, not connected to the main lobe
+    gain = np.maximum(gaussian(40, -1.5, 0, 1, 1, 0),
+                      gaussian(38, 1.5, 0, 1, 1, 0))
+    lobe = metrics.main_lobe(gain[None], np.array([40.0]), -3)[0]
+    assert np.array_equal(lobe, gaussian(40, -1.5, 0, 1, 1, 0) >= 37)
+    # undefined gains are outside
+    gain[AZ < -1.5] = np.nan
+    lobe = metrics.main_lobe(gain[None], np.array([40.0]), -3)[0]
+    assert not np.any(lobe[AZ < -1.5]) and np.any(lobe)
+# end of function test_main_lobe
+
+
+def test_pattern_metrics(make_pattern):
+    # .grd fields are (el, az), on a coarser grid
+    gain = gaussian(40, 0.4, -0.3, 1.6, 0.8, 0).T[::5, ::5]
+    pattern = make_pattern([np.power(10, gain / 20)], 5, [(-3, -2, 3, 2)])
+    row, = metrics.pattern_metrics(pattern)
+    assert row['set'] == 0
+    assert np.isclose(row['peak'], 40, atol=1e-3)
+    assert np.isclose(row['peak az'], 0.4, atol=1e-2)
+    assert np.isclose(row['area -3'], np.pi * 0.8 * 0.4, rtol=5e-2)
+    assert row['ground -3'] > 0
+# end of function test_pattern_metrics
+
+# end of module test_metrics
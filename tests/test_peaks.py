@@ -0,0 +1,90 @@
+"""Tests of the peak finding on pattern grids.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# peaks finding
+import patternviewer.peaks as peaks
+
+# grid indices
+ROW, COL = np.meshgrid(np.arange(40), np.arange(30), indexing='ij')
+
+
+def beam(row, col, gain, width=4.0):
+    """Return gain in dB of a beam parabolic in dB around fractional grid
+    indices (row, col).
+    """
+    return gain - ((ROW - row) ** 2 + (COL - col) ** 2) / width
+# end of function beam
+
+
+def test_refined_peak():
+    z = beam(12.3, 17.8, 40)
+    row, col, value = peaks.find_peaks(z[None], count=0)
+    # parabolic refinement is exact for a paraboloid
+    assert np.allclose(row, [[12.3]])
+    assert np.allclose(col, [[17.8]])
+    assert np.allclose(value, [[40]])
+# end of function test_refined_peak
+
+
+def test_sidelobes():
+    z = np.stack([np.maximum.reduce([beam(10, 10, 40), beam(30, 5, 25),
+                                     beam(25, 22, 30), np.full(ROW.shape,
+                                                               -20.0)]),
+                  beam(20, 15, 35)])
+    row, col, value = peaks.find_peaks(z, count=3)
+    assert row.shape == (2, 4)
+    assert np.allclose(row[0, :3], [10, 25, 30])
+    assert np.allclose(col[0, :3], [10, 22, 5])
+    assert np.allclose(value[0, :3], [40, 30, 25])
+    # the flat floor has no peak
+    assert np.all(np.isnan(row[0, 3:]))
+    assert np.allclose(value[1, 0], 35)
+    assert np.all(np.isnan(value[1, 1:]))
+# end of function test_sidelobes
+
+
+def test_peak_between_samples():
+    # equal samples on both sides of the peak give a single peak
+    for row, col in ((12.5, 17), (12, 17.5), (12.5, 17.5)):
+        z = beam(row, col, 40)
+        rows, cols, value = peaks.find_peaks(z[None], count=2)
+        assert np.allclose([rows[0, 0], cols[0, 0], value[0, 0]],
+                           [row, col, 40])
+        assert np.all(np.isnan(value[0, 1:]))
+    # and so does a plateau
+    z = np.minimum(beam(20, 15, 40, width=40), 38)
+    rows, cols, value = peaks.find_peaks(z[None], count=2)
+    assert np.isclose(value[0, 0], 38, atol=0.25)
+    assert np.all(np.isnan(value[0, 1:]))
+# end of function test_peak_between_samples
+
+
+def test_non_finite():
+    z = beam(5, 5, 40)
+    z[:3] = np.nan
+    z[-1] = -np.inf
+    row, col, value = peaks.find_peaks(z[None], count=1)
+    assert np.allclose([row[0, 0], col[0, 0], value[0, 0]], [5, 5, 40])
+    # maximum on the grid edge is not refined beyond the grid
+    z = beam(-2, 15, 40)
+    row, col, value = peaks.find_peaks(z[None], count=0)
+    assert row[0, 0] == 0
+    assert np.isclose(col[0, 0], 15)
+# end of function test_non_finite
+
+
+def test_grid_value():
+    grid = 2.0 * ROW + 3.0 * COL
+    values = peaks.grid_value(grid, [1.5, 10.25, np.nan], [2.5, 0, 3])
+    assert np.allclose(values[:2], [10.5, 20.5])
+    assert np.isnan(values[2])
+    # nearest value next to undefined points
+    grid[3, 3] = np.nan
+    assert np.allclose(peaks.grid_value(grid, [2.2, 1.5], [3.2, 1.5]),
+                       [grid[2, 3], 7.5])
+# end of function test_grid_value
+
+# end of module test_peaks
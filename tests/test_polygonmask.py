@@ -0,0 +1,94 @@
+"""Tests of the rasterisation of polygons and the statistics of gains inside
+them.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# point in polygon reference
+from matplotlib.path import Path
+
+# polygons rasterisation
+import patternviewer.polygonmask as polygonmask
+
+# (lon, lat) grid
+LON, LAT = np.meshgrid(np.linspace(-180, 180, 73), np.linspace(-60, 60, 25))
+
+# square and triangle, with required gains, vertices between grid points
+SQUARE = ([-21, 21, 21, -21], [-11, -11, 11, 11], 30.0)
+TRIANGLE = ([1, 41, 1], [1, 1, 31], 35.0)
+
+
+class Polygon(object):
+    """Polygon with the accessors of polygon.Polygon.
+    """
+
+    def __init__(self, lon, lat, gain):
+        self._vertices = lon, lat, gain
+
+    def longitude(self):
+        return self._vertices[0]
+
+    def latitude(self):
+        return self._vertices[1]
+
+    def gain(self):
+        return self._vertices[2]
+# end of class Polygon
+
+
+def test_rasterize():
+    for lon, lat, _ in (SQUARE, TRIANGLE):
+        mask = polygonmask.rasterize(lon, lat, LON, LAT)
+        expected = Path(np.column_stack((lon, lat))).contains_points(
+            np.column_stack((LON.ravel(), LAT.ravel())))
+        assert np.array_equal(mask, expected)
+    # square on both sides of the antimeridian
+    mask = polygonmask.rasterize([172, 193, 193, 172], [-6, -6, 6, 6],
+                                 LON, LAT).reshape(LON.shape)
+    assert set(LON[mask]) == {175, 180, -180, -175, -170}
+    assert set(LAT[mask]) == {-5, 0, 5}
+    # undefined points are outside
+    assert not polygonmask.rasterize(*SQUARE[:2], [np.nan], [0.0])[0]
+# end of function test_rasterize
+
+
+def test_polygon_mask_cache():
+    mask = polygonmask.polygon_mask(SQUARE, LON, LAT)
+    assert not mask.flags.writeable
+    assert np.count_nonzero(mask) == 9 * 5
+    # same vertices and grid
+    assert polygonmask.polygon_mask(Polygon(*SQUARE), LON.copy(),
+                                    LAT.copy()) is mask
+    assert polygonmask.polygon_mask(SQUARE, LON[1:], LAT[1:]) is not mask
+# end of function test_polygon_mask_cache
+
+
+def test_statistics():
+    # two data sets, the second 3 dB below the first
+    gains = 40 - np.hypot(LON, LAT) / 10
+    gains = np.stack((gains, gains - 3), axis=-1)
+    gains[12, 36] = np.nan
+    empty = ([100, 101, 101], [0, 0, 1], 10.0)
+    result = polygonmask.statistics([SQUARE, Polygon(*TRIANGLE), empty],
+                                    gains, LON, LAT, percentiles=(50,))
+    assert result['min'].shape == (3, 2)
+    assert np.array_equal(result['points'], [45, 20, 0])
+    assert np.array_equal(result['required'], [30, 35, 10])
+    for k, (lon, lat, _) in enumerate((SQUARE, TRIANGLE)):
+        mask = polygonmask.rasterize(lon, lat, LON, LAT)
+        inside = gains.reshape(-1, 2)[mask]
+        assert np.allclose(result['min'][k], np.nanmin(inside, axis=0))
+        assert np.allclose(result['mean'][k], np.nanmean(inside, axis=0))
+        assert np.allclose(result['p50'][k],
+                           np.nanmedian(inside, axis=0))
+    # farthest points of the square from (0, 0)
+    assert np.allclose(result['min'][0], [40 - np.hypot(20, 10) / 10,
+                                          37 - np.hypot(20, 10) / 10])
+    assert np.allclose(result['margin'][:2],
+                       result['min'][:2] - [[30], [35]])
+    # no grid point inside
+    assert np.all(np.isnan(result['min'][2]))
+    assert np.all(np.isnan(result['margin'][2]))
+# end of function test_statistics
+
+# end of module test_polygonmask
@@ -0,0 +1,117 @@
+"""Tests of pattern integration over the sphere.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+# import pytest for parametrized tests
+import pytest
+
+# import angles conversion functions
+import patternviewer.angles as angles
+# import constant file
+import patternviewer.constant as cst
+# integration over the sphere
+import patternviewer.quadrature as quadrature
+
+
+def uv_solid_angles(az, el, to_uv):
+    """Return solid angle of each point of the (az, el) grid in degrees from
+    the finite difference Jacobian of the conversion to_uv to (u, v).
+    """
+    u, v = to_uv(az, el)
+    step_az = az[1, 0] - az[0, 0]
+    step_el = el[0, 1] - el[0, 0]
+    du_daz, du_del = np.gradient(u, step_az, step_el)
+    dv_daz, dv_del = np.gradient(v, step_az, step_el)
+    jacobian = np.abs(du_daz * dv_del - du_del * dv_daz) / \
+        np.sqrt(1 - u ** 2 - v ** 2)
+    return quadrature.trapezoid(az[:, 0])[:, None] * \
+        quadrature.trapezoid(el[0, :])[None, :] * jacobian
+# end of function uv_solid_angles
+
+
+@pytest.mark.parametrize('grid, to_uv, expected', [
+    (4, angles.elovaz2uv, None),
+    (5, angles.azovel2uv, 1.209)])
+def test_jacobians(grid, to_uv, expected):
+    az, el = np.meshgrid(np.linspace(-60, 60, 481), np.linspace(0, 40, 161),
+                         indexing='ij')
+    weights = quadrature.solid_angles(az, el, grid)
+    reference = uv_solid_angles(az, el, to_uv)
+    assert np.allclose(weights[1:-1, 1:-1], reference[1:-1, 1:-1],
+                       rtol=1e-4)
+    assert np.isclose(weights.sum(), reference.sum(), rtol=1e-3)
+    if expected is not None:
+        assert round(weights.sum(), 3) == expected
+# end of function test_jacobians
+
+
+def test_transposed_grid():
+    az, el = np.meshgrid(np.linspace(-60, 60, 121), np.linspace(0, 40, 41),
+                         indexing='ij')
+    for grid in (2, 3, 4, 5):
+        weights = quadrature.solid_angles(az, el, grid)
+        transposed = quadrature.solid_angles(az.T, el.T, grid)
+        assert np.allclose(weights.T, transposed)
+# end of function test_transposed_grid
+
+
+def test_whole_sphere():
+    theta, phi = np.meshgrid(np.linspace(0, 180, 721),
+                             np.linspace(-180, 180, 721), indexing='ij')
+    weights = quadrature.solid_angles(theta, phi, 2)
+    assert np.isclose(weights.sum(), 4 * np.pi, rtol=1e-4)
+# end of function test_whole_sphere
+
+
+def test_uv_cap():
+    u, v = np.meshgrid(np.linspace(-1, 1, 2001), np.linspace(-1, 1, 2001),
+                       indexing='ij')
+    weights = quadrature.solid_angles(u, v, 1)
+    # cap of half angle 30 degrees
+    cap = np.hypot(u, v) <= np.sin(30 * cst.DEG2RAD)
+    assert np.isclose(weights[cap].sum(),
+                      2 * np.pi * (1 - np.cos(30 * cst.DEG2RAD)), rtol=1e-2)
+# end of function test_uv_cap
+
+
+def test_azel_cap():
+    az, el = np.meshgrid(np.linspace(-20, 20, 401), np.linspace(-20, 20, 401),
+                         indexing='ij')
+    weights = quadrature.solid_angles(az, el, 3)
+    cap = np.hypot(az, el) <= 15
+    assert np.isclose(weights[cap].sum(),
+                      2 * np.pi * (1 - np.cos(15 * cst.DEG2RAD)), rtol=1e-2)
+# end of function test_azel_cap
+
+
+def test_earth_disc():
+    altitude = 35786e3
+    az, el = np.meshgrid(np.linspace(-10, 10, 201), np.linspace(-10, 10, 201),
+                         indexing='ij')
+    mask = quadrature.earth_disc(az, el, altitude)
+    half_angle = np.arcsin(cst.EARTH_RAD_EQUATOR_M /
+                           (cst.EARTH_RAD_EQUATOR_M + altitude)) / \
+        cst.DEG2RAD
+    assert mask[100, 100]
+    assert mask[100 + int(half_angle * 10) - 1, 100]
+    assert not mask[100 + int(half_angle * 10) + 1, 100]
+    assert not mask.flags.writeable
+# end of function test_earth_disc
+
+
+def test_integrate():
+    theta, phi = np.meshgrid(np.linspace(0, 180, 361),
+                             np.linspace(-180, 180, 361), indexing='ij')
+    weights = quadrature.solid_angles(theta, phi, 2)
+    # isotropic and cos^2 layers integrated at once
+    power = np.stack([np.ones_like(theta),
+                      np.cos(theta * cst.DEG2RAD) ** 2], axis=-1)
+    result = quadrature.integrate(power, weights)
+    assert np.allclose(result, [4 * np.pi, 4 * np.pi / 3], rtol=1e-4)
+    # the masked equator row keeps its whole trapezoidal weight
+    upper = quadrature.integrate(power, weights, theta <= 90)
+    assert np.allclose(upper, [2 * np.pi, 2 * np.pi / 3], rtol=1e-2)
+# end of function test_integrate
+
+# end of module test_quadrature
@@ -0,0 +1,53 @@
+"""Tests of the sparse resampling between grids.
+"""
+
+# import numpy for arrays manipulation
+import numpy as np
+
+# regular grid interpolation
+from patternviewer.interpolation import GridInterpolator
+# sparse resampling between grids
+from patternviewer.resample import Resampler, get_resampler
+
+# source grid and target points
+X = np.linspace(0, 4, 9)
+Y = np.linspace(-1, 1, 5)
+TX, TY = np.meshgrid(np.linspace(-0.5, 4.5, 7), np.linspace(-1, 1, 3))
+
+
+def test_resample():
+    x, y = np.meshgrid(X, Y, indexing='ij')
+    layers = np.stack([x * y, x + y, np.cos(x) * y], axis=-1)
+    for method in ('nearest', 'linear', 'cubic'):
+        resampler = Resampler(X, Y, TX, TY, method)
+        assert resampler.matrix().shape == (TX.size, X.size * Y.size)
+        result = resampler.resample(layers)
+        assert result.shape == TX.shape + (3,)
+        for k in range(3):
+            interpolator = GridInterpolator(X, Y, layers[..., k], method)
+            assert np.allclose(result[..., k],
+                               interpolator.ev(TX, TY).reshape(TX.shape))
+    # single layer keeps the target shape
+    assert Resampler(X, Y, TX, TY).resample(x * y).shape == TX.shape
+# end of function test_resample
+
+
+def test_resample_non_finite():
+    x, y = np.meshgrid(X, Y, indexing='ij')
+    target_x, target_y = TX.copy(), TY.copy()
+    target_x[0, 1] = np.nan
+    result = Resampler(X, Y, target_x, target_y).resample(x + y)
+    assert np.isnan(result[0, 1])
+    assert np.count_nonzero(np.isnan(result)) == 1
+# end of function test_resample_non_finite
+
+
+def test_cache():
+    resampler = get_resampler(X, Y, TX, TY)
+    assert get_resampler(X.copy(), Y.copy(), TX.copy(), TY.copy()) is \
+        resampler
+    assert get_resampler(X, Y, TX, TY, 'cubic') is not resampler
+    assert get_resampler(X, Y, TX, TY, cache=False) is not resampler
+# end of function test_cache
+
+# end of module test_resample
@@ -0,0 +1,225 @@
+"""Tests of the pattern gains along terminal tracks. The track module reads
+patterns, it needs the display dependencies, tests are skipped without them.
+"""
+
+# import csv reader of the reports
+import csv
+# memory allocations tracing
+import tracemalloc
+
+# import pytest for optional dependencies and expected exceptions
+import pytest
+# import numpy for arrays manipulation
+import numpy as np
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('mpl_toolkits.basemap')
+pytest.importorskip('pyproj')
+
+# gains along tracks
+import patternviewer.track as track
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"
+     xmlns:gx="http://www.google.com/kml/ext/2.2">
+<Document>
+<Placemark><gx:Track>
+<when>t1</when><when>t2</when><when>t3</when>
+<gx:coord>1 2 100</gx:coord><gx:coord>3 4 100</gx:coord>
+<gx:coord>5 6 100</gx:coord>
+</gx:Track></Placemark>
+<Placemark><LineString><coordinates>7,8,0 9,10,0</coordinates></LineString>
+</Placemark>
+<Placemark><TimeStamp><when>t4</when></TimeStamp>
+<Point><coordinates>11,12</coordinates></Point></Placemark>
+</Document>
+</kml>
+"""
+
+# axes of the grid of the fake patterns
+X = np.linspace(-5, 5, 101)
+Y = np.linspace(-4, 4, 81)
+
+
+class Beams(object):
+    """Patterns of paraboloid beams centered on (lon, lat) points, with
+    azimuth and elevation equal to longitude and latitude, positions
+    farther than 20 degrees in longitude do not see the satellite.
+    """
+
+    def __init__(self, centers, cf=0.0):
+        self._centers = centers
+        self._conversion_factor = cf
+
+    def nb_sets(self):
+        return len(self._centers)
+
+    def plotted(self, set):
+        x, y = np.meshgrid(X, Y)
+        a, b = self._centers[set]
+        return 40 - (x - a) ** 2 - (y - b) ** 2
+
+    def native_axes(self, z, set):
+        return X, Y, np.swapaxes(z, 0, 1)
+
+    def lonlat2azel(self, lon, lat):
+        az = np.array(lon, dtype=float)
+        el = np.array(lat, dtype=float)
+        az[np.abs(az) > 20] = np.nan
+        return az, el
+
+    def azel2xy(self, az, el):
+        return az, el
+# end of class Beams
+
+
+def test_read_csv_header(tmp_path):
+    filename = tmp_path / 'track.csv'
+    filename.write_text('Timestamp,Altitude,Latitude,Longitude\n' +
+                        ''.join('t{0:d},1000,{1:d},{2:d}\n'.format(
+                            k, k, 2 * k) for k in range(5)))
+    chunks = list(track.read_track(str(filename), 2))
+    assert [len(lon) for _, lon, _ in chunks] == [2, 2, 1]
+    times = sum([t for t, _, _ in chunks], [])
+    assert times == ['t0', 't1', 't2', 't3', 't4']
+    assert np.array_equal(np.concatenate([lon for _, lon, _ in chunks]),
+                          [0, 2, 4, 6, 8])
+    assert np.array_equal(np.concatenate([lat for _, _, lat in chunks]),
+                          [0, 1, 2, 3, 4])
+# end of function test_read_csv_header
+
+
+def test_read_csv_without_header(tmp_path):
+    filename = tmp_path / 'track.csv'
+    filename.write_text('1.5,2.5\n3.5,4.5\n\n')
+    (times, lon, lat), = track.read_track(str(filename))
+    assert times == ['', '']
+    assert np.array_equal(lon, [1.5, 3.5])
+    assert np.array_equal(lat, [2.5, 4.5])
+    filename.write_text('t0,1.5,2.5\n')
+    (times, lon, lat), = track.read_track(str(filename))
+    assert times == ['t0']
+    assert np.array_equal(lon, [1.5])
+# end of function test_read_csv_without_header
+
+
+def test_read_csv_columns(tmp_path):
+    filename = tmp_path / 'track.csv'
+    filename.write_text('time,altitude\nt0,1000\n')
+    with pytest.raises(ValueError):
+        list(track.read_track(str(filename)))
+    with pytest.raises(ValueError):
+        track.read_track(str(tmp_path / 'track.gpx'))
+# end of function test_read_csv_columns
+
+
+def test_read_kml(tmp_path):
+    filename = tmp_path / 'track.kml'
+    filename.write_text(KML)
+    chunks = list(track.read_track(str(filename), 4))
+    assert [len(lon) for _, lon, _ in chunks] == [4, 2]
+    times = sum([t for t, _, _ in chunks], [])
+    assert times == ['t1', 't2', 't3', '', '', 't4']
+    assert np.array_equal(np.concatenate([lon for _, lon, _ in chunks]),
+                          [1, 3, 5, 7, 9, 11])
+    assert np.array_equal(np.concatenate([lat for _, _, lat in chunks]),
+                          [2, 4, 6, 8, 10, 12])
+# end of function test_read_kml
+
+
+def test_read_kml_tracks(tmp_path):
+    filename = tmp_path / 'track.kml'
+    # whens are paired by order with the coords of their own track
+    filename.write_text(KML.replace(
+        '<Placemark><LineString>',
+        '<Placemark><gx:Track><when>u1</when><when>u2</when>'
+        '<gx:coord>13 14 0</gx:coord></gx:Track></Placemark>'
+        '<Placemark><gx:Track><gx:coord>15 16 0</gx:coord>'
+        '<gx:coord>17 18 0</gx:coord></gx:Track></Placemark>'
+        '<Placemark><LineString>'))
+    chunks = list(track.read_track(str(filename), 2))
+    times = sum([t for t, _, _ in chunks], [])
+    assert times == ['t1', 't2', 't3', 'u1', '', '', '', '', 't4']
+    assert np.array_equal(np.concatenate([lon for _, lon, _ in chunks]),
+                          [1, 3, 5, 13, 15, 17, 7, 9, 11])
+# end of function test_read_kml_tracks
+
+
+def test_read_kml_memory(tmp_path):
+    filename = tmp_path / 'track.kml'
+
+    def peak(size):
+        # KML writes all the whens of a track before its coords
+        with open(str(filename), 'w') as file:
+            file.write(KML[:KML.index('<Placemark>')] +
+                       '<Placemark><gx:Track>\n')
+            for k in range(size):
+                file.write('<when>2024-01-01T00:00:{0:06d}Z</when>\n'.format(
+                    k))
+            for k in range(size):
+                file.write('<gx:coord>{0:d} {1:d} 0</gx:coord>\n'.format(
+                    k % 90, k % 45))
+            file.write('</gx:Track></Placemark></Document></kml>\n')
+        tracemalloc.start()
+        try:
+            count = 0
+            for times, lon, _ in track.read_track(str(filename), 500):
+                count += len(lon)
+            assert count == size
+            assert times[-1] == '2024-01-01T00:00:{0:06d}Z'.format(size - 1)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # memory does not grow with the track length
+    assert peak(20000) < 1.5 * peak(2000)
+# end of function test_read_kml_memory
+
+
+def test_evaluate():
+    evaluator = track.TrackEvaluator({'A': Beams([(0, 0), (2, 1)], 1.0),
+                                      'B': Beams([(-2, -1)])})
+    assert evaluator.beams() == [('A', 0), ('A', 1), ('B', 0)]
+    assert evaluator.labels() == ['A set 0', 'A set 1', 'B']
+    lon, lat = [0.0, 2.0, -2.0, 1.05, 30.0], [0.0, 1.0, -1.0, 0.55, 0.0]
+    gains = evaluator.evaluate(lon, lat)
+    expected = [[41 - (a - x) ** 2 - (b - y) ** 2
+                 for x, y in ((0, 0), (2, 1))] +
+                [40 - (a + 2) ** 2 - (b + 1) ** 2]
+                for a, b in zip(lon[:4], lat[:4])]
+    # paraboloids are exact with bilinear interpolation on grid nodes only
+    assert np.allclose(gains[:3], expected[:3])
+    assert np.allclose(gains[3], expected[3], atol=0.01)
+    assert np.all(np.isnan(gains[4]))
+    index, gain = evaluator.best(gains)
+    assert np.array_equal(index, [0, 1, 2, 1, -1])
+    assert np.allclose(gain[:4], np.max(expected, axis=1), atol=0.01)
+    assert np.isnan(gain[4])
+# end of function test_evaluate
+
+
+def test_run(tmp_path):
+    filename = tmp_path / 'track.csv'
+    filename.write_text('time,lon,lat\n"2024-01-01, 00:00",0,0\n'
+                        '"2024-01-01, 00:01",30,0\n'
+                        '"2024-01-01, 00:02",2,1\n')
+    output = str(tmp_path / 'gains.csv')
+    evaluator = track.TrackEvaluator({'east, west': Beams([(0, 0)]),
+                                      'B': Beams([(2, 1)])})
+    counts = []
+    assert evaluator.run(str(filename), output, 2,
+                         progress=counts.append) == 3
+    assert counts == [2, 3]
+    with open(output, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['time', 'longitude', 'latitude', 'east, west', 'B',
+                       'best beam', 'best gain']
+    assert rows[1] == ['2024-01-01, 00:00', '0.000000', '0.000000',
+                       '40.000', '35.000', 'east, west', '40.000']
+    assert rows[2] == ['2024-01-01, 00:01', '30.000000', '0.000000',
+                       'nan', 'nan', '', 'nan']
+    assert rows[3][0] == '2024-01-01, 00:02'
+    assert rows[3][-2:] == ['B', '40.000']
+# end of function test_run
+
+# end of module test_track